@@ -3,7 +3,7 @@
 
 from flask import Flask
 from flask_jwt_extended import get_jwt_identity, verify_jwt_in_request
-from .extensions import db, jwt
+from .extensions import db, jwt, http
 from .config import Config
 
 
@@ -17,13 +17,14 @@ def create_app(config_class=Config):
     # Inicjalizacja rozszerzeń
     db.init_app(app)
     jwt.init_app(app)
+    http.init_app(app)
     
     # Context processor - dodaje zmienne dostępne w wszystkich szablonach
     @app.context_processor
     def inject_user_status():
         """Sprawdza czy użytkownik jest zalogowany i udostępnia to w szablonach"""
         from flask import request
-        from .models import User
+        from .services.auth_service import AuthService
         
         # Strony które zawsze mają pokazywać tylko przycisk "Wróć na stronę główną"
         public_pages = ['auth.login_page', 'auth.register_page', 'auth.home']
@@ -37,9 +38,8 @@ def create_app(config_class=Config):
                 return {'user_logged_in': False, 'user_name': None}
             
             if user_id:
-                # Pobierz imię użytkownika z bazy
-                user = db.session.query(User).get(int(user_id))
-                user_name = user.imie if user and user.imie else None
+                # Imię z cache (proces/żądanie) - bez osobnego zapytania przy każdym renderze
+                user_name = AuthService.get_display_name(user_id)
                 return {'user_logged_in': True, 'user_name': user_name}
             
             return {'user_logged_in': False, 'user_name': None}
@@ -55,6 +55,13 @@ def create_app(config_class=Config):
     app.register_blueprint(products.bp)
     app.register_blueprint(ai.bp)  # Nowy blueprint dla AI Asystenta Kucharza
     
+    # Dziennik zmian - rejestracja zdarzeń sesji (logi_zdarzen)
+    from .services import audit_log  # noqa: F401
+    
+    # Komendy CLI (flask enrich-products, ...)
+    from .commands import register_commands
+    register_commands(app)
+    
     # TODO: Dodać obsługę błędów (error handlers)
     # TODO: Dodać CORS jeśli potrzebne
     
@@ -0,0 +1,101 @@
+# Komendy CLI aplikacji (flask <komenda>)
+# Operacje administracyjne uruchamiane z crona lub ręcznie
+
+from datetime import datetime, timedelta
+
+import json
+
+import click
+from flask.cli import with_appcontext
+
+from .services.product_service import ProductService
+from .services.statistics_service import StatisticsService
+from .services.waste_analytics import WasteAnalytics
+
+
+@click.command('enrich-products')
+@click.option('--stale-days', type=int, default=None,
+              help='Odśwież też wartości odżywcze pobrane ponad N dni temu.')
+@click.option('--limit', type=int, default=None, help='Maksymalna liczba produktów.')
+@click.option('--workers', type=int, default=None, help='Liczba równoległych zapytań do OpenFoodFacts.')
+@with_appcontext
+def enrich_products_command(stale_days, limit, workers):
+    """Masowo uzupełnia wartości odżywcze produktów z OpenFoodFacts."""
+    stale_before = datetime.utcnow() - timedelta(days=stale_days) if stale_days is not None else None
+    result = ProductService.enrich_batch(stale_before=stale_before, limit=limit, workers=workers)
+
+    if not result['success']:
+        raise click.ClickException(result['message'])
+
+    click.echo(
+        f"{result['message']} (nie znaleziono: {result['not_found']}, błędy: {result['failed']})"
+    )
+
+
+@click.command('compact-api-payloads')
+@click.option('--batch-size', type=int, default=500, show_default=True, help='Liczba wierszy w partii.')
+@with_appcontext
+def compact_api_payloads_command(batch_size):
+    """Przepisuje zapisane odpowiedzi OpenFoodFacts: projekcja + skompresowana pełna odpowiedź."""
+    result = ProductService.compact_api_payloads(batch_size=batch_size)
+
+    if not result['success']:
+        raise click.ClickException(result['message'])
+
+    click.echo(result['message'])
+
+
+@click.command('normalize-product-names')
+@click.option('--batch-size', type=int, default=500, show_default=True, help='Liczba wierszy w partii.')
+@with_appcontext
+def normalize_product_names_command(batch_size):
+    """Uzupełnia produkty.nazwa_norm (dopasowanie nazw przy dodawaniu do lodówki)."""
+    result = ProductService.backfill_name_keys(batch_size=batch_size)
+
+    if not result['success']:
+        raise click.ClickException(result['message'])
+
+    click.echo(result['message'])
+
+
+@click.command('rebuild-statistics')
+@click.option('--lodowka-id', type=int, default=None, help='Tylko wskazana lodówka.')
+@click.option('--batch-size', type=int, default=5000, show_default=True, help='Wpisy historii w partii.')
+@with_appcontext
+def rebuild_statistics_command(lodowka_id, batch_size):
+    """Przelicza dzienne statystyki operacji z pełnej historii."""
+    result = StatisticsService.rebuild(lodowka_id=lodowka_id, batch_size=batch_size)
+
+    if not result['success']:
+        raise click.ClickException(result['message'])
+
+    click.echo(result['message'])
+
+
+@click.command('waste-report')
+@click.option('--since', type=click.DateTime(formats=['%Y-%m-%d']), default=None,
+              help='Tylko operacje od tego dnia (RRRR-MM-DD).')
+@click.option('--top', type=int, default=None, help='Maksymalna liczba produktów na lodówkę.')
+@click.option('--batch-size', type=int, default=5000, show_default=True, help='Wpisy historii w partii.')
+@click.option('--output', type=click.File('w', encoding='utf-8'), default='-',
+              help='Plik wynikowy NDJSON (domyślnie standardowe wyjście).')
+@with_appcontext
+def waste_report_command(since, top, batch_size, output):
+    """Raport marnowania żywności dla wszystkich lodówek - jedna linia JSON na lodówkę."""
+    households = 0
+    for lodowka_id, report in WasteAnalytics.all_households(
+        since=since.date() if since else None, top=top, batch_size=batch_size
+    ):
+        output.write(json.dumps(dict(report, lodowka_id=lodowka_id), ensure_ascii=False) + '\n')
+        households += 1
+
+    click.echo(f'Raport marnowania: {households} lodówek', err=True)
+
+
+def register_commands(app):
+    """Rejestruje komendy CLI w aplikacji"""
+    app.cli.add_command(enrich_products_command)
+    app.cli.add_command(compact_api_payloads_command)
+    app.cli.add_command(normalize_product_names_command)
+    app.cli.add_command(rebuild_statistics_command)
+    app.cli.add_command(waste_report_command)
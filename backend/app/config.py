@@ -34,6 +34,70 @@ class Config:
     JWT_COOKIE_CSRF_PROTECT = False  # Można włączyć dla dodatkowej ochrony
     JWT_ACCESS_COOKIE_NAME = 'access_token_cookie'
     JWT_COOKIE_SAMESITE = 'Lax'
+    
+    # Cache imion użytkowników w nawigacji (sekundy, 0 = wyłączony)
+    USER_NAME_CACHE_TTL = int(os.environ.get('USER_NAME_CACHE_TTL', 60))
+    
+    # Cache liczników dashboardu na lodówkę (sekundy, 0 = wyłączony)
+    FRIDGE_SUMMARY_CACHE_TTL = int(os.environ.get('FRIDGE_SUMMARY_CACHE_TTL', 30))
+    
+    # Klient HTTP (Ollama, OpenFoodFacts) - pula połączeń keep-alive
+    HTTP_CONNECT_TIMEOUT = float(os.environ.get('HTTP_CONNECT_TIMEOUT', 3.05))  # sekundy
+    HTTP_READ_TIMEOUT = float(os.environ.get('HTTP_READ_TIMEOUT', 10))  # sekundy
+    HTTP_POOL_CONNECTIONS = int(os.environ.get('HTTP_POOL_CONNECTIONS', 10))  # liczba hostów
+    HTTP_POOL_MAXSIZE = int(os.environ.get('HTTP_POOL_MAXSIZE', 10))  # połączenia na host
+    HTTP_RETRIES = int(os.environ.get('HTTP_RETRIES', 2))
+    HTTP_BACKOFF_FACTOR = float(os.environ.get('HTTP_BACKOFF_FACTOR', 0.3))
+    HTTP_USER_AGENT = os.environ.get('HTTP_USER_AGENT') or 'LodowkaSenior/1.0'
+    
+    # Cache odpowiedzi OpenFoodFacts (tabela cache_api + LRU w procesie)
+    API_CACHE_PRODUCT_TTL = int(os.environ.get('API_CACHE_PRODUCT_TTL', 7 * 24 * 3600))  # sekundy
+    API_CACHE_SEARCH_TTL = int(os.environ.get('API_CACHE_SEARCH_TTL', 24 * 3600))  # sekundy
+    API_CACHE_NOT_FOUND_TTL = int(os.environ.get('API_CACHE_NOT_FOUND_TTL', 24 * 3600))  # sekundy, odpowiedzi 404
+    API_CACHE_LRU_SIZE = int(os.environ.get('API_CACHE_LRU_SIZE', 512))  # wpisy, 0 = wyłączony
+    
+    # Lokalny indeks wyszukiwania produktów (trigramy w pamięci procesu)
+    PRODUCT_INDEX_TTL = int(os.environ.get('PRODUCT_INDEX_TTL', 300))  # sekundy do pełnej przebudowy
+    PRODUCT_SEARCH_MIN_SCORE = float(os.environ.get('PRODUCT_SEARCH_MIN_SCORE', 0.6))  # udział trigramów zapytania
+    PRODUCT_MATCH_MIN_SIMILARITY = float(os.environ.get('PRODUCT_MATCH_MIN_SIMILARITY', 0.75))  # Jaccard nazw - podpowiedź przy dodawaniu
+    
+    # Masowe uzupełnianie z OpenFoodFacts
+    OPENFOODFACTS_WORKERS = int(os.environ.get('OPENFOODFACTS_WORKERS', 4))
+    OPENFOODFACTS_RATE_LIMIT = int(os.environ.get('OPENFOODFACTS_RATE_LIMIT', 90))  # zapytań/min
+    
+    # Ollama - monitor dostępności z wyłącznikiem
+    OLLAMA_BASE_URL = os.environ.get('OLLAMA_BASE_URL') or 'http://127.0.0.1:11434'
+    OLLAMA_PROBE_TIMEOUT = float(os.environ.get('OLLAMA_PROBE_TIMEOUT', 2))
+    OLLAMA_HEALTH_TTL = int(os.environ.get('OLLAMA_HEALTH_TTL', 30))  # sekundy
+    OLLAMA_FAILURE_THRESHOLD = int(os.environ.get('OLLAMA_FAILURE_THRESHOLD', 3))
+    OLLAMA_COOLDOWN = int(os.environ.get('OLLAMA_COOLDOWN', 60))  # sekundy
+    
+    # Cache przepisów AI (plik SQLite, domyślnie w katalogu instance/)
+    RECIPE_CACHE_PATH = os.environ.get('RECIPE_CACHE_PATH')
+    RECIPE_CACHE_TTL = int(os.environ.get('RECIPE_CACHE_TTL', 6 * 3600))  # sekundy, 0 = wyłączony
+    RECIPE_CACHE_MAX_ENTRIES = int(os.environ.get('RECIPE_CACHE_MAX_ENTRIES', 500))
+    
+    # Kolejka zadań w tle - liczba wątków na kolejkę (dla 'ai' dopasuj do hosta Ollama)
+    JOB_WORKERS = {
+        'ai': int(os.environ.get('AI_WORKERS', 1)),
+        'enrich': 1,  # masowe uzupełnianie ma własną pulę zapytań (OPENFOODFACTS_WORKERS)
+        'openfoodfacts': int(os.environ.get('OPENFOODFACTS_BACKGROUND_WORKERS', 2)),  # pojedyncze produkty
+    }
+    JOB_QUEUE_LIMIT = int(os.environ.get('JOB_QUEUE_LIMIT', 20))  # oczekujące zadania na kolejkę
+    JOB_RESULT_TTL = int(os.environ.get('JOB_RESULT_TTL', 600))  # sekundy przechowywania wyniku
+    # Workery odświeżają puls swoich niezakończonych zadań; zadanie bez pulsu
+    # dłużej niż JOB_HEARTBEAT_TIMEOUT (worker zatrzymany) jest przerwane
+    JOB_HEARTBEAT_INTERVAL = float(os.environ.get('JOB_HEARTBEAT_INTERVAL', 10))  # sekundy
+    JOB_HEARTBEAT_TIMEOUT = float(os.environ.get('JOB_HEARTBEAT_TIMEOUT', 60))  # sekundy
+    # Status zadań wspólny dla workerów hosta (plik SQLite, domyślnie w katalogu instance/)
+    JOB_STORE_PATH = os.environ.get('JOB_STORE_PATH')
+    
+    # Dziennik zmian (logi_zdarzen) - zapis w tle partiami
+    AUDIT_LOG_ENABLED = os.environ.get('AUDIT_LOG_ENABLED', 'true').lower() == 'true'
+    AUDIT_LOG_ASYNC = os.environ.get('AUDIT_LOG_ASYNC', 'true').lower() == 'true'  # false = zapis po commit
+    AUDIT_LOG_QUEUE_SIZE = int(os.environ.get('AUDIT_LOG_QUEUE_SIZE', 10000))  # wpisy czekające na zapis
+    AUDIT_LOG_BATCH_SIZE = int(os.environ.get('AUDIT_LOG_BATCH_SIZE', 200))
+    AUDIT_LOG_FLUSH_INTERVAL = float(os.environ.get('AUDIT_LOG_FLUSH_INTERVAL', 2))  # sekundy
 
 
 class DevelopmentConfig(Config):
@@ -58,3 +122,4 @@ class TestingConfig(Config):
     """
     TESTING = True
     SQLALCHEMY_DATABASE_URI = 'sqlite:///:memory:'
+    AUDIT_LOG_ENABLED = False  # testy dziennika włączają go same
@@ -1,8 +1,14 @@
 # Inicjalizacja rozszerzeń Flask
 # Centralne miejsce do tworzenia instancji rozszerzeń używanych w aplikacji
 
+import threading
+
+import requests
+from flask import current_app
 from flask_sqlalchemy import SQLAlchemy
 from flask_jwt_extended import JWTManager
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 # SQLAlchemy - ORM do komunikacji z bazą danych
 db = SQLAlchemy()
@@ -10,4 +16,82 @@ db = SQLAlchemy()
 # JWT Manager - zarządzanie tokenami JWT dla autentykacji
 jwt = JWTManager()
 
+
+
+class HttpClient:
+    """
+    Wspólny klient HTTP aplikacji (Ollama, OpenFoodFacts).
+    
+    Jedna sesja requests na aplikację, z pulą połączeń keep-alive na host
+    (HTTP_POOL_MAXSIZE), domyślnymi timeoutami i ponawianiem z backoffem
+    dla idempotentnych żądań (GET) przy błędach połączenia i 502/503/504.
+    Kolejne wywołania do tego samego hosta nie otwierają nowego połączenia
+    TCP/TLS.
+    """
+    
+    def __init__(self, app=None):
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+    
+    def init_app(self, app):
+        app.config.setdefault('HTTP_CONNECT_TIMEOUT', 3.05)
+        app.config.setdefault('HTTP_READ_TIMEOUT', 10)
+        app.config.setdefault('HTTP_POOL_CONNECTIONS', 10)
+        app.config.setdefault('HTTP_POOL_MAXSIZE', 10)
+        app.config.setdefault('HTTP_RETRIES', 2)
+        app.config.setdefault('HTTP_BACKOFF_FACTOR', 0.3)
+        app.config.setdefault('HTTP_USER_AGENT', 'LodowkaSenior/1.0')
+        app.extensions['http_client'] = None
+    
+    def _create_session(self, config):
+        retry = Retry(
+            total=config['HTTP_RETRIES'],
+            backoff_factor=config['HTTP_BACKOFF_FACTOR'],
+            status_forcelist=(502, 503, 504),
+            allowed_methods=frozenset(['GET', 'HEAD']),
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(
+            pool_connections=config['HTTP_POOL_CONNECTIONS'],
+            pool_maxsize=config['HTTP_POOL_MAXSIZE'],
+            max_retries=retry,
+            pool_block=True,
+        )
+        session = requests.Session()
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        session.headers['User-Agent'] = config['HTTP_USER_AGENT']
+        return session
+    
+    @property
+    def session(self):
+        """Sesja bieżącej aplikacji (tworzona przy pierwszym użyciu)"""
+        app = current_app._get_current_object()
+        session = app.extensions.get('http_client')
+        if session is None:
+            with self._lock:
+                session = app.extensions.get('http_client')
+                if session is None:
+                    session = self._create_session(app.config)
+                    app.extensions['http_client'] = session
+        return session
+    
+    def default_timeout(self, read_timeout=None):
+        """(connect, read) - read_timeout nadpisuje HTTP_READ_TIMEOUT"""
+        config = current_app.config
+        return (config['HTTP_CONNECT_TIMEOUT'], read_timeout or config['HTTP_READ_TIMEOUT'])
+    
+    def get(self, url, read_timeout=None, **kwargs):
+        kwargs.setdefault('timeout', self.default_timeout(read_timeout))
+        return self.session.get(url, **kwargs)
+    
+    def post(self, url, read_timeout=None, **kwargs):
+        kwargs.setdefault('timeout', self.default_timeout(read_timeout))
+        return self.session.post(url, **kwargs)
+
+
+# Klient HTTP - pula połączeń do usług zewnętrznych
+http = HttpClient()
+
 # TODO: Dodać inne rozszerzenia w razie potrzeby (np. Flask-CORS, Flask-Migrate)
@@ -8,5 +8,9 @@ from .operation_history import OperationHistory
 from .log import Log
 from .lodowka import Lodowka
 from .wartosci_odzywcze import WartosciOdzywcze
+from .zrodlo_api import ZrodloApi
+from .cache_api import CacheApi
+from .statystyki_dzienne import StatystykiDzienne
 
-__all__ = ['User', 'Product', 'FridgeItem', 'OperationHistory', 'Log', 'Lodowka', 'WartosciOdzywcze']
+__all__ = ['User', 'Product', 'FridgeItem', 'OperationHistory', 'Log', 'Lodowka', 'WartosciOdzywcze',
+           'ZrodloApi', 'CacheApi', 'StatystykiDzienne']
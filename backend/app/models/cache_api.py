@@ -0,0 +1,55 @@
+from datetime import datetime
+
+from sqlalchemy.dialects import mysql
+from sqlalchemy.orm import deferred
+
+from ..extensions import db
+
+
+class CacheApi(db.Model):
+    """
+    Mapuje tabelę `cache_api`.
+
+    Odpowiedzi API zewnętrznych - po kodzie kreskowym albo treści zapytania,
+    z ETag do rewalidacji i datą wygaśnięcia. Dla dostawców z projekcją
+    `odpowiedz` zawiera tylko czytane pola, a pełna odpowiedź leży
+    skompresowana (zlib) w `odpowiedz_surowa`.
+    """
+    __tablename__ = "cache_api"
+    __table_args__ = (
+        db.Index("cache_api_index_0", "zrodlo_id", "barcode"),
+        db.Index("cache_api_index_1", "zrodlo_id", "zapytanie"),
+        db.Index("cache_api_index_2", "wygasa"),
+    )
+
+    # PK, AUTO_INCREMENT (w SQLite autoinkrementacja działa tylko dla INTEGER)
+    id = db.Column(db.BigInteger().with_variant(db.Integer, "sqlite"), primary_key=True)
+    zrodlo_id = db.Column(
+        db.BigInteger,
+        db.ForeignKey("zrodla_api.id"),
+        nullable=False,
+    )
+    barcode = db.Column(db.String(64))
+    zapytanie = db.Column(db.String(255))
+    odpowiedz = db.Column(db.JSON)
+    # Tylko do zapisu i backfillu - nie jest ładowana z wierszem
+    odpowiedz_surowa = deferred(
+        db.Column(db.LargeBinary().with_variant(mysql.MEDIUMBLOB(), "mysql", "mariadb"))
+    )
+    http_status = db.Column(db.Integer)
+    etag = db.Column(db.String(128))
+    pobrano = db.Column(
+        db.DateTime,
+        nullable=False,
+        default=datetime.utcnow,
+        server_default=db.func.current_timestamp(),
+    )
+    wygasa = db.Column(db.DateTime)
+
+    zrodlo = db.relationship("ZrodloApi", foreign_keys=[zrodlo_id])
+
+    def __repr__(self) -> str:
+        return (
+            f"<CacheApi id={self.id} zrodlo_id={self.zrodlo_id} "
+            f"barcode={self.barcode} zapytanie={self.zapytanie!r}>"
+        )
@@ -1,12 +1,35 @@
 # backend/app/models/fridge_item.py
 # Model pozycji w lodówce – odwzorowanie tabeli "magazyn_pozycje_lodowki"
 
+import hashlib
 from datetime import datetime
+from sqlalchemy import event
 from ..extensions import db
 
 
+def compute_group_key(produkt_id, nazwa_wlasna, wazne_do):
+    """
+    Deterministyczny klucz grupy pozycji: SHA1 z (produkt_id, nazwa_wlasna, wazne_do).
+
+    Odpowiednik w MySQL (używany w migracji):
+    SHA1(CONCAT(COALESCE(produkt_id, ''), '|', COALESCE(CONCAT('n:', nazwa_wlasna), ''),
+                '|', COALESCE(wazne_do, '')))
+    Prefiks 'n:' odróżnia pustą nazwę od NULL.
+    """
+    raw = "|".join([
+        str(produkt_id) if produkt_id is not None else "",
+        f"n:{nazwa_wlasna}" if nazwa_wlasna is not None else "",
+        wazne_do.isoformat() if wazne_do is not None else "",
+    ])
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+
 class FridgeItem(db.Model):
     __tablename__ = "magazyn_pozycje_lodowki"  # dokładna nazwa tabeli w MySQL
+    __table_args__ = (
+        # wyszukiwanie grup i liczenie grup jako skan zakresu indeksu
+        db.Index("magazyn_pozycje_lodowki_index_14", "lodowka_id", "usunieto", "group_key"),
+    )
 
     # klucz główny
     id = db.Column(db.BigInteger, primary_key=True)
@@ -30,6 +53,9 @@ class FridgeItem(db.Model):
 
     # data ważności i sposób dodania
     wazne_do = db.Column(db.Date, nullable=True)
+
+    # klucz grupy (produkt_id, nazwa_wlasna, wazne_do) - utrzymywany automatycznie
+    group_key = db.Column(db.CHAR(40), nullable=False)
     jak_dodano_pozycje = db.Column(db.String(16), nullable=False, default="manual")
 
     # wartości odżywcze dla tej pozycji (opcjonalne)
@@ -65,3 +91,12 @@ class FridgeItem(db.Model):
 
     def __repr__(self) -> str:
         return f"<FridgeItem id={self.id} nazwa={self.nazwa_wlasna!r} ilosc={self.ilosc} {self.jednostka_g_ml_szt}>"
+
+
+@event.listens_for(FridgeItem, "before_insert")
+@event.listens_for(FridgeItem, "before_update")
+def _set_group_key(mapper, connection, target):
+    """Przelicza group_key przy każdym zapisie pozycji przez ORM."""
+    target.group_key = compute_group_key(
+        target.produkt_id, target.nazwa_wlasna, target.wazne_do
+    )
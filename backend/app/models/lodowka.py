@@ -10,6 +10,8 @@ class Lodowka(db.Model):
 
     id = db.Column(db.BigInteger, primary_key=True)
     nazwa = db.Column(db.String(190), nullable=False, default="Moja lodowka")
+    # Zwiększana przy każdej zmianie zawartości - wersja cache liczników dashboardu
+    wersja_zawartosci = db.Column(db.Integer, nullable=False, default=0, server_default="0")
     wlasciciel_id = db.Column(
         db.BigInteger, db.ForeignKey("uzytkownicy.id"), nullable=False
     )
@@ -5,7 +5,8 @@ from ..extensions import db
 class Log(db.Model):
     __tablename__ = "logi_zdarzen"
 
-    id = db.Column(db.BigInteger, primary_key=True)
+    # PK, AUTO_INCREMENT (w SQLite autoinkrementacja działa tylko dla INTEGER)
+    id = db.Column(db.BigInteger().with_variant(db.Integer, "sqlite"), primary_key=True)
 
     typ = db.Column(db.String(32), nullable=False)
     tabela = db.Column(db.String(64), nullable=False)
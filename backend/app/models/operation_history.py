@@ -11,7 +11,8 @@ class OperationHistory(db.Model):
     """
     __tablename__ = "historia_operacji_pozycji"
 
-    id = db.Column(db.BigInteger, primary_key=True)  # PK, AUTO_INCREMENT
+    # PK, AUTO_INCREMENT (w SQLite autoinkrementacja działa tylko dla INTEGER)
+    id = db.Column(db.BigInteger().with_variant(db.Integer, "sqlite"), primary_key=True)
     pozycja_id = db.Column(
         db.BigInteger,
         db.ForeignKey("magazyn_pozycje_lodowki.id"),
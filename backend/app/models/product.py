@@ -1,16 +1,64 @@
 # backend/app/models/product.py
 # Model słownika produktów – odwzorowanie tabeli "produkty" z bazy MySQL
 
+import re
+import unicodedata
+from sqlalchemy import event
 from ..extensions import db
 
 
+# Litery, których NFKD nie rozkłada na literę + znak diakrytyczny
+_EXTRA_LETTERS = str.maketrans({"ł": "l", "Ł": "l", "ß": "ss", "ø": "o", "æ": "ae", "œ": "oe"})
+
+# Jednostki doklejane do poprzedzającej liczby ("500 g" -> "500g")
+_UNITS = {"g", "kg", "mg", "ml", "l", "cl", "szt", "%"}
+
+_DECIMAL = re.compile(r"(\d+)[.,](\d+)")
+_TOKEN = re.compile(r"\d+(?:\.\d+)?|[a-z]+|%")
+
+
+def _canonical_decimal(match):
+    fraction = match.group(2).rstrip("0")
+    return f"{int(match.group(1))}.{fraction}" if fraction else str(int(match.group(1)))
+
+
+def normalize_name(text):
+    """
+    Klucz porównawczy nazwy produktu.
+
+    Małe litery bez polskich znaków, interpunkcja i wielokrotne spacje
+    usunięte, przecinek dziesiętny zamieniony na kropkę bez końcowych zer,
+    jednostka doklejona do liczby:
+    'Mleko 3,2%' i 'mleko  3.20 %' -> 'mleko 3.2%'
+    """
+    if not text:
+        return ""
+    text = unicodedata.normalize("NFKD", text.translate(_EXTRA_LETTERS).lower())
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    text = _DECIMAL.sub(_canonical_decimal, text)
+
+    tokens = []
+    for token in _TOKEN.findall(text):
+        if token in _UNITS and tokens and tokens[-1][-1].isdigit():
+            tokens[-1] += token
+        else:
+            tokens.append(token)
+    return " ".join(tokens)
+
+
 class Product(db.Model):
     __tablename__ = "produkty"  # dokładna nazwa tabeli z bazy
+    __table_args__ = (
+        # dopasowanie nazwy przy dodawaniu do lodówki (ProductService.match_product)
+        db.Index("produkty_index_nazwa_norm", "nazwa_norm"),
+    )
 
     id = db.Column(db.BigInteger, primary_key=True)  # klucz główny
 
     # poniższe pola odwzorowują najważniejsze kolumny z tabeli "produkty"
     nazwa = db.Column(db.String(190), nullable=False)
+    # normalize_name(nazwa) - utrzymywane przez zdarzenia ORM poniżej
+    nazwa_norm = db.Column(db.String(190))
     marka = db.Column(db.String(128))
     kategoria = db.Column(db.String(64))
     barcode_13cyf = db.Column(db.String(32))
@@ -28,3 +76,10 @@ class Product(db.Model):
 
     def __repr__(self) -> str:
         return f"<Product id={self.id} nazwa={self.nazwa!r}>"
+
+
+@event.listens_for(Product, "before_insert")
+@event.listens_for(Product, "before_update")
+def _set_nazwa_norm(mapper, connection, target):
+    """Przelicza nazwa_norm przy każdym zapisie produktu przez ORM."""
+    target.nazwa_norm = normalize_name(target.nazwa)[:190]
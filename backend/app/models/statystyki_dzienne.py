@@ -0,0 +1,39 @@
+from ..extensions import db
+
+
+class StatystykiDzienne(db.Model):
+    """
+    Mapuje tabelę `statystyki_operacji_dzienne`.
+
+    Dzienne sumy historii operacji na lodówkę, produkt, typ operacji
+    i rodzaj jednostki. Ilości w jednostkach bazowych (mg / µl /
+    tysięczne sztuki, jak app.services.quantity). Utrzymywane przy
+    każdym zapisie historii (FridgeService.record_history), odtwarzane
+    komendą `flask rebuild-statistics`.
+    """
+    __tablename__ = "statystyki_operacji_dzienne"
+    __table_args__ = (
+        db.UniqueConstraint(
+            "lodowka_id", "dzien", "grupa", "typ", "rodzaj",
+            name="statystyki_operacji_dzienne_klucz",
+        ),
+    )
+
+    # PK, AUTO_INCREMENT (w SQLite autoinkrementacja działa tylko dla INTEGER)
+    id = db.Column(db.BigInteger().with_variant(db.Integer, "sqlite"), primary_key=True)
+    lodowka_id = db.Column(db.BigInteger, db.ForeignKey("lodowka.id"), nullable=False)
+    dzien = db.Column(db.Date, nullable=False)
+    # 'p:<produkt_id>' albo 'n:<nazwa_wlasna po normalize_name>' dla pozycji bez produktu
+    grupa = db.Column(db.String(200), nullable=False)
+    produkt_id = db.Column(db.BigInteger, nullable=True)
+    nazwa = db.Column(db.String(190), nullable=True)  # nazwa do wyświetlenia
+    typ = db.Column(db.String(16), nullable=False)  # 'dodano' / 'zuzyto' / 'usunieto'
+    rodzaj = db.Column(db.String(8), nullable=False)  # 'weight' / 'volume' / 'piece'
+    liczba_operacji = db.Column(db.Integer, nullable=False, default=0)
+    ilosc_bazowa = db.Column(db.BigInteger, nullable=False, default=0)
+
+    def __repr__(self) -> str:
+        return (
+            f"<StatystykiDzienne lodowka_id={self.lodowka_id} dzien={self.dzien} "
+            f"grupa={self.grupa} typ={self.typ} liczba={self.liczba_operacji}>"
+        )
@@ -1,16 +1,28 @@
 # backend/app/models/wartosci_odzywcze.py
 # Model wartości odżywczych produktów - odwzorowanie tabeli "wartosci_odzywcze"
 
+from sqlalchemy.orm import deferred
+
 from ..extensions import db
 
 
 class WartosciOdzywcze(db.Model):
     __tablename__ = "wartosci_odzywcze"
 
-    id = db.Column(db.BigInteger, primary_key=True)
+    # Status pobierania danych z API (kolumna status)
+    STATUS_PENDING = "pending"
+    STATUS_OK = "ok"
+    STATUS_FAILED = "failed"
+    __table_args__ = (
+        db.UniqueConstraint("produkt_id", name="produkt_id"),
+    )
+
+    # PK, AUTO_INCREMENT (w SQLite autoinkrementacja działa tylko dla INTEGER)
+    id = db.Column(db.BigInteger().with_variant(db.Integer, "sqlite"), primary_key=True)
     produkt_id = db.Column(db.BigInteger, db.ForeignKey('produkty.id'), nullable=False)
     cache_id = db.Column(db.Integer, nullable=True)
     zrodlo_id = db.Column(db.BigInteger, nullable=True)
+    status = db.Column(db.String(16), nullable=False, default=STATUS_OK, server_default=STATUS_OK)
     
     # Wartości odżywcze na 100g
     na_100g_kcal = db.Column(db.Numeric(10, 3), nullable=True)
@@ -20,9 +32,10 @@ class WartosciOdzywcze(db.Model):
     na_100g_blonnik_g = db.Column(db.Numeric(10, 3), nullable=True)
     na_100g_sol_g = db.Column(db.Numeric(10, 3), nullable=True)
     
-    # Pełne dane JSON z API
-    odp_api = db.Column(db.JSON, nullable=True)
-    api = db.Column(db.JSON, nullable=True)
+    # Dane JSON z API - ładowane dopiero przy odczycie atrybutu
+    # albo z opcją undefer (np. undefer(WartosciOdzywcze.odp_api))
+    odp_api = deferred(db.Column(db.JSON, nullable=True), group="payload")
+    api = deferred(db.Column(db.JSON, nullable=True), group="payload")
     
     pobrano = db.Column(db.DateTime, nullable=True)
     zaktualizowano = db.Column(db.DateTime, nullable=False, server_default=db.func.current_timestamp())
@@ -31,4 +44,4 @@ class WartosciOdzywcze(db.Model):
     produkt = db.relationship('Product', backref=db.backref('wartosci_odzywcze', lazy=True))
 
     def __repr__(self) -> str:
-        return f"<WartosciOdzywcze produkt_id={self.produkt_id} kcal={self.na_100g_kcal}>"
+        return f"<WartosciOdzywcze produkt_id={self.produkt_id} status={self.status} kcal={self.na_100g_kcal}>"
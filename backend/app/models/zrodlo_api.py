@@ -0,0 +1,28 @@
+from datetime import datetime
+
+from ..extensions import db
+
+
+class ZrodloApi(db.Model):
+    """
+    Mapuje tabelę `zrodla_api`.
+
+    Rejestr dostawców danych zewnętrznych (np. OpenFoodFacts).
+    """
+    __tablename__ = "zrodla_api"
+
+    # Identyfikator OpenFoodFacts z danych startowych bazy
+    OPENFOODFACTS_ID = 1
+
+    id = db.Column(db.BigInteger().with_variant(db.Integer, "sqlite"), primary_key=True)
+    nazwa = db.Column(db.String(128), nullable=False, unique=True)
+    base_url = db.Column(db.String(255))
+    utworzono = db.Column(
+        db.DateTime,
+        nullable=False,
+        default=datetime.utcnow,
+        server_default=db.func.current_timestamp(),
+    )
+
+    def __repr__(self) -> str:
+        return f"<ZrodloApi id={self.id} nazwa={self.nazwa}>"
@@ -2,32 +2,45 @@
 # Blueprint dla AI Asystenta Kucharza
 # Integracja z lokalnym modelem Ollama (gemma3:4b)
 
-from flask import Blueprint, request, jsonify, render_template, redirect, url_for, flash
+from flask import (
+    Blueprint, Response, current_app, request, jsonify, render_template, redirect, url_for, flash,
+    stream_with_context,
+)
 from flask_jwt_extended import jwt_required, get_jwt_identity
+import json
 import requests
 from datetime import datetime
 from ..models import Lodowka, FridgeItem, Product
-from ..extensions import db
+from ..extensions import db, http
+from ..services.fridge_service import FridgeService
+from ..services.quantity import format_amount_display
+from ..services.product_service import ProductService
+from ..services.ollama_service import OllamaService
+from ..services.recipe_cache import RecipeCache
+from ..services.recipe_parser import RecipeStreamParser, parse_recipes
+from ..services.job_queue import JobQueue
 
 bp = Blueprint('ai', __name__, url_prefix='/ai')
 
-# Konfiguracja Ollama
-OLLAMA_API_URL = "http://127.0.0.1:11434/api/generate"
+# Konfiguracja Ollama (adres hosta w OLLAMA_BASE_URL - ten sam, który sprawdza OllamaService)
 OLLAMA_MODEL = "llama3.1:8b"
 
+# Wersja szablonu promptu - zmień przy każdej zmianie build_ai_prompt,
+# żeby cache przepisów nie zwracał odpowiedzi na stary prompt
+PROMPT_VERSION = 1
+
 
 def check_ollama_availability():
     """
     Sprawdza czy Ollama jest dostępna.
     
+    Korzysta z zapamiętanego stanu OllamaService (odświeżanego w tle),
+    więc przy niedziałającej Ollamie nie dokłada timeoutu do żądania.
+    
     Returns:
         bool: True jeśli Ollama działa, False w przeciwnym razie
     """
-    try:
-        response = requests.get("http://127.0.0.1:11434/api/tags", timeout=2)
-        return response.status_code == 200
-    except:
-        return False
+    return OllamaService.is_available()
 
 
 def calculate_recipes_count(products_count):
@@ -74,44 +87,33 @@ def get_user_fridge_items(user_id):
         - wazne_do
         - marka (jeśli dostępna)
     """
-    from collections import defaultdict
-    
     # Znajdź lodówkę użytkownika
-    lodowka = db.session.query(Lodowka)\
-        .filter(Lodowka.wlasciciel_id == user_id)\
-        .filter(Lodowka.usunieto.is_(None))\
-        .first()
+    lodowka = FridgeService.get_user_fridge(user_id)
     
     if not lodowka:
         return []
     
-    # Pobierz wszystkie aktywne pozycje z lodówki
-    all_items = db.session.query(FridgeItem)\
-        .filter(FridgeItem.lodowka_id == lodowka.id)\
-        .filter(FridgeItem.usunieto.is_(None))\
-        .all()
-    
-    # Grupowanie produktów po (produkt_id, nazwa_wlasna, wazne_do)
+    # Pobierz zgrupowane pozycje z lodówki (suma z konwersją jednostek g+kg, ml+l)
     # Klucz: (produkt_id, nazwa_wlasna, wazne_do)
-    grouped = defaultdict(lambda: {'ilosc': 0, 'jednostka': None, 'produkt_id': None})
-    
-    for item in all_items:
-        key = (item.produkt_id, item.nazwa_wlasna, item.wazne_do)
-        grouped[key]['ilosc'] += float(item.ilosc)
-        grouped[key]['jednostka'] = item.jednostka_g_ml_szt
-        grouped[key]['produkt_id'] = item.produkt_id
-        grouped[key]['wazne_do'] = item.wazne_do
-        grouped[key]['nazwa_wlasna'] = item.nazwa_wlasna
+    groups = FridgeService.get_grouped_items(lodowka.id)
+    products = ProductService.resolve_products(group['produkt_id'] for group in groups)
     
     # Formatuj dane dla AI
     fridge_contents = []
-    for key, data in grouped.items():
-        produkt_id, nazwa_wlasna, wazne_do = key
+    for group in groups:
+        produkt_id = group['produkt_id']
+        nazwa_wlasna = group['nazwa_wlasna']
+        wazne_do = group['wazne_do']
         
         # Pobierz informacje o produkcie z tabeli produkty
-        product = None
-        if produkt_id:
-            product = db.session.query(Product).get(produkt_id)
+        product, _ = products.get(produkt_id, (None, None))
+        
+        # Ilość w najlepszej jednostce wyświetlania
+        display_amount, display_unit = format_amount_display(
+            group['base_amount'],
+            group['unit_type']
+        )
+        ilosc = float(display_amount)
         
         # Nazwa produktu (z lodówki lub z tabeli produkty)
         nazwa = nazwa_wlasna or (product.nazwa if product else "Nieznany produkt")
@@ -120,7 +122,7 @@ def get_user_fridge_items(user_id):
         marka = product.marka if product else None
         
         # Formatuj opis produktu
-        opis = f"{data['ilosc']:.1f} {data['jednostka']} {nazwa}"
+        opis = f"{ilosc:.1f} {display_unit} {nazwa}"
         if marka:
             opis += f" ({marka})"
         if wazne_do:
@@ -128,8 +130,8 @@ def get_user_fridge_items(user_id):
         
         fridge_contents.append({
             'nazwa': nazwa,
-            'ilosc': data['ilosc'],
-            'jednostka': data['jednostka'],
+            'ilosc': ilosc,
+            'jednostka': display_unit,
             'wazne_do': wazne_do.strftime('%Y-%m-%d') if wazne_do else None,
             'marka': marka,
             'opis': opis
@@ -210,6 +212,11 @@ ZWRÓĆ TYLKO JSON, bez markdown, bez komentarzy!"""
     return prompt
 
 
+def ollama_generate_url():
+    """Adres /api/generate na hoście z OLLAMA_BASE_URL"""
+    return current_app.config['OLLAMA_BASE_URL'].rstrip('/') + '/api/generate'
+
+
 def call_ollama_api(prompt):
     """
     Wywołuje lokalny model Ollama i zwraca wygenerowaną odpowiedź.
@@ -228,12 +235,13 @@ def call_ollama_api(prompt):
             "format": "json"  # Wymusza format JSON
         }
         
-        response = requests.post(
-            OLLAMA_API_URL,
+        response = http.post(
+            ollama_generate_url(),
             json=payload,
-            timeout=120  # 2 minuty timeout dla większych odpowiedzi
+            read_timeout=120  # 2 minuty timeout dla większych odpowiedzi
         )
         response.raise_for_status()
+        OllamaService.record_success()
         
         data = response.json()
         
@@ -247,7 +255,6 @@ def call_ollama_api(prompt):
             }
         
         # Parsuj JSON z odpowiedzi
-        import json
         try:
             recipes_data = json.loads(ai_response)
             return {
@@ -255,18 +262,14 @@ def call_ollama_api(prompt):
                 'data': recipes_data
             }
         except json.JSONDecodeError as e:
-            # Jeśli JSON niepoprawny, spróbuj wyciągnąć JSON z tekstu
-            import re
-            json_match = re.search(r'\{.*\}', ai_response, re.DOTALL)
-            if json_match:
-                try:
-                    recipes_data = json.loads(json_match.group(0))
-                    return {
-                        'success': True,
-                        'data': recipes_data
-                    }
-                except:
-                    pass
+            # Jeśli JSON niepoprawny (np. ucięty lub otoczony tekstem),
+            # wyciągnij kompletne przepisy parserem przyrostowym
+            recipes = parse_recipes(ai_response)
+            if recipes:
+                return {
+                    'success': True,
+                    'data': {'recipes': recipes}
+                }
             
             return {
                 'success': False,
@@ -275,16 +278,20 @@ def call_ollama_api(prompt):
             }
         
     except requests.exceptions.Timeout:
+        OllamaService.record_failure()
         return {
             'success': False,
             'message': 'Przekroczono czas oczekiwania na odpowiedź z modelu AI (120s)'
         }
     except requests.exceptions.ConnectionError:
+        OllamaService.record_failure()
         return {
             'success': False,
-            'message': 'Nie można połączyć się z Ollama. Upewnij się, że Ollama działa na http://127.0.0.1:11434'
+            'message': f"Nie można połączyć się z Ollama. Upewnij się, że Ollama działa na {current_app.config['OLLAMA_BASE_URL']}"
         }
     except requests.exceptions.RequestException as e:
+        if isinstance(e, requests.exceptions.HTTPError):
+            OllamaService.record_http_error(e)
         return {
             'success': False,
             'message': f'Błąd komunikacji z Ollama: {str(e)}'
@@ -296,6 +303,44 @@ def call_ollama_api(prompt):
         }
 
 
+def stream_ollama_api(prompt):
+    """
+    Wywołuje lokalny model Ollama w trybie strumieniowym.
+    
+    Ollama zwraca NDJSON - każda linia to fragment odpowiedzi w polu
+    "response", ostatnia ma "done": true.
+    
+    Args:
+        prompt: Tekst promptu dla modelu
+        
+    Yields:
+        Kolejne fragmenty tekstu odpowiedzi
+        
+    Raises:
+        requests.exceptions.RequestException: Błąd połączenia lub HTTP
+    """
+    payload = {
+        "model": OLLAMA_MODEL,
+        "prompt": prompt,
+        "stream": True,
+        "format": "json"
+    }
+    
+    # Timeout odczytu dotyczy przerwy między fragmentami
+    with http.post(ollama_generate_url(), json=payload, stream=True, read_timeout=120) as response:
+        response.raise_for_status()
+        OllamaService.record_success()
+        
+        for line in response.iter_lines():
+            if not line:
+                continue
+            chunk = json.loads(line)
+            if chunk.get('response'):
+                yield chunk['response']
+            if chunk.get('done'):
+                break
+
+
 def generate_fallback_recipes(fridge_items, recipes_count, user_message=None):
     """
     Generuje przykładowe przepisy gdy Ollama nie jest dostępna.
@@ -458,6 +503,16 @@ def generate_fallback_recipes(fridge_items, recipes_count, user_message=None):
     }
 
 
+def build_fallback_message(user_message=None):
+    """
+    Komunikat wyświetlany nad przepisami zapasowymi
+    """
+    fallback_message = 'Ollama nie jest dostępna. Wyświetlam przykładowe przepisy. Aby uzyskać spersonalizowane przepisy AI, zainstaluj Ollama: https://ollama.com'
+    if user_message:
+        fallback_message += f'\n\nℹ️ W trybie podstawowym nie mogę uwzględnić Twoich wymagań: "{user_message}". Potrzebuję Ollama AI dla spersonalizowanych przepisów.'
+    return fallback_message
+
+
 @bp.route('/asystent-kucharza', methods=['GET'])
 @jwt_required()
 def chef_assistant_page():
@@ -482,6 +537,40 @@ def chef_assistant_page():
         return redirect(url_for('auth.dashboard'))
 
 
+def generate_ollama_recipes(fridge_items, recipes_count, user_message, cache_key):
+    """
+    Generuje przepisy przez Ollama (wykonywane w kolejce zadań 'ai').
+    
+    Gdy model nie zwróci przepisów, wynikiem są przepisy zapasowe.
+    
+    Returns:
+        Dict odpowiedzi jak w /ai/kucharz (bez success)
+    """
+    base = {
+        'recipes_count': recipes_count,
+        'products_count': len(fridge_items),
+        'fridge_items': [item['opis'] for item in fridge_items],
+    }
+    
+    # Zbuduj prompt dla AI i wywołaj Ollama API
+    prompt = build_ai_prompt(fridge_items, recipes_count, user_message)
+    ai_result = call_ollama_api(prompt)
+    
+    if ai_result['success']:
+        recipes = ai_result['data'].get('recipes', [])
+        if recipes:
+            RecipeCache.put(cache_key, recipes)
+            return dict(base, recipes=recipes, ai_mode='ollama')
+    
+    fallback_recipes = generate_fallback_recipes(fridge_items, recipes_count, user_message)
+    return dict(
+        base,
+        recipes=fallback_recipes.get('recipes', []),
+        ai_mode='fallback',
+        message=build_fallback_message(user_message)
+    )
+
+
 @bp.route('/kucharz', methods=['POST'])
 @jwt_required()
 def chef_assistant():
@@ -489,13 +578,26 @@ def chef_assistant():
     Endpoint AI Asystenta Kucharza.
     
     Pobiera produkty z lodówki użytkownika i generuje przepisy przy użyciu lokalnego AI (Ollama).
+    Generacja przez Ollama trafia do kolejki zadań w tle - odpowiedź 202 zawiera
+    job_id, a wynik jest dostępny pod /ai/jobs/<job_id>. Przepisy z cache
+    i przepisy zapasowe (Ollama niedostępna) wracają od razu (200).
+    Powtórzone żądanie tego samego użytkownika dla tej samej lodówki
+    i wiadomości, gdy poprzednie jeszcze trwa, dostaje to samo zadanie.
     
     Request JSON (opcjonalnie):
     {
         "user_message": "dodatkowe wymagania użytkownika"
     }
     
-    Response JSON:
+    Response JSON (202):
+    {
+        "success": true,
+        "job_id": "3f2a...",
+        "status": "queued",
+        "status_url": "/ai/jobs/3f2a..."
+    }
+    
+    Response JSON (200):
     {
         "success": true,
         "recipes_count": 4,
@@ -521,7 +623,8 @@ def chef_assistant():
             data = request.get_json()
             user_message = data.get('user_message') if data else None
         
-        # Pobierz produkty z lodówki użytkownika
+        # Pobierz produkty z lodówki użytkownika (w wątku żądania - zadanie
+        # w tle nie korzysta z sesji bazy)
         fridge_items = get_user_fridge_items(user_id)
         
         if not fridge_items:
@@ -540,36 +643,48 @@ def chef_assistant():
                 'message': 'Zbyt mało produktów w lodówce. Potrzebujesz co najmniej 2 produkty.'
             }), 400
         
-        # Sprawdź czy Ollama jest dostępna
-        ollama_available = check_ollama_availability()
+        # Przepisy dla tej samej zawartości lodówki i wiadomości z cache
+        cache_key = RecipeCache.make_key(fridge_items, user_message, OLLAMA_MODEL, PROMPT_VERSION)
+        cached_recipes = RecipeCache.get(cache_key)
+        if cached_recipes is not None:
+            return jsonify({
+                'success': True,
+                'recipes_count': recipes_count,
+                'products_count': products_count,
+                'fridge_items': [item['opis'] for item in fridge_items],
+                'recipes': cached_recipes,
+                'ai_mode': 'ollama',
+                'cached': True
+            })
         
-        if ollama_available:
-            # Zbuduj prompt dla AI
-            prompt = build_ai_prompt(fridge_items, recipes_count, user_message)
-            
-            # Wywołaj Ollama API
-            ai_result = call_ollama_api(prompt)
-            
-            if ai_result['success']:
-                # Przygotuj odpowiedź z AI
-                recipes_data = ai_result['data']
-                
+        # Sprawdź czy Ollama jest dostępna - jeśli tak, generacja w tle
+        if check_ollama_availability():
+            try:
+                job = JobQueue.submit(
+                    'ai',
+                    generate_ollama_recipes,
+                    fridge_items, recipes_count, user_message, cache_key,
+                    key=(user_id, cache_key),
+                    owner_id=user_id
+                )
+            except ValueError as e:
                 return jsonify({
-                    'success': True,
-                    'recipes_count': recipes_count,
-                    'products_count': products_count,
-                    'fridge_items': [item['opis'] for item in fridge_items],
-                    'recipes': recipes_data.get('recipes', []),
-                    'ai_mode': 'ollama'
-                })
+                    'success': False,
+                    'message': str(e)
+                }), 503
+            
+            return jsonify({
+                'success': True,
+                'job_id': job['id'],
+                'status': job['status'],
+                'status_url': url_for('ai.job_status', job_id=job['id'])
+            }), 202
         
         # Fallback: Użyj prostych przepisów gdy Ollama nie działa
         fallback_recipes = generate_fallback_recipes(fridge_items, recipes_count, user_message)
         
         # Dodaj komunikat o wymaganiach użytkownika jeśli były podane
-        fallback_message = 'Ollama nie jest dostępna. Wyświetlam przykładowe przepisy. Aby uzyskać spersonalizowane przepisy AI, zainstaluj Ollama: https://ollama.com'
-        if user_message:
-            fallback_message += f'\n\nℹ️ W trybie podstawowym nie mogę uwzględnić Twoich wymagań: "{user_message}". Potrzebuję Ollama AI dla spersonalizowanych przepisów.'
+        fallback_message = build_fallback_message(user_message)
         
         return jsonify({
             'success': True,
@@ -586,3 +701,174 @@ def chef_assistant():
             'success': False,
             'message': f'Błąd serwera: {str(e)}'
         }), 500
+
+
+@bp.route('/jobs/<job_id>', methods=['GET'])
+@jwt_required()
+def job_status(job_id):
+    """
+    Status zadania generowania przepisów.
+    
+    Response JSON:
+    {
+        "success": true,
+        "job_id": "3f2a...",
+        "status": "queued" | "running" | "done" | "failed",
+        ... pola odpowiedzi /ai/kucharz gdy status == "done"
+    }
+    """
+    job = JobQueue.get(job_id, owner_id=get_jwt_identity())
+    
+    if job is None:
+        return jsonify({
+            'success': False,
+            'message': 'Zadanie nie istnieje lub wygasło'
+        }), 404
+    
+    if job['status'] == 'failed':
+        return jsonify({
+            'success': False,
+            'job_id': job['id'],
+            'status': job['status'],
+            'message': f"Błąd generowania przepisów: {job['error']}"
+        }), 500
+    
+    response = {
+        'success': True,
+        'job_id': job['id'],
+        'status': job['status']
+    }
+    if job['status'] == 'done':
+        response.update(job['result'])
+    return jsonify(response)
+
+
+@bp.route('/kucharz/stream', methods=['POST'])
+@jwt_required()
+def chef_assistant_stream():
+    """
+    Strumieniowa wersja endpointu AI Asystenta Kucharza.
+    
+    Odpowiedź to NDJSON (application/x-ndjson) - jedno zdarzenie na linię:
+        {"type": "meta", "recipes_count": 4, "products_count": 6, "fridge_items": [...]}
+        {"type": "mode", "ai_mode": "ollama" | "fallback", "message": "...", "cached": false}
+        {"type": "recipe", "index": 0, "recipe": {...}}
+        {"type": "done", "ai_mode": "ollama" | "fallback"}
+    
+    Każdy przepis jest wysyłany, gdy tylko model domknie jego obiekt JSON,
+    więc pierwszy przepis pojawia się po kilku sekundach zamiast po całej
+    generacji. Błędy walidacji (pusta lodówka) zwracają zwykły JSON 400,
+    a zajęta pula modelu AI (JOB_WORKERS['ai']) - JSON 429 z Retry-After.
+    """
+    user_id = get_jwt_identity()
+    
+    user_message = None
+    if request.is_json and request.data:
+        data = request.get_json()
+        user_message = data.get('user_message') if data else None
+    
+    # Dane z bazy pobieramy przed rozpoczęciem strumienia
+    fridge_items = get_user_fridge_items(user_id)
+    
+    if not fridge_items:
+        return jsonify({
+            'success': False,
+            'message': 'Twoja lodówka jest pusta. Dodaj produkty, aby wygenerować przepisy.'
+        }), 400
+    
+    products_count = len(fridge_items)
+    recipes_count = calculate_recipes_count(products_count)
+    
+    if recipes_count == 0:
+        return jsonify({
+            'success': False,
+            'message': 'Zbyt mało produktów w lodówce. Potrzebujesz co najmniej 2 produkty.'
+        }), 400
+    
+    cache_key = RecipeCache.make_key(fridge_items, user_message, OLLAMA_MODEL, PROMPT_VERSION)
+    cached_recipes = RecipeCache.get(cache_key)
+    use_ollama = cached_recipes is None and check_ollama_availability()
+    
+    # Generowanie zajmuje miejsce w puli kolejki 'ai' (JOB_WORKERS['ai']),
+    # wspólnej z /ai/kucharz - przy pełnej puli odmawiamy przed strumieniem
+    slot = {'held': False}
+    if use_ollama:
+        if not JobQueue.try_acquire('ai'):
+            response = jsonify({
+                'success': False,
+                'message': 'Asystent Kucharza przygotowuje teraz inne przepisy. Spróbuj ponownie za chwilę.'
+            })
+            response.headers['Retry-After'] = '10'
+            return response, 429
+        slot['held'] = True
+    
+    def release_slot():
+        if slot['held']:
+            slot['held'] = False
+            JobQueue.release('ai')
+    
+    def event(payload):
+        return json.dumps(payload, ensure_ascii=False, default=str) + '\n'
+    
+    def generate():
+        yield event({
+            'type': 'meta',
+            'recipes_count': recipes_count,
+            'products_count': products_count,
+            'fridge_items': [item['opis'] for item in fridge_items],
+        })
+        
+        if cached_recipes is not None:
+            yield event({'type': 'mode', 'ai_mode': 'ollama', 'cached': True})
+            for index, recipe in enumerate(cached_recipes):
+                yield event({'type': 'recipe', 'index': index, 'recipe': recipe})
+            yield event({'type': 'done', 'ai_mode': 'ollama'})
+            return
+        
+        recipes = []
+        if use_ollama:
+            yield event({'type': 'mode', 'ai_mode': 'ollama', 'cached': False})
+            parser = RecipeStreamParser()
+            completed = False
+            try:
+                prompt = build_ai_prompt(fridge_items, recipes_count, user_message)
+                for fragment in stream_ollama_api(prompt):
+                    for recipe in parser.feed(fragment):
+                        yield event({'type': 'recipe', 'index': len(recipes), 'recipe': recipe})
+                        recipes.append(recipe)
+                completed = True
+            except (requests.exceptions.Timeout, requests.exceptions.ConnectionError):
+                OllamaService.record_failure()
+            except requests.exceptions.HTTPError as e:
+                OllamaService.record_http_error(e)
+            except (requests.exceptions.RequestException, ValueError):
+                pass
+            finally:
+                release_slot()
+            
+            if recipes:
+                # Do cache trafia tylko pełna odpowiedź
+                if completed:
+                    RecipeCache.put(cache_key, recipes)
+                yield event({'type': 'done', 'ai_mode': 'ollama'})
+                return
+        
+        # Fallback: Ollama niedostępna lub nie zwróciła żadnego przepisu
+        fallback_recipes = generate_fallback_recipes(fridge_items, recipes_count, user_message)
+        yield event({
+            'type': 'mode',
+            'ai_mode': 'fallback',
+            'message': build_fallback_message(user_message),
+        })
+        for index, recipe in enumerate(fallback_recipes.get('recipes', [])):
+            yield event({'type': 'recipe', 'index': index, 'recipe': recipe})
+        yield event({'type': 'done', 'ai_mode': 'fallback'})
+    
+    response = Response(
+        stream_with_context(generate()),
+        mimetype='application/x-ndjson',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+    # Klient mógł się rozłączyć, zanim strumień doszedł do generowania
+    response.call_on_close(release_slot)
+    return response
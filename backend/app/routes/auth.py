@@ -159,13 +159,14 @@ def account_page():
     """
     Panel użytkownika - Moje konto
     """
-    from ..models import User, Lodowka, FridgeItem, OperationHistory
+    from ..models import Lodowka, FridgeItem
+    from ..services.statistics_service import StatisticsService
     from .. import db
     
     current_user_id = int(get_jwt_identity())
     
     # Pobierz dane użytkownika
-    user = db.session.query(User).get(current_user_id)
+    user = AuthService.get_user_by_id(current_user_id)
     
     if not user:
         flash('Nie znaleziono użytkownika', 'error')
@@ -173,19 +174,9 @@ def account_page():
     
     # Statystyki
     # Liczba aktywnych produktów (zgrupowanych jak w widoku lodówki)
-    # Liczymy DISTINCT po (produkt_id, nazwa_wlasna, wazne_do)
+    # Liczymy DISTINCT po group_key = (produkt_id, nazwa_wlasna, wazne_do)
     active_products = db.session.query(
-        func.count(
-            func.distinct(
-                func.concat(
-                    func.coalesce(FridgeItem.produkt_id, 0),
-                    '|',
-                    func.coalesce(FridgeItem.nazwa_wlasna, ''),
-                    '|',
-                    func.coalesce(FridgeItem.wazne_do, '')
-                )
-            )
-        )
+        func.count(func.distinct(FridgeItem.group_key))
     ).join(
         Lodowka, FridgeItem.lodowka_id == Lodowka.id
     ).filter(
@@ -200,14 +191,8 @@ def account_page():
         Lodowka.wlasciciel_id == current_user_id
     ).count()
     
-    # Liczba operacji
-    total_operations = db.session.query(OperationHistory).join(
-        FridgeItem, OperationHistory.pozycja_id == FridgeItem.id
-    ).join(
-        Lodowka, FridgeItem.lodowka_id == Lodowka.id
-    ).filter(
-        Lodowka.wlasciciel_id == current_user_id
-    ).count()
+    # Liczba operacji - z dziennych statystyk zamiast liczenia całej historii
+    total_operations = StatisticsService.count_operations(current_user_id)
     
     stats = {
         'active_products': active_products,
@@ -224,13 +209,12 @@ def update_profile():
     """
     Aktualizacja danych profilu użytkownika
     """
-    from ..models import User
     from .. import db
     from datetime import datetime
     
     current_user_id = int(get_jwt_identity())
     
-    user = db.session.query(User).get(current_user_id)
+    user = AuthService.get_user_by_id(current_user_id)
     
     if not user:
         flash('Nie znaleziono użytkownika', 'error')
@@ -250,6 +234,7 @@ def update_profile():
     
     try:
         db.session.commit()
+        AuthService.invalidate_display_name(current_user_id)
         flash('Dane zostały zaktualizowane pomyślnie', 'success')
     except Exception as e:
         db.session.rollback()
@@ -264,14 +249,13 @@ def change_password():
     """
     Zmiana hasła użytkownika
     """
-    from ..models import User
     from .. import db
     from werkzeug.security import check_password_hash, generate_password_hash
     from datetime import datetime
     
     current_user_id = int(get_jwt_identity())
     
-    user = db.session.query(User).get(current_user_id)
+    user = AuthService.get_user_by_id(current_user_id)
     
     if not user:
         flash('Nie znaleziono użytkownika', 'error')
@@ -4,66 +4,16 @@
 from flask import Blueprint, request, jsonify, render_template, redirect, url_for
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from datetime import datetime, timedelta, date
-from decimal import Decimal
-from sqlalchemy import func
-from ..models import FridgeItem, Lodowka, User, Product
+from decimal import Decimal, InvalidOperation
+from ..models import FridgeItem, Lodowka, User
 from ..extensions import db
+from ..services.fridge_service import FridgeService
+from ..services.quantity import format_amount_display
+from ..services.product_service import ProductService
 
 bp = Blueprint('fridge', __name__, url_prefix='/fridge')
 
 
-# ==================== FUNKCJE POMOCNICZE ====================
-
-def normalize_to_base_unit(amount, unit):
-    """
-    Normalizuje ilość do podstawowej jednostki dla precyzyjnego sumowania.
-    - g, kg → mg (miligramy)
-    - ml, l → µl (mikrolitry)
-    - szt → szt (bez zmian)
-    
-    Returns: (amount_in_base_unit, base_unit_type)
-    """
-    if unit in ['g', 'kg']:
-        # Waga: mg jako podstawa
-        if unit == 'kg':
-            return amount * 1000000, 'weight'  # 1kg = 1000g = 1000000mg
-        else:  # unit == 'g'
-            return amount * 1000, 'weight'  # 1g = 1000mg
-    elif unit in ['ml', 'l']:
-        # Objętość: µl jako podstawa
-        if unit == 'l':
-            return amount * 1000000, 'volume'  # 1l = 1000ml = 1000000µl
-        else:  # unit == 'ml'
-            return amount * 1000, 'volume'  # 1ml = 1000µl
-    else:  # unit == 'szt'
-        return amount, 'piece'
-
-
-def format_amount_display(amount_mg_or_ul, unit_type):
-    """
-    Formatuje ilość do najlepszej jednostki wyświetlania.
-    - weight: mg → g lub kg
-    - volume: µl → ml lub l
-    - piece: bez zmian
-    
-    Returns: (formatted_amount, display_unit)
-    """
-    if unit_type == 'weight':
-        # amount_mg_or_ul jest w miligramach
-        if amount_mg_or_ul >= 1000000:  # >= 1kg
-            return round(amount_mg_or_ul / 1000000, 2), 'kg'
-        else:
-            return round(amount_mg_or_ul / 1000, 1), 'g'
-    elif unit_type == 'volume':
-        # amount_mg_or_ul jest w mikrolitrach
-        if amount_mg_or_ul >= 1000000:  # >= 1l
-            return round(amount_mg_or_ul / 1000000, 2), 'l'
-        else:
-            return round(amount_mg_or_ul / 1000, 1), 'ml'
-    else:  # piece
-        return int(amount_mg_or_ul), 'szt'
-
-
 @bp.route('/', methods=['GET'])
 @jwt_required(optional=True)
 def fridge_page():
@@ -89,50 +39,18 @@ def fridge_page():
         return redirect(url_for('auth.login_page'))
     
     # Znajdź lodówkę użytkownika
-    lodowka = (
-        db.session.query(Lodowka)
-        .filter(Lodowka.wlasciciel_id == user_id)
-        .filter(Lodowka.usunieto.is_(None))
-        .first()
-    )
+    lodowka = FridgeService.get_user_fridge(user_id)
     
     if not lodowka:
         # Jeśli użytkownik nie ma lodówki, renderuj pustą stronę
         return render_template('fridge.html', items=[])
     
-    # Pobierz wszystkie aktywne pozycje w lodówce użytkownika
-    # UWAGA: Sumujemy ręcznie z konwersją jednostek (g+kg, ml+l)
-    all_items = (
-        db.session.query(FridgeItem)
-        .filter(FridgeItem.lodowka_id == lodowka.id)
-        .filter(FridgeItem.usunieto.is_(None))
-        .all()
-    )
-    
-    # Grupowanie ręczne z konwersją jednostek
-    # Klucz: (produkt_id, nazwa_wlasna, wazne_do)
-    # Wartość: {amount_in_base: float, unit_type: str, repr_id: int}
-    grouped = {}
+    # Pobierz zgrupowane pozycje (sumowanie z konwersją jednostek g+kg, ml+l po stronie bazy)
+    # Klucz grupy: (produkt_id, nazwa_wlasna, wazne_do)
+    groups = FridgeService.get_grouped_items(lodowka.id)
     
-    for item in all_items:
-        # Klucz grupowania: produkt + data ważności
-        key = (item.produkt_id, item.nazwa_wlasna, item.wazne_do)
-        
-        # Normalizuj do jednostki podstawowej
-        base_amount, unit_type = normalize_to_base_unit(
-            item.ilosc, 
-            item.jednostka_g_ml_szt
-        )
-        
-        if key not in grouped:
-            grouped[key] = {
-                'base_amount': 0,
-                'unit_type': unit_type,
-                'repr_id': item.id
-            }
-        
-        # Sumuj w jednostce podstawowej
-        grouped[key]['base_amount'] += base_amount
+    # Wszystkie produkty ze strony jednym zapytaniem (zamiast Product.get w pętli)
+    products = ProductService.resolve_products(group['produkt_id'] for group in groups)
     
     # Przygotuj dane dla template
     items_data = []
@@ -140,20 +58,21 @@ def fridge_page():
     jutro = dzisiaj + timedelta(days=1)
     pojutrze = dzisiaj + timedelta(days=2)
     
-    for key, data in grouped.items():
-        produkt_id, nazwa_wlasna, wazne_do = key
+    for group in groups:
+        produkt_id = group['produkt_id']
+        nazwa_wlasna = group['nazwa_wlasna']
+        wazne_do = group['wazne_do']
         
         # Pobierz nazwę produktu z tabeli produkty jeśli istnieje
         display_name = nazwa_wlasna
-        if produkt_id:
-            product = db.session.query(Product).get(produkt_id)
-            if product:
-                display_name = f"{product.nazwa} ({product.marka or 'bez marki'})"
+        if produkt_id in products:
+            product, _ = products[produkt_id]
+            display_name = f"{product.nazwa} ({product.marka or 'bez marki'})"
         
         # Sformatuj ilość do najlepszej jednostki
         display_amount, display_unit = format_amount_display(
-            data['base_amount'],
-            data['unit_type']
+            group['base_amount'],
+            group['unit_type']
         )
         
         # Określ status wygasania
@@ -169,7 +88,7 @@ def fridge_page():
                 expiry_status = "soon"  # jasnopomarańczowy
         
         items_data.append({
-            'id': data['repr_id'],
+            'id': group['repr_id'],
             'produkt_id': produkt_id,
             'nazwa': display_name or 'Produkt bez nazwy',
             'nazwa_wlasna': nazwa_wlasna,
@@ -184,102 +103,71 @@ def fridge_page():
 
 # ==================== NOWE ENDPOINTY API ====================
 
+def _user_fridge_summary(user_id):
+    """
+    Liczniki dashboardu dla lodówki użytkownika (zera gdy brak lodówki).
+    """
+    lodowka = FridgeService.get_user_fridge(user_id)
+    if not lodowka:
+        return {'count': 0, 'expiring_soon_count': 0, 'expired_count': 0}
+    return FridgeService.get_summary(lodowka.id)
+
+
+@bp.route('/api/summary', methods=['GET'])
+@jwt_required()
+def get_fridge_summary():
+    """
+    API endpoint - zwraca wszystkie liczniki dashboardu naraz.
+    
+    Zwraca:
+    - count: liczba zgrupowanych produktów (grupowanie jak w widoku lodówki:
+      produkt_id, nazwa_wlasna, wazne_do)
+    - expiring_soon_count: liczba produktów wygasających jutro
+    - expired_count: liczba przeterminowanych produktów
+    
+    Liczniki pochodzą z jednego zapytania i są cache'owane per lodówka
+    (FridgeService.get_summary).
+    """
+    user_id = int(get_jwt_identity())
+    return jsonify(_user_fridge_summary(user_id))
+
+
 @bp.route('/api/count', methods=['GET'])
 @jwt_required()
 def get_fridge_count():
     """
-    API endpoint - zwraca liczb\u0119 aktywnych produktów w lodówce użytkownika.
+    API endpoint - zwraca liczbę aktywnych produktów w lodówce użytkownika.
     
-    Zlicza produkty z tabeli magazyn_pozycje_lodowki gdzie:
-    - lodowka.wlasciciel_id = user_id (zalogowany użytkownik)
-    - magazyn_pozycje_lodowki.usunieto IS NULL (nie usunięte)
+    Liczy produkty zgrupowane tak, jak są wyświetlane w widoku lodówki
+    (grupowanie po produkt_id, nazwa_wlasna, wazne_do).
+    Zalecane: /api/summary zwraca wszystkie liczniki jednym żądaniem.
     """
     user_id = int(get_jwt_identity())
-    
-    # Zlicz produkty w lodówce użytkownika
-    # Używamy COUNT(DISTINCT ...) aby liczyć zgrupowane produkty,
-    # tak jak są wyświetlane w widoku lodówki (grupowanie po produkt_id, nazwa_wlasna, wazne_do)
-    count = (
-        db.session.query(
-            func.count(
-                func.distinct(
-                    func.concat(
-                        func.coalesce(FridgeItem.produkt_id, 0),
-                        '|',
-                        func.coalesce(FridgeItem.nazwa_wlasna, ''),
-                        '|',
-                        func.coalesce(FridgeItem.wazne_do, '')
-                    )
-                )
-            )
-        )
-        .join(Lodowka, FridgeItem.lodowka_id == Lodowka.id)
-        .filter(Lodowka.wlasciciel_id == user_id)
-        .filter(FridgeItem.usunieto.is_(None))
-        .scalar()
-    )
-    
-    return jsonify({"count": count or 0})
+    return jsonify({"count": _user_fridge_summary(user_id)['count']})
 
 
 @bp.route('/api/expiring_soon_count', methods=['GET'])
 @jwt_required()
 def get_expiring_soon_count():
     """
-    API endpoint - zwraca liczb\u0119 produktów wygasających jutro.
+    API endpoint - zwraca liczbę produktów wygasających jutro.
     
-    Zlicza produkty gdzie:
-    - wazne_do == jutro (tylko data, bez czasu)
-    - lodowka.wlasciciel_id = user_id
-    - usunieto IS NULL
+    Zalecane: /api/summary zwraca wszystkie liczniki jednym żądaniem.
     """
     user_id = int(get_jwt_identity())
-    
-    # Oblicz datę jutrzejszą
-    jutro = date.today() + timedelta(days=1)
-    
-    # Zlicz produkty wygasające jutro
-    count = (
-        db.session.query(func.count(FridgeItem.id))
-        .join(Lodowka, FridgeItem.lodowka_id == Lodowka.id)
-        .filter(Lodowka.wlasciciel_id == user_id)
-        .filter(FridgeItem.usunieto.is_(None))
-        .filter(FridgeItem.wazne_do.isnot(None))
-        .filter(FridgeItem.wazne_do == jutro)
-        .scalar()
-    )
-    
-    return jsonify({"count": count or 0})
+    return jsonify({"count": _user_fridge_summary(user_id)['expiring_soon_count']})
 
 
 @bp.route('/api/expired_count', methods=['GET'])
 @jwt_required()
 def get_expired_count():
     """
-    API endpoint - zwraca liczb\u0119 przeterminowanych produktów.
+    API endpoint - zwraca liczbę przeterminowanych produktów.
     
-    Zlicza produkty gdzie:
-    - wazne_do < dzisiaj
-    - lodowka.wlasciciel_id = user_id
-    - usunieto IS NULL
+    Zalecane: /api/summary zwraca wszystkie liczniki jednym żądaniem.
     """
     user_id = int(get_jwt_identity())
-    
-    # Dzisiejsza data
-    dzisiaj = date.today()
-    
-    # Zlicz przeterminowane produkty
-    count = (
-        db.session.query(func.count(FridgeItem.id))
-        .join(Lodowka, FridgeItem.lodowka_id == Lodowka.id)
-        .filter(Lodowka.wlasciciel_id == user_id)
-        .filter(FridgeItem.usunieto.is_(None))
-        .filter(FridgeItem.wazne_do.isnot(None))
-        .filter(FridgeItem.wazne_do < dzisiaj)
-        .scalar()
-    )
-    
-    return jsonify({"count": count or 0})
+    return jsonify({"count": _user_fridge_summary(user_id)['expired_count']})
 
 
 # ==================== DODAWANIE PRODUKTÓW ====================
@@ -371,16 +259,18 @@ def add_fridge_item():
         db.session.add(lodowka)
         db.session.flush()  # Generuje ID
     
-    # Wyszukaj produkt po barcode lub nazwie
-    product = None
-    if barcode:
-        product = db.session.query(Product).filter(Product.barcode_13cyf == barcode).first()
-    if not product:
-        product = db.session.query(Product).filter(Product.nazwa == nazwa).first()
+    # Wyszukaj produkt po barcode, znormalizowanej nazwie lub podobieństwie nazwy
+    product, matched_by = ProductService.match_product(nazwa, barcode)
+    suggestion = None
+    if matched_by == 'name':
+        # Nazwa ze słownika - 'mleko 3.2 %' trafia do tej samej grupy co 'Mleko 3,2%'
+        nazwa = product.nazwa
+    elif matched_by == 'fuzzy':
+        # Podobna nazwa może być innym produktem - zostaje wpisana nazwa,
+        # a produkt ze słownika jest tylko podpowiadany
+        suggestion, product = product.nazwa, None
     
     # Stwórz nową pozycję w lodówce
-    from ..models import OperationHistory
-    
     new_item = FridgeItem(
         lodowka_id=lodowka.id,
         produkt_id=product.id if product else None,
@@ -395,20 +285,24 @@ def add_fridge_item():
     db.session.add(new_item)
     db.session.flush()  # Generuje ID
     
-    # Zapisz w historii operacji
-    history_entry = OperationHistory(
-        pozycja_id=new_item.id,
-        typ='dodano',
-        ilosc=ilosc,
-        jednostka_g_ml_szt=jednostka,
-        komentarz='Dodano pozycję',
-        uzytkownik_id=user_id
-    )
-    db.session.add(history_entry)
+    # Zapisz w historii operacji (i w dziennych statystykach)
+    FridgeService.record_history([{
+        'pozycja_id': new_item.id,
+        'typ': 'dodano',
+        'ilosc': ilosc,
+        'jednostka_g_ml_szt': jednostka,
+        'komentarz': 'Dodano pozycję',
+        'uzytkownik_id': user_id,
+        'utworzono': datetime.utcnow()
+    }])
     
     try:
         db.session.commit()
-        return render_template('fridge_add.html', success='Produkt został dodany!'), 200
+        FridgeService.invalidate_summary(lodowka.id)
+        success = 'Produkt został dodany!'
+        if suggestion:
+            success += f' Podobny produkt w słowniku: {suggestion}'
+        return render_template('fridge_add.html', success=success), 200
     except Exception as e:
         db.session.rollback()
         return render_template('fridge_add.html', error=f'Błąd: {str(e)}'), 500
@@ -428,11 +322,13 @@ def consume_fridge_item(item_id):
     
     Proces:
     1. Sprawdź uprawnienia użytkownika
-    2. Pobierz wszystkie pozycje z grupy (ten sam produkt + data ważności)
+    2. Zablokuj (FOR UPDATE) pozycje z grupy (ten sam produkt + data ważności)
     3. Przekonwertuj ilość do zużycia z jednostki wyświetlanej do bazowej
     4. Rozdziel zużycie proporcjonalnie między pozycje
-    5. Zmniejsz ilość w magazynie, usuń pozycje z ilością <= 0
-    6. Zapisz w historia_operacji_pozycji
+    5. Zmniejsz ilość w magazynie jednym UPDATE, usuń pozycje z ilością <= 0
+    6. Zapisz w historia_operacji_pozycji jednym INSERT
+    
+    Logika zbiorowa jest w FridgeService.consume_from_group.
     """
     from flask import flash
     
@@ -459,99 +355,29 @@ def consume_fridge_item(item_id):
     # Pobierz ilość do zużycia (w jednostce WYŚWIETLANEJ)
     ilosc_str = request.form.get('ilosc')
     try:
-        ilosc_do_zuzycia_display = float(ilosc_str)
-        if ilosc_do_zuzycia_display <= 0:
+        ilosc_do_zuzycia_display = Decimal(ilosc_str)
+        if not ilosc_do_zuzycia_display.is_finite() or ilosc_do_zuzycia_display <= 0:
             raise ValueError()
-    except (ValueError, TypeError):
+    except (ValueError, TypeError, InvalidOperation):
         return "Nieprawidłowa ilość", 400
     
-    # Znajdź wszystkie pozycje z tej samej grupy
-    # WAŻNE: Grupujemy po (produkt_id, nazwa_wlasna, wazne_do)
-    group_items = (
-        db.session.query(FridgeItem)
-        .filter(FridgeItem.lodowka_id == lodowka.id)
-        .filter(FridgeItem.usunieto.is_(None))
-        .filter(FridgeItem.produkt_id == item.produkt_id)
-        .filter(FridgeItem.nazwa_wlasna == item.nazwa_wlasna)
-        .filter(FridgeItem.wazne_do == item.wazne_do)
-        .all()
-    )
+    # Zużyj z całej grupy (produkt_id, nazwa_wlasna, wazne_do) - group_key
+    # Pozycje są blokowane (FOR UPDATE) do końca transakcji
+    try:
+        consumed = FridgeService.consume_from_group(
+            lodowka.id, item.group_key, ilosc_do_zuzycia_display, user_id
+        )
+    except ValueError as e:
+        db.session.rollback()
+        return str(e), 400
     
-    if not group_items:
+    if not consumed:
+        db.session.rollback()
         return "Nie znaleziono pozycji do zużycia", 404
     
-    # Oblicz sumę w jednostce bazowej
-    total_base = 0
-    unit_type = None
-    for pos in group_items:
-        base, utype = normalize_to_base_unit(pos.ilosc, pos.jednostka_g_ml_szt)
-        total_base += base
-        if unit_type is None:
-            unit_type = utype
-    
-    # Określ jednostkę wyświetlaną (jaka była użyta)
-    display_amount, display_unit = format_amount_display(total_base, unit_type)
-    
-    # Przekonwertuj ilość do zużycia z jednostki wyświetlanej do bazowej
-    # np. użytkownik wpisał "1.2" i jednostka wyświetlana to "kg"
-    # musimy przekonwertować 1.2 kg -> mg
-    to_consume_base, _ = normalize_to_base_unit(ilosc_do_zuzycia_display, display_unit)
-    
-    # Sprawdź czy nie zużywamy więcej niż mamy
-    if to_consume_base > total_base:
-        return "Nie możesz zużyć więcej niż posiadasz", 400
-    
-    from ..models import OperationHistory
-    
-    # Rozdziel zużycie proporcjonalnie między pozycje
-    remaining_to_consume = to_consume_base
-    
-    for pos in group_items:
-        if remaining_to_consume <= 0:
-            break
-        
-        # Ile ma ta pozycja w jednostce bazowej?
-        pos_base, _ = normalize_to_base_unit(pos.ilosc, pos.jednostka_g_ml_szt)
-        
-        # Ile zużywamy z tej pozycji?
-        consume_from_this = min(remaining_to_consume, pos_base)
-        
-        # Przekonwertuj z jednostki bazowej na oryginalną
-        if pos.jednostka_g_ml_szt in ['g', 'kg']:
-            if pos.jednostka_g_ml_szt == 'kg':
-                consumed_in_original = Decimal(str(consume_from_this / 1000000))
-            else:  # g
-                consumed_in_original = Decimal(str(consume_from_this / 1000))
-        elif pos.jednostka_g_ml_szt in ['ml', 'l']:
-            if pos.jednostka_g_ml_szt == 'l':
-                consumed_in_original = Decimal(str(consume_from_this / 1000000))
-            else:  # ml
-                consumed_in_original = Decimal(str(consume_from_this / 1000))
-        else:  # szt
-            consumed_in_original = Decimal(str(consume_from_this))
-        
-        # Zmniejsz ilość
-        pos.ilosc -= consumed_in_original
-        remaining_to_consume -= consume_from_this
-        
-        # Zapisz w historii
-        history_entry = OperationHistory(
-            pozycja_id=pos.id,
-            typ='zuzyto',
-            ilosc=consumed_in_original,
-            jednostka_g_ml_szt=pos.jednostka_g_ml_szt,
-            komentarz=f'Zużyto {consumed_in_original} {pos.jednostka_g_ml_szt} z pozycji',
-            uzytkownik_id=user_id
-        )
-        db.session.add(history_entry)
-        
-        # Jeśli zużyto całość (z małym marginesem błędu), oznacz jako usunięte
-        if pos.ilosc <= 0.001:
-            pos.usunieto = datetime.now()
-            pos.usunal_id = user_id
-    
     try:
         db.session.commit()
+        FridgeService.invalidate_summary(lodowka.id)
         # Sprawdź skąd przyszło żądanie
         referer = request.referrer or ''
         if 'expiring' in referer:
@@ -580,8 +406,8 @@ def discard_fridge_item(item_id):
     
     Proces:
     1. Sprawdź uprawnienia
-    2. Ustaw usunieto i usunal_id (dla jednej pozycji lub grupy)
-    3. Zapisz w historia_operacji_pozycji
+    2. Ustaw usunieto i usunal_id jednym UPDATE (dla jednej pozycji lub grupy)
+    3. Zapisz w historia_operacji_pozycji jednym INSERT
     """
     from flask import flash
     
@@ -605,47 +431,23 @@ def discard_fridge_item(item_id):
     if lodowka.wlasciciel_id != user_id:
         return f"Brak uprawnień - lodówka należy do użytkownika {lodowka.wlasciciel_id}, a ty jesteś {user_id}", 403
     
-    from ..models import OperationHistory
-    
     # Sprawdź czy wyrzucamy całą grupę
     discard_group = request.form.get('group') == 'true' or request.args.get('group') == 'true'
     
-    items_to_discard = []
-    
     if discard_group:
-        # Znajdź wszystkie pozycje z tą samą grupą (produkt_id + nazwa + data ważności)
-        # WAŻNE: Grupujemy po (produkt_id, nazwa_wlasna, wazne_do)
-        items_to_discard = (
-            db.session.query(FridgeItem)
-            .filter(FridgeItem.lodowka_id == lodowka.id)
-            .filter(FridgeItem.usunieto.is_(None))
-            .filter(FridgeItem.produkt_id == item.produkt_id)
-            .filter(FridgeItem.nazwa_wlasna == item.nazwa_wlasna)
-            .filter(FridgeItem.wazne_do == item.wazne_do)
-            .all()
-        )
+        # Wszystkie pozycje z tą samą grupą (produkt_id + nazwa + data ważności) - group_key
+        discarded = FridgeService.discard(lodowka.id, user_id, group_key=item.group_key)
     else:
         # Tylko jedna pozycja
-        items_to_discard = [item]
+        discarded = FridgeService.discard(lodowka.id, user_id, item_id=item.id)
     
-    # Wyrzuć wszystkie pozycje
-    for pos in items_to_discard:
-        pos.usunieto = datetime.now()
-        pos.usunal_id = user_id
-        
-        # Zapisz w historii
-        history_entry = OperationHistory(
-            pozycja_id=pos.id,
-            typ='usunieto',
-            ilosc=pos.ilosc,
-            jednostka_g_ml_szt=pos.jednostka_g_ml_szt,
-            komentarz='Usunięto pozycję' if not discard_group else 'Usunięto grupę produktów',
-            uzytkownik_id=user_id
-        )
-        db.session.add(history_entry)
+    if not discarded:
+        db.session.rollback()
+        return "Produkt nie istnieje", 404
     
     try:
         db.session.commit()
+        FridgeService.invalidate_summary(lodowka.id)
         # Sprawdź skąd przyszło żądanie i przekieruj odpowiednio
         referer = request.referrer or ''
         if 'expiring' in referer:
@@ -718,12 +520,7 @@ def expiring_page():
     user_id = int(user_id)
     
     # Znajdź lodówkę użytkownika
-    lodowka = (
-        db.session.query(Lodowka)
-        .filter(Lodowka.wlasciciel_id == user_id)
-        .filter(Lodowka.usunieto.is_(None))
-        .first()
-    )
+    lodowka = FridgeService.get_user_fridge(user_id)
     
     if not lodowka:
         return render_template('expiring.html', items=[])
@@ -732,55 +529,29 @@ def expiring_page():
     dzisiaj = date.today()
     pojutrze = dzisiaj + timedelta(days=2)
     
-    # Pobierz wszystkie produkty wygasające w ciągu 2 dni
-    all_items = (
-        db.session.query(FridgeItem)
-        .filter(FridgeItem.lodowka_id == lodowka.id)
-        .filter(FridgeItem.usunieto.is_(None))
-        .filter(FridgeItem.wazne_do.isnot(None))
-        .filter(FridgeItem.wazne_do <= pojutrze)
-        .all()
-    )
-    
-    # Grupowanie z konwersją jednostek (jak w fridge_page)
-    # Klucz: (produkt_id, nazwa_wlasna, wazne_do)
-    grouped = {}
-    
-    for item in all_items:
-        key = (item.produkt_id, item.nazwa_wlasna, item.wazne_do)
-        
-        base_amount, unit_type = normalize_to_base_unit(
-            item.ilosc, 
-            item.jednostka_g_ml_szt
-        )
-        
-        if key not in grouped:
-            grouped[key] = {
-                'base_amount': 0,
-                'unit_type': unit_type,
-                'repr_id': item.id
-            }
-        
-        grouped[key]['base_amount'] += base_amount
+    # Pobierz zgrupowane produkty wygasające w ciągu 2 dni (jak w fridge_page)
+    groups = FridgeService.get_grouped_items(lodowka.id, expiring_until=pojutrze)
+    products = ProductService.resolve_products(group['produkt_id'] for group in groups)
     
     # Przygotuj dane
     items_data = []
     jutro = dzisiaj + timedelta(days=1)
     
-    for key, data in grouped.items():
-        produkt_id, nazwa_wlasna, wazne_do = key
+    for group in groups:
+        produkt_id = group['produkt_id']
+        nazwa_wlasna = group['nazwa_wlasna']
+        wazne_do = group['wazne_do']
         
         # Pobierz nazwę produktu
         display_name = nazwa_wlasna
-        if produkt_id:
-            product = db.session.query(Product).get(produkt_id)
-            if product:
-                display_name = f"{product.nazwa} ({product.marka or 'bez marki'})"
+        if produkt_id in products:
+            product, _ = products[produkt_id]
+            display_name = f"{product.nazwa} ({product.marka or 'bez marki'})"
         
         # Sformatuj ilość
         display_amount, display_unit = format_amount_display(
-            data['base_amount'],
-            data['unit_type']
+            group['base_amount'],
+            group['unit_type']
         )
         
         # Status wygasania
@@ -799,7 +570,7 @@ def expiring_page():
             days_left = f"Wygasa za {days_diff} dni"
         
         items_data.append({
-            'id': data['repr_id'],
+            'id': group['repr_id'],
             'nazwa': display_name or 'Produkt bez nazwy',
             'ilosc': display_amount,
             'jednostka': display_unit,
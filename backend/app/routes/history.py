@@ -1,10 +1,17 @@
 # Blueprint dla historii operacji
 # Obsługuje przeglądanie historii działań na produktach
 
-from flask import Blueprint, request, jsonify, render_template
+from datetime import datetime, timedelta
+
+from flask import Blueprint, Response, request, jsonify, render_template, stream_with_context
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from ..models import OperationHistory, FridgeItem, Product
 from ..extensions import db
+from ..services.history_service import HistoryService
+from ..services.export_service import ExportService
+from ..services.fridge_service import FridgeService
+from ..services.statistics_service import StatisticsService
+from ..services.waste_analytics import WasteAnalytics
 
 bp = Blueprint('history', __name__, url_prefix='/history')
 
@@ -13,9 +20,8 @@ bp = Blueprint('history', __name__, url_prefix='/history')
 @jwt_required()
 def history_page():
     """
-    Wyświetla stronę z historią operacji
+    Wyświetla stronę z historią operacji (dane ładowane z /history/api/operations)
     """
-    # TODO: Renderować szablon history.html
     return render_template('history.html')
 
 
@@ -74,16 +80,100 @@ def get_last_operation():
 
 # ==================== POZOSTAŁE ENDPOINTY ====================
 
+def _parse_date(name):
+    """Data z parametru zapytania w formacie RRRR-MM-DD (None gdy brak)"""
+    value = request.args.get(name)
+    if not value:
+        return None
+    try:
+        return datetime.strptime(value, '%Y-%m-%d').date()
+    except ValueError:
+        raise ValueError(f'Nieprawidłowy format daty w parametrze {name} (RRRR-MM-DD)')
+
+
 @bp.route('/api/operations', methods=['GET'])
 @jwt_required()
 def get_operation_history():
     """
     API endpoint - zwraca historię operacji użytkownika
+    
+    Parametry (opcjonalne):
+    - limit: liczba operacji na stronie (domyślnie 50, max 200)
+    - cursor: next_cursor z poprzedniej odpowiedzi
+    - typ: dodano / zuzyto / usunieto
+    - date_from, date_to: zakres dat RRRR-MM-DD (włącznie)
+    - produkt_id: tylko operacje na danym produkcie
+    
+    Zwraca:
+    - operations: lista operacji od najnowszych
+    - next_cursor: kursor następnej strony (null na ostatniej)
+    """
+    user_id = get_jwt_identity()
+    
+    try:
+        result = HistoryService.get_operations(
+            user_id,
+            limit=request.args.get('limit', type=int),
+            cursor=request.args.get('cursor') or None,
+            typ=request.args.get('typ') or None,
+            date_from=_parse_date('date_from'),
+            date_to=_parse_date('date_to'),
+            produkt_id=request.args.get('produkt_id', type=int),
+        )
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'message': str(e)
+        }), 400
+    
+    return jsonify(dict(result, success=True))
+
+
+@bp.route('/api/operations/export', methods=['GET'])
+@jwt_required()
+def export_operation_history():
+    """
+    API endpoint - eksportuje historię operacji lodówki do pliku CSV lub NDJSON
+    
+    Plik jest strumieniowany partiami kursora serwerowego (stała pamięć).
+    
+    Parametry (opcjonalne):
+    - format: csv (domyślnie) / ndjson
+    - typ: dodano / zuzyto / usunieto
+    - date_from, date_to: zakres dat RRRR-MM-DD (włącznie)
+    - uzytkownik_id: tylko operacje wykonane przez danego użytkownika
     """
-    # TODO: Implementować pobieranie historii operacji
-    # TODO: Paginacja wyników
-    # TODO: Filtry (typ operacji, zakres dat, produkt)
-    pass
+    lodowka = FridgeService.get_user_fridge(get_jwt_identity())
+    if not lodowka:
+        return jsonify({
+            'success': False,
+            'message': 'Nie znaleziono lodówki'
+        }), 404
+    
+    fmt = request.args.get('format', 'csv')
+    try:
+        chunks = ExportService.export_operations(
+            lodowka.id,
+            fmt,
+            date_from=_parse_date('date_from'),
+            date_to=_parse_date('date_to'),
+            typ=request.args.get('typ') or None,
+            uzytkownik_id=request.args.get('uzytkownik_id', type=int),
+        )
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'message': str(e)
+        }), 400
+    
+    return Response(
+        stream_with_context(chunks),
+        mimetype=ExportService.FORMATS[fmt],
+        headers={
+            'Content-Disposition': f'attachment; filename=historia_operacji.{fmt}',
+            'X-Accel-Buffering': 'no',
+        }
+    )
 
 
 @bp.route('/api/operations/<int:operation_id>', methods=['GET'])
@@ -91,10 +181,21 @@ def get_operation_history():
 def get_operation_details(operation_id):
     """
     API endpoint - zwraca szczegóły konkretnej operacji
+    
+    Operacje z cudzej lodówki są traktowane jak nieistniejące (404).
     """
-    # TODO: Implementować pobieranie szczegółów operacji
-    # TODO: Sprawdzenie uprawnień użytkownika
-    pass
+    operation = HistoryService.get_operation(get_jwt_identity(), operation_id)
+    
+    if not operation:
+        return jsonify({
+            'success': False,
+            'message': 'Operacja nie znaleziona'
+        }), 404
+    
+    return jsonify({
+        'success': True,
+        'operation': operation
+    })
 
 
 @bp.route('/api/statistics', methods=['GET'])
@@ -102,9 +203,64 @@ def get_operation_details(operation_id):
 def get_statistics():
     """
     API endpoint - zwraca statystyki operacji
+    
+    Liczone z dziennych sum (statystyki_operacji_dzienne), nie z surowej historii.
+    
+    Parametry (opcjonalne):
+    - days: liczba dni wstecz (domyślnie 30, max 366)
+    - top: liczba produktów w rankingach (domyślnie 5, max 50)
+    
+    Zwraca:
+    - totals: liczba operacji według typu
+    - most_added: najczęściej dodawane produkty
+    - most_wasted: najczęściej wyrzucane produkty
+    - daily: liczba operacji według typu dla każdego dnia z operacjami
+    """
+    try:
+        result = StatisticsService.get_statistics(
+            get_jwt_identity(),
+            days=request.args.get('days', 30, type=int),
+            top=min(max(request.args.get('top', 5, type=int), 1), 50),
+        )
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'message': str(e)
+        }), 400
+    
+    return jsonify(dict(result, success=True))
+
+
+@bp.route('/api/waste', methods=['GET'])
+@jwt_required()
+def get_waste_report():
+    """
+    API endpoint - raport marnowania żywności
+    
+    Parametry (opcjonalne):
+    - since: początek okresu RRRR-MM-DD (domyślnie 365 dni wstecz)
+    - top: liczba produktów w raporcie (domyślnie 10, max 100)
+    
+    Zwraca:
+    - produkty: wskaźnik marnowania (wyrzucono / dodano) i średni czas
+      od dodania do zużycia lub wyrzucenia, od najczęściej marnowanych
+    - miesiace: masa (g) i kcal wyrzuconej żywności w każdym miesiącu
     """
-    # TODO: Implementować generowanie statystyk
-    # TODO: Najczęściej dodawane produkty
-    # TODO: Najczęściej marnowane produkty
-    # TODO: Statystyki w czasie
-    pass
+    try:
+        since = _parse_date('since') or (datetime.utcnow() - timedelta(days=365)).date()
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'message': str(e)
+        }), 400
+    
+    lodowka = FridgeService.get_user_fridge(get_jwt_identity())
+    if not lodowka:
+        return jsonify({'success': True, 'since': since.isoformat(), 'produkty': [], 'miesiace': []})
+    
+    result = WasteAnalytics.household_report(
+        lodowka.id,
+        since=since,
+        top=min(max(request.args.get('top', 10, type=int), 1), 100),
+    )
+    return jsonify(dict(result, success=True, since=since.isoformat()))
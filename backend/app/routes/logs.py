@@ -1,8 +1,18 @@
 # Blueprint dla logów systemowych
 # Obsługuje przeglądanie logów zdarzeń systemowych
 
-from flask import Blueprint, request, jsonify, render_template
+from datetime import datetime
+
+from flask import (
+    Blueprint, Response, request, jsonify, render_template, redirect, url_for, flash,
+    stream_with_context,
+)
 from flask_jwt_extended import jwt_required, get_jwt_identity
+from ..services.audit_log import RESERVED_TYPES, AuditLog
+from ..services.auth_service import AuthService
+from ..services.export_service import ExportService
+from ..services.fridge_service import FridgeService
+from ..services.log_service import LogService
 
 bp = Blueprint('logs', __name__, url_prefix='/logs')
 
@@ -11,43 +21,188 @@ bp = Blueprint('logs', __name__, url_prefix='/logs')
 @jwt_required()
 def logs_page():
     """
-    Wyświetla stronę z logami systemowymi
+    Wyświetla stronę z logami systemowymi (tylko administratorzy,
+    dane ładowane z /logs/api/logs)
     """
-    # TODO: Renderować szablon logs.html
-    # TODO: Sprawdzić uprawnienia (tylko dla administratorów?)
+    if not AuthService.is_admin(get_jwt_identity()):
+        flash('Brak uprawnień do przeglądania logów', 'error')
+        return redirect(url_for('auth.account_page'))
     return render_template('logs.html')
 
 
+def _forbidden():
+    return jsonify({
+        'success': False,
+        'message': 'Brak uprawnień'
+    }), 403
+
+
 @bp.route('/api/logs', methods=['GET'])
 @jwt_required()
 def get_logs():
     """
-    API endpoint - zwraca logi systemowe
+    API endpoint (administrator) - zwraca logi zdarzeń, od najnowszych
+    
+    Parametry (opcjonalne):
+    - limit: liczba wpisów na stronie (domyślnie 50, max 200)
+    - cursor: next_cursor z poprzedniej odpowiedzi
+    - typ, tabela, rekord_id (razem z tabela), uzytkownik_id, lodowka_id
+    - date_from, date_to: zakres dat RRRR-MM-DD (włącznie)
+    - details: 1 - dołącza kolumny przed/po (domyślnie pomijane)
+    
+    Zwraca:
+    - logs: lista wpisów
+    - next_cursor: kursor następnej strony (null na ostatniej)
     """
-    # TODO: Implementować pobieranie logów
-    # TODO: Sprawdzenie uprawnień użytkownika
-    # TODO: Paginacja i filtry (level, data, użytkownik)
-    pass
+    if not AuthService.is_admin(get_jwt_identity()):
+        return _forbidden()
+    
+    try:
+        result = LogService.get_logs(
+            limit=request.args.get('limit', type=int),
+            cursor=request.args.get('cursor') or None,
+            typ=request.args.get('typ') or None,
+            tabela=request.args.get('tabela') or None,
+            rekord_id=request.args.get('rekord_id', type=int),
+            uzytkownik_id=request.args.get('uzytkownik_id', type=int),
+            lodowka_id=request.args.get('lodowka_id', type=int),
+            date_from=_parse_date('date_from'),
+            date_to=_parse_date('date_to'),
+            details=request.args.get('details') in ('1', 'true'),
+        )
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'message': str(e)
+        }), 400
+    
+    return jsonify(dict(result, success=True))
+
+
+@bp.route('/api/logs/<int:log_id>', methods=['GET'])
+@jwt_required()
+def get_log_details(log_id):
+    """
+    API endpoint (administrator) - pełny wpis logu razem z przed/po
+    """
+    if not AuthService.is_admin(get_jwt_identity()):
+        return _forbidden()
+    
+    log = LogService.get_log(log_id)
+    if not log:
+        return jsonify({
+            'success': False,
+            'message': 'Wpis nie znaleziony'
+        }), 404
+    
+    return jsonify({
+        'success': True,
+        'log': log
+    })
 
 
 @bp.route('/api/logs', methods=['POST'])
+@jwt_required()
 def create_log():
     """
     API endpoint - tworzy nowy wpis w logu
+    
+    Wpis trafia do tej samej kolejki co dziennik zmian modeli (zapis w tle).
+    Użytkownik, jego lodówka i czas są uzupełniane po stronie serwera.
+    Typy INSERT/UPDATE/DELETE są zarezerwowane dla dziennika zmian modeli,
+    żeby klient nie mógł podrobić wpisu o zmianie rekordu.
+    
+    Request JSON:
+    {
+        "typ": "EKSPORT",        # do 32 znaków
+        "tabela": "lodowka",     # do 64 znaków
+        "rekord_id": 1,
+        "przed": {...},          # opcjonalnie, obiekt JSON
+        "po": {...}              # opcjonalnie, obiekt JSON
+    }
     """
-    # TODO: Implementować tworzenie wpisu w logu
-    # TODO: Walidacja danych
-    # TODO: Automatyczne uzupełnienie metadanych (IP, timestamp)
-    pass
+    user_id = get_jwt_identity()
+    data = request.get_json(silent=True) or {}
+    
+    typ = data.get('typ')
+    tabela = data.get('tabela')
+    rekord_id = data.get('rekord_id')
+    przed = data.get('przed')
+    po = data.get('po')
+    
+    if not isinstance(typ, str) or not typ.strip() or len(typ) > 32:
+        return jsonify({'success': False, 'message': 'Pole typ jest wymagane (do 32 znaków)'}), 400
+    if typ.strip().upper() in RESERVED_TYPES:
+        return jsonify({'success': False, 'message': f'Typ {typ.strip()} jest zarezerwowany dla dziennika zmian'}), 400
+    if not isinstance(tabela, str) or not tabela.strip() or len(tabela) > 64:
+        return jsonify({'success': False, 'message': 'Pole tabela jest wymagane (do 64 znaków)'}), 400
+    if isinstance(rekord_id, bool) or not isinstance(rekord_id, int) or rekord_id < 0:
+        return jsonify({'success': False, 'message': 'Pole rekord_id musi być nieujemną liczbą całkowitą'}), 400
+    if any(value is not None and not isinstance(value, dict) for value in (przed, po)):
+        return jsonify({'success': False, 'message': 'Pola przed i po muszą być obiektami JSON'}), 400
+    
+    lodowka = FridgeService.get_user_fridge(user_id)
+    AuditLog.record([AuditLog.entry(
+        typ.strip(), tabela.strip(), rekord_id, przed, po,
+        uzytkownik_id=int(user_id),
+        lodowka_id=lodowka.id if lodowka else None,
+    )])
+    
+    return jsonify({
+        'success': True,
+        'message': 'Wpis przyjęty do zapisu'
+    }), 202
+
+
+def _parse_date(name):
+    """Data z parametru zapytania w formacie RRRR-MM-DD (None gdy brak)"""
+    value = request.args.get(name)
+    if not value:
+        return None
+    try:
+        return datetime.strptime(value, '%Y-%m-%d').date()
+    except ValueError:
+        raise ValueError(f'Nieprawidłowy format daty w parametrze {name} (RRRR-MM-DD)')
 
 
 @bp.route('/api/logs/export', methods=['GET'])
 @jwt_required()
 def export_logs():
     """
-    API endpoint - eksportuje logi do pliku (CSV/JSON)
+    API endpoint (administrator) - eksportuje logi do pliku CSV lub NDJSON
+    
+    Plik jest strumieniowany partiami kursora serwerowego, więc eksport
+    wielu miesięcy logów nie zwiększa pamięci workera.
+    
+    Parametry (opcjonalne):
+    - format: csv (domyślnie) / ndjson
+    - date_from, date_to: zakres dat RRRR-MM-DD (włącznie)
+    - uzytkownik_id: tylko zdarzenia danego użytkownika
+    - typ: tylko zdarzenia danego typu
     """
-    # TODO: Implementować eksport logów
-    # TODO: Sprawdzenie uprawnień
-    # TODO: Generowanie pliku w wybranym formacie
-    pass
+    if not AuthService.is_admin(get_jwt_identity()):
+        return _forbidden()
+    
+    fmt = request.args.get('format', 'csv')
+    try:
+        chunks = ExportService.export_logs(
+            fmt,
+            date_from=_parse_date('date_from'),
+            date_to=_parse_date('date_to'),
+            uzytkownik_id=request.args.get('uzytkownik_id', type=int),
+            typ=request.args.get('typ') or None,
+        )
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'message': str(e)
+        }), 400
+    
+    return Response(
+        stream_with_context(chunks),
+        mimetype=ExportService.FORMATS[fmt],
+        headers={
+            'Content-Disposition': f'attachment; filename=logi_zdarzen.{fmt}',
+            'X-Accel-Buffering': 'no',
+        }
+    )
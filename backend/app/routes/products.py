@@ -5,7 +5,12 @@ from flask import Blueprint, render_template, request, redirect, url_for, flash,
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from ..models import FridgeItem, Lodowka, Product, WartosciOdzywcze
 from ..extensions import db
-from datetime import datetime
+from ..services.fridge_service import FridgeService
+from ..services.quantity import UNIT_KINDS, format_amount_display, to_base_amounts
+from ..services.product_service import ProductService
+from ..services.auth_service import AuthService
+from ..services.job_queue import JobQueue
+from datetime import datetime, timedelta
 
 bp = Blueprint('products', __name__, url_prefix='/products')
 
@@ -18,65 +23,47 @@ def products_page():
         current_user_id = get_jwt_identity()
         
         # Pobierz lodówkę użytkownika
-        lodowka = Lodowka.query.filter_by(wlasciciel_id=current_user_id, usunieto=None).first()
+        lodowka = FridgeService.get_user_fridge(current_user_id)
         if not lodowka:
             flash('Nie znaleziono Twojej lodówki', 'error')
             return redirect(url_for('auth.account_page'))
         
-        # Pobierz aktywne produkty z lodówki użytkownika
-        all_items = db.session.query(FridgeItem)\
-            .filter(FridgeItem.lodowka_id == lodowka.id)\
-            .filter(FridgeItem.usunieto.is_(None))\
-            .all()
-        
-        # Grupowanie produktów (jak w widoku lodówki)
+        # Pobierz zgrupowane produkty z lodówki użytkownika (jak w widoku lodówki)
         # Klucz: (produkt_id, nazwa_wlasna, wazne_do)
-        grouped = {}
+        groups = FridgeService.get_grouped_items(lodowka.id)
         
-        for item in all_items:
-            key = (item.produkt_id, item.nazwa_wlasna, item.wazne_do)
-            
-            if key not in grouped:
-                grouped[key] = {
-                    'items': [],
-                    'first_created': item.utworzono,
-                    'last_created': item.utworzono
-                }
-            
-            grouped[key]['items'].append(item)
-            
-            # Śledź daty dodania
-            if item.utworzono < grouped[key]['first_created']:
-                grouped[key]['first_created'] = item.utworzono
-            if item.utworzono > grouped[key]['last_created']:
-                grouped[key]['last_created'] = item.utworzono
+        # Produkty i wartości odżywcze dla całej strony jednym zapytaniem
+        resolved = ProductService.resolve_products(
+            (group['produkt_id'] for group in groups), with_nutrition=True
+        )
         
         # Formatuj dane do wyświetlenia
         products = []
-        for key, data in grouped.items():
-            produkt_id, nazwa_wlasna, wazne_do = key
-            first_item = data['items'][0]
+        for group in groups:
+            produkt_id = group['produkt_id']
+            nazwa_wlasna = group['nazwa_wlasna']
             
             # Pobierz dane produktu i wartości odżywcze jeśli istnieją
-            product = None
-            wartosci = None
-            if produkt_id:
-                product = db.session.query(Product).get(produkt_id)
-                if product:
-                    wartosci = db.session.query(WartosciOdzywcze).filter_by(produkt_id=product.id).first()
+            product, wartosci = resolved.get(produkt_id, (None, None))
+            
+            # Suma ilości w najlepszej jednostce wyświetlania
+            display_amount, display_unit = format_amount_display(
+                group['base_amount'],
+                group['unit_type']
+            )
             
             product_dict = {
-                'item_id': first_item.id,  # ID pierwszego elementu z grupy
+                'item_id': group['repr_id'],  # ID pierwszego elementu z grupy
                 'product_id': produkt_id,
                 'nazwa': nazwa_wlasna or (product.nazwa if product else 'Produkt bez nazwy'),
                 'marka': product.marka if product else None,
                 'kategoria': product.kategoria if product else None,
                 'barcode_13cyf': product.barcode_13cyf if product else None,
-                'ilosc': sum(float(item.ilosc) for item in data['items']),  # Suma ilości
-                'jednostka': first_item.jednostka_g_ml_szt,
-                'wazne_do': wazne_do,
-                'utworzono': data['first_created'],  # Data dodania pierwszego
-                'zaktualizowano': data['last_created'],  # Data dodania ostatniego
+                'ilosc': float(display_amount),  # Suma ilości
+                'jednostka': display_unit,
+                'wazne_do': group['wazne_do'],
+                'utworzono': group['first_created'],  # Data dodania pierwszego
+                'zaktualizowano': group['last_created'],  # Data dodania ostatniego
                 'wartosci_odzywcze': None
             }
             
@@ -121,25 +108,22 @@ def product_detail(item_id):
             return redirect(url_for('products.products_page'))
         
         # Znajdź wszystkie produkty z tej samej grupy
-        # Grupujemy po: (produkt_id, nazwa_wlasna, wazne_do)
-        grouped_items = db.session.query(FridgeItem)\
-            .filter(FridgeItem.lodowka_id == lodowka.id)\
-            .filter(FridgeItem.usunieto.is_(None))\
-            .filter(FridgeItem.produkt_id == base_item.produkt_id)\
-            .filter(FridgeItem.nazwa_wlasna == base_item.nazwa_wlasna)\
-            .filter(FridgeItem.wazne_do == base_item.wazne_do)\
-            .all()
-        
-        # Pobierz dane produktu i wartości odżywcze
-        product = None
-        wartosci = None
-        if base_item.produkt_id:
-            product = db.session.query(Product).get(base_item.produkt_id)
-            if product:
-                wartosci = db.session.query(WartosciOdzywcze).filter_by(produkt_id=product.id).first()
-        
-        # Oblicz sumy i daty
-        total_amount = sum(float(item.ilosc) for item in grouped_items)
+        # Grupujemy po: (produkt_id, nazwa_wlasna, wazne_do) - group_key
+        grouped_items = FridgeService.get_group_items(lodowka.id, base_item.group_key)
+        
+        # Pobierz dane produktu i wartości odżywcze (bez odp_api - widok go nie pokazuje)
+        product, wartosci = ProductService.resolve_products(
+            [base_item.produkt_id], with_nutrition=True
+        ).get(base_item.produkt_id, (None, None))
+        
+        # Oblicz sumy (w jednostkach bazowych - grupa może mieszać g i kg) i daty
+        total_base = sum(to_base_amounts(
+            [item.ilosc for item in grouped_items],
+            [item.jednostka_g_ml_szt for item in grouped_items],
+        ))
+        total_amount, total_unit = format_amount_display(
+            total_base, UNIT_KINDS.get(base_item.jednostka_g_ml_szt, 'piece')
+        )
         first_created = min(item.utworzono for item in grouped_items)
         last_created = max(item.utworzono for item in grouped_items)
         
@@ -150,13 +134,12 @@ def product_detail(item_id):
             'marka': product.marka if product else None,
             'kategoria': product.kategoria if product else None,
             'barcode_13cyf': product.barcode_13cyf if product else None,
-            'ilosc': total_amount,
-            'jednostka': base_item.jednostka_g_ml_szt,
+            'ilosc': float(total_amount),
+            'jednostka': total_unit,
             'wazne_do': base_item.wazne_do,
             'utworzono': first_created,
             'zaktualizowano': last_created,
-            'wartosci_odzywcze': None,
-            'wartosci_odzywcze_full': None
+            'wartosci_odzywcze': None
         }
         
         if wartosci:
@@ -168,9 +151,9 @@ def product_detail(item_id):
                 'blonnik_g': float(wartosci.na_100g_blonnik_g) if wartosci.na_100g_blonnik_g else None,
                 'sol_g': float(wartosci.na_100g_sol_g) if wartosci.na_100g_sol_g else None,
                 'zrodlo_id': wartosci.zrodlo_id,
-                'pobrano': wartosci.pobrano
+                'pobrano': wartosci.pobrano,
+                'status': wartosci.status
             }
-            product_dict['wartosci_odzywcze_full'] = wartosci.odp_api
         
         return render_template('product_detail.html', product=product_dict)
     except Exception as e:
@@ -181,6 +164,31 @@ def product_detail(item_id):
 
 
 
+@bp.route('/<int:item_id>/nutrition-status', methods=['GET'])
+@jwt_required()
+def nutrition_status(item_id):
+    """API endpoint - status pobierania wartości odżywczych (odpytywany ze strony produktu)"""
+    current_user_id = get_jwt_identity()
+    
+    status = db.session.query(WartosciOdzywcze.status)\
+        .join(FridgeItem, FridgeItem.produkt_id == WartosciOdzywcze.produkt_id)\
+        .join(Lodowka, FridgeItem.lodowka_id == Lodowka.id)\
+        .filter(FridgeItem.id == item_id)\
+        .filter(Lodowka.wlasciciel_id == current_user_id)\
+        .scalar()
+    
+    if status is None:
+        return jsonify({
+            'success': False,
+            'message': 'Brak danych odżywczych'
+        }), 404
+    
+    return jsonify({
+        'success': True,
+        'status': status
+    })
+
+
 @bp.route('/<int:item_id>/delete', methods=['POST'])
 @jwt_required()
 def delete_product(item_id):
@@ -203,6 +211,7 @@ def delete_product(item_id):
         fridge_item.usunieto = datetime.utcnow()
         fridge_item.usunal_id = current_user_id
         db.session.commit()
+        FridgeService.invalidate_summary(fridge_item.lodowka_id)
         
         flash('Produkt usunięty z lodówki', 'success')
         return redirect(url_for('products.products_page'))
@@ -239,9 +248,6 @@ def enrich_from_openfoodfacts(item_id):
             flash('Produkt nie ma kodu kreskowego', 'error')
             return redirect(url_for('products.product_detail', item_id=item_id))
         
-        # Import ProductService tylko dla tej metody
-        from app.services.product_service import ProductService
-        
         enrich_result = ProductService.enrich_from_openfoodfacts(product.barcode_13cyf, product.id)
         
         if enrich_result['success']:
@@ -256,10 +262,104 @@ def enrich_from_openfoodfacts(item_id):
         return redirect(url_for('products.products_page'))
 
 
+@bp.route('/api/enrich-batch', methods=['POST'])
+@jwt_required()
+def enrich_batch_api():
+    """
+    API endpoint (administrator) - masowe uzupełnienie wartości odżywczych
+    
+    Uruchamia ProductService.enrich_batch w kolejce zadań 'enrich'.
+    
+    Request JSON (opcjonalnie):
+    {
+        "stale_days": 30,   # odśwież też wartości starsze niż N dni
+        "limit": 500
+    }
+    """
+    current_user_id = get_jwt_identity()
+    if not AuthService.is_admin(current_user_id):
+        return jsonify({
+            'success': False,
+            'message': 'Brak uprawnień'
+        }), 403
+    
+    data = request.get_json(silent=True) or {}
+    try:
+        stale_days = int(data['stale_days']) if data.get('stale_days') is not None else None
+        limit = int(data['limit']) if data.get('limit') is not None else None
+    except (TypeError, ValueError):
+        return jsonify({
+            'success': False,
+            'message': 'Nieprawidłowe parametry stale_days lub limit'
+        }), 400
+    
+    stale_before = datetime.utcnow() - timedelta(days=stale_days) if stale_days is not None else None
+    
+    try:
+        # Jedno trwające uzupełnianie naraz - kolejne żądania dostają to samo zadanie
+        job = JobQueue.submit(
+            'enrich',
+            ProductService.enrich_batch,
+            stale_before, limit,
+            key='enrich-batch',
+            owner_id=current_user_id
+        )
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'message': str(e)
+        }), 503
+    
+    return jsonify({
+        'success': True,
+        'job_id': job['id'],
+        'status': job['status'],
+        'status_url': url_for('products.enrich_batch_status', job_id=job['id'])
+    }), 202
+
+
+@bp.route('/api/enrich-batch/<job_id>', methods=['GET'])
+@jwt_required()
+def enrich_batch_status(job_id):
+    """
+    API endpoint (administrator) - status masowego uzupełniania
+    
+    Zadanie jest wspólne - żądania kilku administratorów łączone są
+    w jedno (klucz 'enrich-batch'), więc status nie jest filtrowany
+    po właścicielu.
+    """
+    if not AuthService.is_admin(get_jwt_identity()):
+        return jsonify({
+            'success': False,
+            'message': 'Brak uprawnień'
+        }), 403
+    
+    job = JobQueue.get(job_id)
+    
+    if job is None or job['queue'] != 'enrich':
+        return jsonify({
+            'success': False,
+            'message': 'Zadanie nie istnieje lub wygasło'
+        }), 404
+    
+    return jsonify({
+        'success': job['status'] != 'failed',
+        'job_id': job['id'],
+        'status': job['status'],
+        'result': job['result'],
+        'error': job['error']
+    })
+
+
 @bp.route('/api/search', methods=['GET'])
 @jwt_required()
 def search_openfoodfacts_api():
-    """API endpoint - wyszukuje produkty w OpenFoodFacts po nazwie"""
+    """
+    API endpoint - wyszukuje produkty po nazwie
+    
+    Najpierw w lokalnym słowniku produktów, a przy braku wyników
+    w OpenFoodFacts. ?source=openfoodfacts pomija słownik lokalny.
+    """
     try:
         search_term = request.args.get('q', '').strip()
         
@@ -269,8 +369,10 @@ def search_openfoodfacts_api():
                 'message': 'Podaj co najmniej 3 znaki do wyszukania'
             }), 400
         
-        from app.services.product_service import ProductService
-        result = ProductService.search_openfoodfacts(search_term, page_size=5)
+        if request.args.get('source') == 'openfoodfacts':
+            result = dict(ProductService.search_openfoodfacts(search_term, page_size=5), source='openfoodfacts')
+        else:
+            result = ProductService.search_products(search_term, page_size=5)
         
         return jsonify(result)
         
@@ -322,14 +424,10 @@ def assign_barcode(item_id):
             
             # Przypisz produkt_id do wszystkich pozycji z tej samej grupy
             # WAŻNE: Grupujemy po (nazwa_wlasna, wazne_do) - nie łączymy produktów o różnych datach!
-            grouped_items = db.session.query(FridgeItem)\
-                .filter(FridgeItem.lodowka_id == lodowka.id)\
-                .filter(FridgeItem.usunieto.is_(None))\
-                .filter(FridgeItem.produkt_id.is_(None))\
-                .filter(FridgeItem.nazwa_wlasna == base_item.nazwa_wlasna)\
-                .filter(FridgeItem.wazne_do == base_item.wazne_do)\
-                .all()
+            # (group_key pozycji bez produktu obejmuje produkt_id IS NULL)
+            grouped_items = FridgeService.get_group_items(lodowka.id, base_item.group_key)
             
+            # group_key przeliczy się przy zapisie (before_update)
             for item in grouped_items:
                 item.produkt_id = product.id
         else:
@@ -341,25 +439,23 @@ def assign_barcode(item_id):
             
             product.barcode_13cyf = barcode
         
-        db.session.commit()
-        
-        # Pobierz dane z OpenFoodFacts
-        from app.services.product_service import ProductService
-        enrich_result = ProductService.enrich_from_openfoodfacts(barcode, product.id)
+        # Dane z OpenFoodFacts pobierane są w tle - strona produktu
+        # pokaże je, gdy status zmieni się z 'pending'
+        ProductService.mark_enrichment_pending(product.id)
         
-        if enrich_result['success']:
-            # Zaktualizuj nazwę produktu jeśli została pobrana z API
-            if enrich_result.get('data', {}).get('nazwa'):
-                product.nazwa = enrich_result['data']['nazwa']
-            if enrich_result.get('data', {}).get('marka'):
-                product.marka = enrich_result['data']['marka']
-            if enrich_result.get('data', {}).get('kategoria'):
-                product.kategoria = enrich_result['data']['kategoria']
-            
+        db.session.commit()
+        # Zmiana produkt_id zmienia grupowanie pozycji
+        FridgeService.invalidate_summary(lodowka.id)
+        
+        try:
+            ProductService.schedule_enrichment(product.id, barcode, update_product=True)
+            flash('Przypisano kod kreskowy. Dane z OpenFoodFacts są pobierane', 'success')
+        except ValueError as e:
+            WartosciOdzywcze.query.filter_by(produkt_id=product.id).update(
+                {'status': WartosciOdzywcze.STATUS_FAILED}, synchronize_session=False
+            )
             db.session.commit()
-            flash('Dane produktu zaktualizowane z OpenFoodFacts', 'success')
-        else:
-            flash(f'Przypisano kod kreskowy, ale nie udało się pobrać danych: {enrich_result["message"]}', 'warning')
+            flash(f'Przypisano kod kreskowy, ale nie udało się pobrać danych: {str(e)}', 'warning')
         
         return redirect(url_for('products.product_detail', item_id=item_id))
         
@@ -5,5 +5,8 @@ from .auth_service import AuthService
 from .fridge_service import FridgeService
 from .product_service import ProductService
 from .notification_service import NotificationService
+from .ollama_service import OllamaService
+from .recipe_cache import RecipeCache
+from .job_queue import JobQueue
 
-__all__ = ['AuthService', 'FridgeService', 'ProductService', 'NotificationService']
+__all__ = ['AuthService', 'FridgeService', 'ProductService', 'NotificationService', 'OllamaService', 'RecipeCache', 'JobQueue']
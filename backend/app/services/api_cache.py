@@ -0,0 +1,188 @@
+# Cache odpowiedzi API zewnętrznych (OpenFoodFacts)
+# Trzy poziomy: LRU w procesie -> tabela cache_api -> sieć (z rewalidacją ETag)
+
+import threading
+from collections import OrderedDict
+from datetime import datetime
+
+from flask import current_app
+
+from ..extensions import db, http
+from ..models import CacheApi
+from .openfoodfacts_payload import compress
+
+
+# LRU w procesie: {(zrodlo_id, barcode, zapytanie): (wygasa, wynik)}
+_lru = OrderedDict()
+_lru_lock = threading.Lock()
+
+
+class ApiCache:
+    """
+    Cache read-through dla zapytań do API zewnętrznych.
+
+    Kolejność odczytu:
+    1. LRU w pamięci procesu (API_CACHE_LRU_SIZE wpisów),
+    2. wiersz cache_api po (zrodlo_id, barcode) lub (zrodlo_id, zapytanie),
+       jeśli jeszcze nie wygasł (wygasa),
+    3. zapytanie HTTP - dla wygasłego wiersza z ETag z nagłówkiem
+       If-None-Match; odpowiedź 304 tylko przedłuża ważność wiersza.
+
+    Zapisywane są odpowiedzi 200 z poprawnym JSON, a z not_found_ttl także
+    404 (wynik negatywny, np. kod nieznany OpenFoodFacts) - na krótszy czas,
+    żeby brakujący produkt nie był odpytywany przy każdym żądaniu. Z funkcją project
+    w `odpowiedz` trafia (i jest zwracana) tylko projekcja, a pełna
+    odpowiedź - skompresowana do `odpowiedz_surowa`. Wiersz zapisywany jest
+    osobnym połączeniem we własnej transakcji, więc fetch nie zatwierdza
+    ani nie wycofuje sesji wywołującego.
+    """
+
+    @staticmethod
+    def _lru_get(key, now):
+        with _lru_lock:
+            entry = _lru.get(key)
+            if entry is None:
+                return None
+            wygasa, result = entry
+            if wygasa is not None and wygasa <= now:
+                del _lru[key]
+                return None
+            _lru.move_to_end(key)
+            return result
+
+    @staticmethod
+    def _lru_put(key, wygasa, result):
+        size = current_app.config['API_CACHE_LRU_SIZE']
+        if size <= 0:
+            return
+        with _lru_lock:
+            _lru[key] = (wygasa, result)
+            _lru.move_to_end(key)
+            while len(_lru) > size:
+                _lru.popitem(last=False)
+
+    @staticmethod
+    def _result(row, source):
+        return {
+            'status': row.http_status,
+            'data': row.odpowiedz,
+            'cache_id': row.id,
+            'source': source,
+        }
+
+    @staticmethod
+    def _json_or_empty(response):
+        """Treść odpowiedzi błędu - JSON, jeśli jest, inaczej pusty dict"""
+        try:
+            data = response.json()
+        except ValueError:
+            return {}
+        return data if isinstance(data, dict) else {}
+
+    @staticmethod
+    def fetch(zrodlo_id, url, ttl, barcode=None, zapytanie=None, params=None, rate_limiter=None,
+              project=None, not_found_ttl=None):
+        """
+        Pobiera odpowiedź JSON przez cache
+
+        Args:
+            zrodlo_id: ID dostawcy (zrodla_api.id)
+            url: Adres zapytania
+            ttl: Ważność zapisanej odpowiedzi (timedelta)
+            barcode: Klucz cache - kod kreskowy
+            zapytanie: Klucz cache - treść zapytania (max 255 znaków)
+            params: Parametry query string
+            rate_limiter: Opcjonalny RateLimiter - tylko dla zapytań sieciowych
+            project: Opcjonalna projekcja odpowiedzi przed zapisem (dict -> dict)
+            not_found_ttl: Ważność zapisanej odpowiedzi 404 (timedelta);
+                           bez niej 404 jest błędem jak inne statusy
+
+        Returns:
+            Dict z kluczami status, data, cache_id,
+            source ('lru' / 'db' / 'revalidated' / 'network');
+            dla zapisanego 404 status to 404, a data to treść odpowiedzi
+            (pusty dict, gdy nie była JSON-em)
+
+        Raises:
+            requests.RequestException: Błąd połączenia lub status inny niż 200/304
+                                       (i 404 z not_found_ttl)
+        """
+        if zapytanie is not None:
+            zapytanie = zapytanie[:255]
+        key = (zrodlo_id, barcode, zapytanie)
+        now = datetime.utcnow()
+
+        result = ApiCache._lru_get(key, now)
+        if result is not None:
+            return dict(result, source='lru')
+
+        # Odczyt kolumn, nie obiektu - wiersz nie trafia do mapy tożsamości
+        # sesji, którą zapis poniżej (osobne połączenie) by zdezaktualizował
+        query = db.session.query(
+            CacheApi.id, CacheApi.odpowiedz, CacheApi.http_status, CacheApi.etag, CacheApi.wygasa
+        ).filter(CacheApi.zrodlo_id == zrodlo_id)
+        if barcode is not None:
+            query = query.filter(CacheApi.barcode == barcode)
+        else:
+            query = query.filter(CacheApi.barcode.is_(None), CacheApi.zapytanie == zapytanie)
+        row = query.order_by(CacheApi.id.desc()).first()
+
+        if row is not None and row.wygasa is not None and row.wygasa > now:
+            result = ApiCache._result(row, 'db')
+            ApiCache._lru_put(key, row.wygasa, result)
+            return result
+
+        headers = {}
+        if row is not None and row.etag:
+            headers['If-None-Match'] = row.etag
+
+        if rate_limiter is not None:
+            rate_limiter.acquire()
+        response = http.get(url, params=params, headers=headers)
+
+        values = {'pobrano': now, 'wygasa': now + ttl}
+        if response.status_code == 304 and row is not None:
+            status, data = row.http_status, row.odpowiedz
+            if status == 404 and not_found_ttl is not None:
+                values['wygasa'] = now + not_found_ttl
+            source = 'revalidated'
+        else:
+            if response.status_code == 404 and not_found_ttl is not None:
+                status, data = 404, ApiCache._json_or_empty(response)
+                values['wygasa'] = now + not_found_ttl
+            else:
+                response.raise_for_status()
+                status, data = response.status_code, response.json()
+            if project is not None:
+                values['odpowiedz_surowa'] = compress(data)
+                data = project(data)
+            values.update(odpowiedz=data, http_status=status, etag=response.headers.get('ETag'))
+            source = 'network'
+
+        try:
+            # Osobne połączenie i transakcja - cache nie zatwierdza ani nie
+            # wycofuje niezapisanych zmian sesji wywołującego
+            with db.engine.begin() as conn:
+                table = CacheApi.__table__
+                if row is not None:
+                    conn.execute(table.update().where(table.c.id == row.id).values(**values))
+                    cache_id = row.id
+                else:
+                    inserted = conn.execute(table.insert().values(
+                        zrodlo_id=zrodlo_id, barcode=barcode, zapytanie=zapytanie, **values
+                    ))
+                    cache_id = inserted.inserted_primary_key[0]
+        except Exception as e:
+            # Brak zapisu w cache nie może psuć odpowiedzi
+            current_app.logger.warning(f"Nie udało się zapisać cache_api: {e}")
+            return {'status': status, 'data': data, 'cache_id': None, 'source': source}
+
+        result = {'status': status, 'data': data, 'cache_id': cache_id, 'source': source}
+        ApiCache._lru_put(key, values['wygasa'], result)
+        return result
+
+    @staticmethod
+    def clear_lru():
+        """Czyści LRU w pamięci (tabela cache_api zostaje)"""
+        with _lru_lock:
+            _lru.clear()
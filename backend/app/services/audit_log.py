@@ -0,0 +1,309 @@
+# Dziennik zmian (logi_zdarzen)
+# Migawki przed/po zbierane zdarzeniami sesji, zapisywane w tle partiami - bez INSERT w żądaniu
+
+import atexit
+import json
+import queue
+import threading
+import time
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from flask import current_app, has_app_context, has_request_context
+from flask_jwt_extended import get_jwt_identity
+from sqlalchemy import event, inspect, insert
+from sqlalchemy.orm import Session
+
+from ..extensions import db
+from ..models import FridgeItem, Lodowka, Log, Product, User
+
+
+# Modele objęte dziennikiem i kolumny, które do niego nie trafiają
+AUDITED_MODELS = (FridgeItem, Product, Lodowka, User)
+EXCLUDED_COLUMNS = {'haslo_hash'}
+
+TYPE_INSERT = 'INSERT'
+TYPE_UPDATE = 'UPDATE'
+TYPE_DELETE = 'DELETE'
+# Typy zmian modeli - zapisuje je tylko AuditLog, nie wpisy z API
+RESERVED_TYPES = frozenset({TYPE_INSERT, TYPE_UPDATE, TYPE_DELETE})
+
+# Stan writera wspólny dla procesu:
+# - queue: ograniczona kolejka wierszy logi_zdarzen
+# - thread: wątek zapisujący partie
+# - app: aplikacja, w której kontekście działa wątek
+_state = {'queue': None, 'thread': None, 'app': None}
+_lock = threading.Lock()
+_STOP = object()
+
+
+def _json(values: Optional[Dict]) -> Optional[str]:
+    if values is None:
+        return None
+    return json.dumps(values, ensure_ascii=False, default=str)
+
+
+class AuditLog:
+    """
+    Zapis zmian modeli do logi_zdarzen.
+
+    Zdarzenie after_flush zbiera migawki zmienionych obiektów do
+    session.info, after_commit przekazuje je do ograniczonej kolejki,
+    z której wątek w tle zapisuje partie jednym INSERT (executemany).
+    Wycofana transakcja nie zostawia wpisów. Przy pełnej kolejce
+    i przy zamykaniu procesu wpisy są zapisywane synchronicznie.
+
+    Zapisy z pominięciem jednostki pracy (UPDATE na zbiorach, executemany)
+    nie trafiają do session.dirty - ich wpisy przekazuje track().
+    """
+
+    @staticmethod
+    def enabled() -> bool:
+        """Czy dziennik jest włączony (AUDIT_LOG_ENABLED w kontekście aplikacji)"""
+        return has_app_context() and current_app.config['AUDIT_LOG_ENABLED']
+
+    @staticmethod
+    def _actor_id() -> Optional[int]:
+        """ID zalogowanego użytkownika wykonującego zmianę (None poza żądaniem z JWT)"""
+        if not has_request_context():
+            return None
+        try:
+            identity = get_jwt_identity()
+        except RuntimeError:
+            return None
+        try:
+            return int(identity) if identity is not None else None
+        except (TypeError, ValueError):
+            return None
+
+    @staticmethod
+    def _snapshot(state) -> Dict:
+        """Załadowane wartości kolumn obiektu (bez wymuszania zapytań)"""
+        return {
+            attr.key: state.dict[attr.key]
+            for attr in state.mapper.column_attrs
+            if attr.key in state.dict and attr.key not in EXCLUDED_COLUMNS
+        }
+
+    @staticmethod
+    def _changes(state):
+        """
+        Krotka (przed, po) tylko ze zmienionych kolumn
+
+        Poprzednia wartość jest znana, gdy atrybut był załadowany przed
+        zmianą - dla wygasłych atrybutów (np. po commit) nie ma jej w przed,
+        zamiast dodatkowego SELECT przy każdym zapisie.
+        """
+        before, after = {}, {}
+        for attr in state.mapper.column_attrs:
+            if attr.key in EXCLUDED_COLUMNS:
+                continue
+            history = state.attrs[attr.key].history
+            if not history.has_changes():
+                continue
+            if history.deleted:
+                before[attr.key] = history.deleted[0]
+            after[attr.key] = history.added[0] if history.added else None
+        return before, after
+
+    @staticmethod
+    def _lodowka_id(obj, typ: str) -> Optional[int]:
+        if isinstance(obj, FridgeItem):
+            return obj.lodowka_id
+        # Usunięta lodówka nie może być celem klucza obcego logi_zdarzen.lodowka_id
+        if isinstance(obj, Lodowka) and typ != TYPE_DELETE:
+            return obj.id
+        return None
+
+    @staticmethod
+    def entry(typ: str, tabela: str, rekord_id: int, przed: Optional[Dict] = None,
+              po: Optional[Dict] = None, uzytkownik_id: Optional[int] = None,
+              lodowka_id: Optional[int] = None, czas: Optional[datetime] = None) -> Dict:
+        """Wiersz logi_zdarzen gotowy do zapisu"""
+        return {
+            'typ': typ,
+            'tabela': tabela,
+            'rekord_id': rekord_id,
+            'uzytkownik_id': uzytkownik_id,
+            'lodowka_id': lodowka_id,
+            'czas': czas or datetime.utcnow(),
+            'przed': _json(przed),
+            'po': _json(po),
+        }
+
+    @staticmethod
+    def collect(session) -> List[Dict]:
+        """Wpisy dla obiektów zapisanych właśnie przez flush"""
+        actor_id = AuditLog._actor_id()
+        now = datetime.utcnow()
+        entries = []
+
+        def add(obj, typ, przed, po):
+            entries.append(AuditLog.entry(
+                typ, obj.__tablename__, obj.id, przed, po,
+                uzytkownik_id=actor_id, lodowka_id=AuditLog._lodowka_id(obj, typ), czas=now,
+            ))
+
+        for obj in session.new:
+            if isinstance(obj, AUDITED_MODELS):
+                add(obj, TYPE_INSERT, None, AuditLog._snapshot(inspect(obj)))
+        for obj in session.dirty:
+            if isinstance(obj, AUDITED_MODELS):
+                before, after = AuditLog._changes(inspect(obj))
+                if after:
+                    add(obj, TYPE_UPDATE, before, after)
+        for obj in session.deleted:
+            if isinstance(obj, AUDITED_MODELS):
+                add(obj, TYPE_DELETE, AuditLog._snapshot(inspect(obj)), None)
+        return entries
+
+    @staticmethod
+    def track(session, entries: List[Dict]):
+        """
+        Dołącza wpisy do transakcji sesji - zapisywane po commit razem
+        z zebranymi przez after_flush, odrzucane przy rollback
+        """
+        if entries and AuditLog.enabled():
+            session.info.setdefault('audit_log_entries', []).extend(entries)
+
+    @staticmethod
+    def write(app, rows: List[Dict]):
+        """
+        Synchroniczny zapis wpisów osobnym połączeniem (poza sesją żądania)
+
+        Gdy partia się nie zapisze (np. klucz obcy do usuniętego rekordu),
+        wpisy są zapisywane pojedynczo, żeby jeden błędny nie gubił reszty.
+        """
+        if not rows:
+            return
+        with app.app_context():
+            table = Log.__table__
+            try:
+                with db.engine.begin() as connection:
+                    connection.execute(insert(table), rows)
+                return
+            except Exception:
+                app.logger.exception(f"Zapis partii {len(rows)} wpisów logi_zdarzen nie powiódł się")
+
+            for row in rows:
+                try:
+                    with db.engine.begin() as connection:
+                        connection.execute(insert(table), [row])
+                except Exception:
+                    app.logger.warning(f"Pominięto wpis logi_zdarzen {row['tabela']}#{row['rekord_id']}")
+
+    @staticmethod
+    def record(rows: List[Dict]):
+        """
+        Przekazuje wpisy do zapisu w tle (AUDIT_LOG_ASYNC) albo zapisuje je od razu
+
+        Przy pełnej kolejce pozostałe wpisy są zapisywane synchronicznie.
+        """
+        if not rows:
+            return
+        app = current_app._get_current_object()
+        if not app.config['AUDIT_LOG_ASYNC']:
+            AuditLog.write(app, rows)
+            return
+
+        pending = AuditLog._queue(app)
+        for index, row in enumerate(rows):
+            try:
+                pending.put_nowait(row)
+            except queue.Full:
+                app.logger.warning("Kolejka logi_zdarzen pełna - zapis synchroniczny")
+                AuditLog.write(app, rows[index:])
+                return
+
+    @staticmethod
+    def _queue(app) -> queue.Queue:
+        """Kolejka writera - wątek startuje przy pierwszym wpisie"""
+        with _lock:
+            if _state['thread'] is None or not _state['thread'].is_alive():
+                _state['queue'] = queue.Queue(maxsize=app.config['AUDIT_LOG_QUEUE_SIZE'])
+                _state['app'] = app
+                _state['thread'] = threading.Thread(
+                    target=AuditLog._run, args=(app, _state['queue']), name='audit-log-writer', daemon=True,
+                )
+                _state['thread'].start()
+            return _state['queue']
+
+    @staticmethod
+    def _run(app, pending: queue.Queue):
+        """Pętla writera: partia do AUDIT_LOG_BATCH_SIZE wpisów albo po AUDIT_LOG_FLUSH_INTERVAL"""
+        batch_size = app.config['AUDIT_LOG_BATCH_SIZE']
+        interval = app.config['AUDIT_LOG_FLUSH_INTERVAL']
+        stopping = False
+
+        while not stopping:
+            row = pending.get()
+            if row is _STOP:
+                break
+            batch = [row]
+            deadline = time.monotonic() + interval
+            while len(batch) < batch_size:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    row = pending.get(timeout=timeout)
+                except queue.Empty:
+                    break
+                if row is _STOP:
+                    stopping = True
+                    break
+                batch.append(row)
+            AuditLog.write(app, batch)
+
+    @staticmethod
+    def shutdown(timeout: float = 5.0):
+        """
+        Zatrzymuje writer i zapisuje synchronicznie wszystko, co zostało w kolejce
+
+        Wywoływane przy zamykaniu procesu (atexit) i w testach.
+        """
+        with _lock:
+            thread, pending, app = _state['thread'], _state['queue'], _state['app']
+            _state.update(queue=None, thread=None, app=None)
+        if thread is None:
+            return
+
+        try:
+            pending.put(_STOP, timeout=timeout)
+        except queue.Full:
+            pass
+        thread.join(timeout)
+
+        rows = []
+        while True:
+            try:
+                row = pending.get_nowait()
+            except queue.Empty:
+                break
+            if row is not _STOP:
+                rows.append(row)
+        AuditLog.write(app, rows)
+
+
+atexit.register(AuditLog.shutdown)
+
+
+# Wpisy zbierane po każdym flush (są już ID nowych rekordów, a historia
+# atrybutów nadal ma wartości sprzed zapisu), wysyłane dopiero po commit
+
+@event.listens_for(Session, "after_flush")
+def _collect_audit_entries(session, flush_context):
+    if AuditLog.enabled():
+        AuditLog.track(session, AuditLog.collect(session))
+
+
+@event.listens_for(Session, "after_commit")
+def _send_audit_entries(session):
+    entries = session.info.pop('audit_log_entries', None)
+    if entries:
+        AuditLog.record(entries)
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _discard_audit_entries(session, previous_transaction):
+    session.info.pop('audit_log_entries', None)
@@ -1,8 +1,11 @@
 # Serwis autentykacji
 # Logika biznesowa związana z autentykacją i autoryzacją użytkowników
 
+import threading
+import time
 from datetime import datetime
 
+from flask import current_app, g, has_request_context
 from werkzeug.security import generate_password_hash, check_password_hash
 from flask_jwt_extended import create_access_token
 
@@ -10,6 +13,15 @@ from ..models import User
 from ..extensions import db
 
 
+# Cache nazw wyświetlanych w nawigacji: {user_id: (imie, wygasa_monotonic)}
+# Wspólny dla całego procesu, z krótkim TTL (USER_NAME_CACHE_TTL).
+_display_names = {}
+_display_names_lock = threading.Lock()
+
+# Rola z dostępem do operacji administracyjnych (eksporty, logi, masowe uzupełnianie)
+ADMIN_ROLE = "admin"
+
+
 class AuthService:
     """
     Serwis obsługujący autentykację użytkowników.
@@ -119,13 +131,85 @@ class AuthService:
         """
         Pobiera użytkownika po ID.
 
+        W trakcie żądania HTTP wynik jest zapamiętywany w flask.g, więc context
+        processor szablonów i widok współdzielą jedno zapytanie do bazy.
+
         Args:
             user_id: ID użytkownika (int lub str).
 
         Returns:
             Obiekt User lub None.
         """
-        return User.query.filter_by(id=user_id, usunieto=None).first()
+        user_id = int(user_id)
+
+        if not has_request_context():
+            return User.query.filter_by(id=user_id, usunieto=None).first()
+
+        if "_users_by_id" not in g:
+            g._users_by_id = {}
+        if user_id not in g._users_by_id:
+            g._users_by_id[user_id] = User.query.filter_by(id=user_id, usunieto=None).first()
+        return g._users_by_id[user_id]
+
+    @staticmethod
+    def is_admin(user_id):
+        """
+        Sprawdza czy użytkownik ma rolę administratora.
+
+        Args:
+            user_id: ID użytkownika (int lub str).
+
+        Returns:
+            True dla aktywnego użytkownika z rolą 'admin'.
+        """
+        if user_id is None:
+            return False
+        user = AuthService.get_user_by_id(user_id)
+        return user is not None and user.rola == ADMIN_ROLE
+
+    @staticmethod
+    def get_display_name(user_id):
+        """
+        Zwraca imię użytkownika do nawigacji.
+
+        Najpierw sprawdza cache procesu (TTL z USER_NAME_CACHE_TTL, 0 wyłącza),
+        potem pobiera użytkownika przez get_user_by_id.
+
+        Args:
+            user_id: ID użytkownika (int lub str).
+
+        Returns:
+            Imię użytkownika lub None.
+        """
+        user_id = int(user_id)
+        ttl = current_app.config.get("USER_NAME_CACHE_TTL", 0)
+        now = time.monotonic()
+
+        if ttl:
+            with _display_names_lock:
+                cached = _display_names.get(user_id)
+            if cached and cached[1] > now:
+                return cached[0]
+
+        user = AuthService.get_user_by_id(user_id)
+        user_name = user.imie if user and user.imie else None
+
+        if ttl:
+            with _display_names_lock:
+                _display_names[user_id] = (user_name, now + ttl)
+
+        return user_name
+
+    @staticmethod
+    def invalidate_display_name(user_id):
+        """
+        Usuwa imię użytkownika z cache procesu (np. po edycji profilu).
+
+        Args:
+            user_id: ID użytkownika (int lub str).
+        """
+        with _display_names_lock:
+            _display_names.pop(int(user_id), None)
 
     @staticmethod
     def change_password(user_id, old_password: str, new_password: str):
@@ -0,0 +1,59 @@
+# Operacje masowe na bazie danych
+# Upsert zależny od dialektu (MySQL/MariaDB w produkcji, SQLite w testach)
+
+from sqlalchemy.dialects.mysql import insert as mysql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from ..extensions import db
+
+
+def bulk_upsert(model, rows, conflict_columns, update_columns, increment_columns=()):
+    """
+    Wstawia wiersze albo aktualizuje istniejące jednym zapytaniem.
+
+    - MySQL/MariaDB: INSERT ... ON DUPLICATE KEY UPDATE
+    - SQLite: INSERT ... ON CONFLICT (...) DO UPDATE
+    - inne: merge wiersz po wierszu
+
+    Nie wykonuje commit.
+
+    Args:
+        model: Klasa modelu
+        rows: Lista słowników kolumna -> wartość (te same klucze w każdym)
+        conflict_columns: Kolumny klucza unikalnego (dla SQLite)
+        update_columns: Kolumny nadpisywane przy konflikcie
+        increment_columns: Kolumny powiększane przy konflikcie o wstawianą wartość
+
+    Returns:
+        Liczba przekazanych wierszy
+    """
+    if not rows:
+        return 0
+
+    table = model.__table__
+    dialect = db.session.get_bind().dialect.name
+
+    if dialect in ('mysql', 'mariadb'):
+        stmt = mysql_insert(table)
+        values = {col: stmt.inserted[col] for col in update_columns}
+        values.update({col: table.c[col] + stmt.inserted[col] for col in increment_columns})
+        stmt = stmt.on_duplicate_key_update(values)
+        db.session.execute(stmt, rows)
+    elif dialect == 'sqlite':
+        stmt = sqlite_insert(table)
+        values = {col: stmt.excluded[col] for col in update_columns}
+        values.update({col: table.c[col] + stmt.excluded[col] for col in increment_columns})
+        stmt = stmt.on_conflict_do_update(index_elements=conflict_columns, set_=values)
+        db.session.execute(stmt, rows)
+    else:
+        for row in rows:
+            existing = model.query.filter_by(**{col: row[col] for col in conflict_columns}).first()
+            if existing is None:
+                db.session.add(model(**row))
+            else:
+                for col in update_columns:
+                    setattr(existing, col, row[col])
+                for col in increment_columns:
+                    setattr(existing, col, getattr(existing, col) + row[col])
+
+    return len(rows)
@@ -0,0 +1,180 @@
+# Serwis eksportu logów i historii operacji
+# Strumieniowanie CSV / NDJSON partiami kursora serwerowego - stała pamięć niezależnie od zakresu
+
+import csv
+import io
+import json
+from datetime import date, datetime, timedelta
+from typing import Iterator, Optional, Sequence
+
+from sqlalchemy import select
+
+from ..extensions import db
+from ..models import FridgeItem, Log, OperationHistory, Product
+
+
+class ExportService:
+    """
+    Eksport logi_zdarzen i historia_operacji_pozycji do CSV lub NDJSON.
+
+    Zapytanie idzie z yield_per (w SQLAlchemy 2 włącza stream_results -
+    kursor serwerowy, np. SSCursor w PyMySQL), więc w pamięci jest jedna
+    partia wierszy. Każda partia jest formatowana do jednego fragmentu
+    tekstu, który route przekazuje do strumieniowej odpowiedzi Flask.
+    """
+
+    FORMATS = {
+        'csv': 'text/csv; charset=utf-8',
+        'ndjson': 'application/x-ndjson',
+    }
+    DEFAULT_BATCH_SIZE = 1000
+
+    LOG_COLUMNS = ('id', 'czas', 'typ', 'tabela', 'rekord_id', 'uzytkownik_id', 'lodowka_id', 'przed', 'po')
+    OPERATION_COLUMNS = (
+        'id', 'utworzono', 'typ', 'nazwa', 'ilosc', 'jednostka', 'komentarz',
+        'pozycja_id', 'produkt_id', 'uzytkownik_id',
+    )
+
+    @staticmethod
+    def _validate(fmt: str, date_from: Optional[date], date_to: Optional[date]):
+        if fmt not in ExportService.FORMATS:
+            raise ValueError('Nieobsługiwany format eksportu (csv lub ndjson)')
+        if date_from and date_to and date_from > date_to:
+            raise ValueError('Data początkowa jest późniejsza niż końcowa')
+
+    @staticmethod
+    def _date_range(stmt, column, date_from: Optional[date], date_to: Optional[date]):
+        """Zakres dni włącznie - porównania na samej kolumnie, żeby działał indeks"""
+        if date_from:
+            stmt = stmt.where(column >= datetime.combine(date_from, datetime.min.time()))
+        if date_to:
+            stmt = stmt.where(column < datetime.combine(date_to + timedelta(days=1), datetime.min.time()))
+        return stmt
+
+    @staticmethod
+    def _value(value):
+        if isinstance(value, datetime):
+            return value.isoformat()
+        if value is None or isinstance(value, (int, str)):
+            return value
+        # Decimal z kolumn Numeric
+        return float(value)
+
+    @staticmethod
+    def _encode(fmt: str, columns: Sequence[str], stmt, batch_size: int) -> Iterator[str]:
+        """
+        Fragmenty pliku: nagłówek CSV, potem jeden fragment na partię wierszy
+        """
+        if fmt == 'csv':
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            writer.writerow(columns)
+            yield buffer.getvalue()
+
+        result = db.session.execute(stmt.execution_options(yield_per=batch_size))
+        for partition in result.partitions():
+            if fmt == 'csv':
+                buffer = io.StringIO()
+                writer = csv.writer(buffer)
+                writer.writerows(
+                    [ExportService._value(value) for value in row] for row in partition
+                )
+                yield buffer.getvalue()
+            else:
+                yield ''.join(
+                    json.dumps(
+                        {name: ExportService._value(value) for name, value in zip(columns, row)},
+                        ensure_ascii=False,
+                    ) + '\n'
+                    for row in partition
+                )
+
+    @staticmethod
+    def export_logs(fmt: str = 'csv', date_from: Optional[date] = None, date_to: Optional[date] = None,
+                    uzytkownik_id: Optional[int] = None, typ: Optional[str] = None,
+                    batch_size: int = DEFAULT_BATCH_SIZE) -> Iterator[str]:
+        """
+        Eksport logów zdarzeń, od najstarszych
+
+        Filtr użytkownika + zakres dat korzysta z logi_zdarzen_index_12
+        (uzytkownik_id, czas), sam zakres dat z logi_zdarzen_index_13 (czas).
+
+        Args:
+            fmt: 'csv' albo 'ndjson'
+            date_from: Pierwszy dzień zakresu (włącznie)
+            date_to: Ostatni dzień zakresu (włącznie)
+            uzytkownik_id: Tylko zdarzenia tego użytkownika
+            typ: Tylko zdarzenia tego typu
+            batch_size: Liczba wierszy w partii kursora
+
+        Returns:
+            Generator fragmentów pliku (walidacja parametrów odbywa się od razu)
+
+        Raises:
+            ValueError: Przy nieprawidłowym formacie lub zakresie dat
+        """
+        ExportService._validate(fmt, date_from, date_to)
+
+        stmt = select(*(getattr(Log, name) for name in ExportService.LOG_COLUMNS))
+        stmt = ExportService._date_range(stmt, Log.czas, date_from, date_to)
+        if uzytkownik_id is not None:
+            stmt = stmt.where(Log.uzytkownik_id == uzytkownik_id)
+        if typ:
+            stmt = stmt.where(Log.typ == typ)
+        stmt = stmt.order_by(Log.czas, Log.id)
+
+        return ExportService._encode(fmt, ExportService.LOG_COLUMNS, stmt, batch_size)
+
+    @staticmethod
+    def export_operations(lodowka_id: int, fmt: str = 'csv', date_from: Optional[date] = None,
+                          date_to: Optional[date] = None, typ: Optional[str] = None,
+                          uzytkownik_id: Optional[int] = None,
+                          batch_size: int = DEFAULT_BATCH_SIZE) -> Iterator[str]:
+        """
+        Eksport historii operacji lodówki, od najstarszych
+
+        Args:
+            lodowka_id: ID lodówki
+            fmt: 'csv' albo 'ndjson'
+            date_from: Pierwszy dzień zakresu (włącznie)
+            date_to: Ostatni dzień zakresu (włącznie)
+            typ: Typ operacji ('dodano' / 'zuzyto' / 'usunieto')
+            uzytkownik_id: Tylko operacje wykonane przez tego użytkownika
+            batch_size: Liczba wierszy w partii kursora
+
+        Returns:
+            Generator fragmentów pliku (walidacja parametrów odbywa się od razu)
+
+        Raises:
+            ValueError: Przy nieprawidłowym formacie, typie lub zakresie dat
+        """
+        ExportService._validate(fmt, date_from, date_to)
+        if typ and typ not in ('dodano', 'zuzyto', 'usunieto'):
+            raise ValueError('Nieprawidłowy typ operacji')
+
+        stmt = select(
+            OperationHistory.id,
+            OperationHistory.utworzono,
+            OperationHistory.typ,
+            db.func.coalesce(FridgeItem.nazwa_wlasna, Product.nazwa),
+            OperationHistory.ilosc,
+            OperationHistory.jednostka_g_ml_szt,
+            OperationHistory.komentarz,
+            OperationHistory.pozycja_id,
+            FridgeItem.produkt_id,
+            OperationHistory.uzytkownik_id,
+        ).join(
+            FridgeItem, FridgeItem.id == OperationHistory.pozycja_id
+        ).outerjoin(
+            Product, Product.id == FridgeItem.produkt_id
+        ).where(
+            FridgeItem.lodowka_id == lodowka_id
+        )
+        stmt = ExportService._date_range(stmt, OperationHistory.utworzono, date_from, date_to)
+        if typ:
+            stmt = stmt.where(OperationHistory.typ == typ)
+        if uzytkownik_id is not None:
+            stmt = stmt.where(OperationHistory.uzytkownik_id == uzytkownik_id)
+        stmt = stmt.order_by(OperationHistory.utworzono, OperationHistory.id)
+
+        return ExportService._encode(fmt, ExportService.OPERATION_COLUMNS, stmt, batch_size)
@@ -1,9 +1,26 @@
 # Serwis zarządzania lodówką
 # Logika biznesowa związana z operacjami na produktach w lodówce
 
-from ..models import FridgeItem, Product, OperationHistory
+import threading
+import time
+from ..models import FridgeItem, Product, OperationHistory, Lodowka
 from ..extensions import db
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
+from flask import current_app
+from sqlalchemy import case, func, insert, update
+from .audit_log import TYPE_UPDATE, AuditLog
+from .statistics_service import StatisticsService
+from .quantity import (
+    UNIT_FACTORS, UNIT_KINDS, Quantity, from_base_unit, round_up_to_step,
+    to_base_amounts, to_base_int,
+)
+
+
+# Cache liczników dashboardu: {lodowka_id: (dzien, wersja_zawartosci, wygasa_monotonic, summary)}
+# Cache jest w każdym workerze osobno - wpis jest ważny tylko dla wersji
+# lodowka.wersja_zawartosci, którą invalidate_summary zwiększa po każdej zmianie.
+_summary_cache = {}
+_summary_cache_lock = threading.Lock()
 
 
 class FridgeService:
@@ -11,6 +28,408 @@ class FridgeService:
     Serwis obsługujący operacje na produktach w lodówce
     """
     
+    @staticmethod
+    def get_user_fridge(user_id):
+        """
+        Pobiera aktywną lodówkę użytkownika
+        
+        Args:
+            user_id: ID użytkownika (właściciela)
+        
+        Returns:
+            Obiekt Lodowka lub None
+        """
+        return (
+            db.session.query(Lodowka)
+            .filter(Lodowka.wlasciciel_id == user_id)
+            .filter(Lodowka.usunieto.is_(None))
+            .first()
+        )
+    
+    @staticmethod
+    def get_grouped_items(lodowka_id, expiring_until=None):
+        """
+        Pobiera zgrupowane pozycje lodówki jednym zapytaniem agregującym.
+        
+        Grupowanie i normalizacja jednostek (g/kg → mg, ml/l → µl, szt → 1/1000 szt)
+        odbywa się po stronie bazy (GROUP BY + SUM), więc nie ładujemy pojedynczych pozycji
+        ani ich relacji. Wspólne źródło danych dla widoku lodówki, produktów
+        wygasających, listy produktów i Asystenta Kucharza.
+        
+        Args:
+            lodowka_id: ID lodówki
+            expiring_until: Opcjonalnie - tylko pozycje ważne do tej daty (włącznie)
+        
+        Returns:
+            Lista słowników (jeden na grupę, w kolejności dodania) z kluczami:
+            repr_id, produkt_id, nazwa_wlasna, wazne_do, base_amount (int),
+            unit_type, liczba_pozycji, first_created, last_created
+        """
+        unit = FridgeItem.jednostka_g_ml_szt
+        base_factor = case(
+            *[(unit == u, factor) for u, factor in UNIT_FACTORS.items()],
+            else_=UNIT_FACTORS['szt'],
+        )
+        unit_type = case(
+            *[(unit == u, kind) for u, kind in UNIT_KINDS.items()],
+            else_='piece',
+        )
+        
+        # Grupujemy po group_key (indeks lodowka_id, usunieto, group_key) - pola
+        # grupy są w obrębie klucza identyczne, więc MIN() tylko je odczytuje
+        query = (
+            db.session.query(
+                func.min(FridgeItem.produkt_id).label('produkt_id'),
+                func.min(FridgeItem.nazwa_wlasna).label('nazwa_wlasna'),
+                func.min(FridgeItem.wazne_do).label('wazne_do'),
+                func.min(FridgeItem.id).label('repr_id'),
+                func.sum(FridgeItem.ilosc * base_factor).label('base_amount'),
+                func.min(unit_type).label('unit_type'),
+                func.count(FridgeItem.id).label('liczba_pozycji'),
+                func.min(FridgeItem.utworzono).label('first_created'),
+                func.max(FridgeItem.utworzono).label('last_created'),
+            )
+            .filter(FridgeItem.lodowka_id == lodowka_id)
+            .filter(FridgeItem.usunieto.is_(None))
+        )
+        
+        if expiring_until is not None:
+            query = (
+                query
+                .filter(FridgeItem.wazne_do.isnot(None))
+                .filter(FridgeItem.wazne_do <= expiring_until)
+            )
+        
+        rows = (
+            query
+            .group_by(FridgeItem.group_key)
+            .order_by(func.min(FridgeItem.id))
+            .all()
+        )
+        
+        groups = []
+        for row in rows:
+            group = dict(row._mapping)
+            # SUM zwraca Decimal (MySQL) lub float (SQLite) - dalej tylko int
+            group['base_amount'] = to_base_int(group['base_amount'])
+            groups.append(group)
+        return groups
+    
+    @staticmethod
+    def get_group_items(lodowka_id, group_key):
+        """
+        Pobiera aktywne pozycje jednej grupy (ten sam produkt + data ważności)
+        
+        Args:
+            lodowka_id: ID lodówki
+            group_key: Klucz grupy (FridgeItem.group_key)
+        
+        Returns:
+            Lista obiektów FridgeItem w kolejności dodania
+        """
+        return (
+            db.session.query(FridgeItem)
+            .filter(FridgeItem.lodowka_id == lodowka_id)
+            .filter(FridgeItem.usunieto.is_(None))
+            .filter(FridgeItem.group_key == group_key)
+            .order_by(FridgeItem.id)
+            .all()
+        )
+    
+    @staticmethod
+    def _lock_positions(lodowka_id, group_key=None, item_id=None):
+        """
+        Blokuje (SELECT ... FOR UPDATE) aktywne pozycje grupy lub jedną pozycję
+        
+        Pobiera tylko kolumny potrzebne do przeliczeń - bez hydratacji obiektów
+        i ich relacji. Blokada trwa do commit/rollback transakcji, więc
+        równoległe zużycie (senior i opiekun) nie nadpisuje sobie ilości.
+        
+        Returns:
+            Lista wierszy (id, ilosc, jednostka_g_ml_szt) w kolejności dodania
+        """
+        query = (
+            db.session.query(FridgeItem.id, FridgeItem.ilosc, FridgeItem.jednostka_g_ml_szt)
+            .filter(FridgeItem.lodowka_id == lodowka_id)
+            .filter(FridgeItem.usunieto.is_(None))
+        )
+        if group_key is not None:
+            query = query.filter(FridgeItem.group_key == group_key)
+        if item_id is not None:
+            query = query.filter(FridgeItem.id == item_id)
+        return query.order_by(FridgeItem.id).with_for_update().all()
+    
+    @staticmethod
+    def _audit_changes(pos, row):
+        """
+        Krotka (przed, po) dla pozycji zmienionej przez consume_from_group -
+        poprzednia ilość jest znana z zablokowanego wiersza
+        """
+        before = {'ilosc': pos.ilosc}
+        after = {'ilosc': row['ilosc'], 'zaktualizowano': row['zaktualizowano']}
+        if row['usunieto'] is not None:
+            before.update(usunieto=None, usunal_id=None)
+            after.update(usunieto=row['usunieto'], usunal_id=row['usunal_id'])
+        return before, after
+    
+    @staticmethod
+    def record_history(entries):
+        """
+        Zapisuje wpisy historii operacji jednym INSERT (executemany)
+        i dolicza je do dziennych statystyk. Nie wykonuje commit.
+        
+        Args:
+            entries: Lista słowników z kolumnami historia_operacji_pozycji
+        """
+        if entries:
+            db.session.execute(insert(OperationHistory), entries)
+            StatisticsService.record_operations(entries)
+    
+    @staticmethod
+    def consume_from_group(lodowka_id, group_key, amount_display, user_id):
+        """
+        Zużywa ilość z grupy pozycji operacjami na zbiorach
+        
+        Ilość jest w jednostce WYŚWIETLANEJ dla sumy grupy (np. 1.2 gdy widok
+        pokazuje kg). Zużycie jest rozdzielane po kolei na najstarsze pozycje.
+        Wszystkie zmiany ilości idą jednym UPDATE (executemany po kluczu
+        głównym), a historia jednym INSERT. Wpisy logi_zdarzen są dołączane
+        do transakcji (AuditLog.track). Nie wykonuje commit.
+        
+        Args:
+            lodowka_id: ID lodówki
+            group_key: Klucz grupy
+            amount_display: Ilość do zużycia w jednostce wyświetlanej
+            user_id: ID użytkownika zużywającego
+        
+        Returns:
+            Liczba pozycji, z których zużyto (0 gdy grupa jest pusta)
+        
+        Raises:
+            ValueError: Gdy ilość przekracza stan grupy
+        """
+        positions = FridgeService._lock_positions(lodowka_id, group_key=group_key)
+        if not positions:
+            return 0
+        
+        # Suma grupy w całkowitych jednostkach bazowych - jedno przeliczenie listy
+        units = [pos.jednostka_g_ml_szt for pos in positions]
+        bases = to_base_amounts([pos.ilosc for pos in positions], units)
+        total = Quantity(sum(bases), UNIT_KINDS.get(units[0], 'piece'))
+        
+        # Jednostka wyświetlana -> bazowa (np. 1.2 kg -> mg)
+        _, display_unit = total.display()
+        to_consume = Quantity.from_unit(amount_display, display_unit)
+        
+        if to_consume.base > total.base:
+            raise ValueError("Nie możesz zużyć więcej niż posiadasz")
+        
+        now = datetime.utcnow()
+        updates = []
+        history = []
+        remaining_to_consume = to_consume.base
+        
+        for pos, unit, pos_base in zip(positions, units, bases):
+            if remaining_to_consume <= 0:
+                break
+            
+            # Porcja zaokrąglona w górę do 0.001 jednostki pozycji, więc
+            # zapis w kolumnie Numeric(10,3) jest dokładny
+            consume_from_this = min(round_up_to_step(remaining_to_consume, unit), pos_base)
+            consumed_in_original = from_base_unit(consume_from_this, unit)
+            nowa_ilosc = from_base_unit(pos_base - consume_from_this, unit)
+            remaining_to_consume -= consume_from_this
+            
+            wyczerpano = consume_from_this == pos_base
+            updates.append({
+                'id': pos.id,
+                'ilosc': nowa_ilosc,
+                'zaktualizowano': now,
+                'usunieto': now if wyczerpano else None,
+                'usunal_id': user_id if wyczerpano else None,
+            })
+            history.append({
+                'pozycja_id': pos.id,
+                'typ': 'zuzyto',
+                'ilosc': consumed_in_original,
+                'jednostka_g_ml_szt': unit,
+                'komentarz': f'Zużyto {consumed_in_original.normalize():f} {unit} z pozycji',
+                'uzytkownik_id': user_id,
+                'utworzono': now,
+            })
+        
+        db.session.execute(update(FridgeItem), updates)
+        FridgeService.record_history(history)
+        
+        if AuditLog.enabled():
+            AuditLog.track(db.session, [
+                AuditLog.entry(
+                    TYPE_UPDATE, FridgeItem.__tablename__, pos.id,
+                    *FridgeService._audit_changes(pos, row),
+                    uzytkownik_id=user_id, lodowka_id=lodowka_id, czas=now,
+                )
+                for pos, row in zip(positions, updates)
+            ])
+        
+        return len(updates)
+    
+    @staticmethod
+    def discard(lodowka_id, user_id, group_key=None, item_id=None):
+        """
+        Wyrzuca (soft delete) całą grupę pozycji albo jedną pozycję
+        
+        Jeden UPDATE ... WHERE group_key (lub id) na zablokowanych wierszach
+        i jeden INSERT historii. Wpisy logi_zdarzen są dołączane do
+        transakcji (AuditLog.track). Nie wykonuje commit.
+        
+        Args:
+            lodowka_id: ID lodówki
+            user_id: ID użytkownika wyrzucającego
+            group_key: Klucz grupy (wyrzucenie całej grupy)
+            item_id: ID pozycji (wyrzucenie jednej pozycji)
+        
+        Returns:
+            Liczba wyrzuconych pozycji
+        """
+        positions = FridgeService._lock_positions(lodowka_id, group_key=group_key, item_id=item_id)
+        if not positions:
+            return 0
+        
+        now = datetime.utcnow()
+        query = (
+            db.session.query(FridgeItem)
+            .filter(FridgeItem.lodowka_id == lodowka_id)
+            .filter(FridgeItem.usunieto.is_(None))
+        )
+        if group_key is not None:
+            query = query.filter(FridgeItem.group_key == group_key)
+        if item_id is not None:
+            query = query.filter(FridgeItem.id == item_id)
+        query.update(
+            {'usunieto': now, 'usunal_id': user_id, 'zaktualizowano': now},
+            synchronize_session=False,
+        )
+        
+        komentarz = 'Usunięto grupę produktów' if group_key is not None else 'Usunięto pozycję'
+        FridgeService.record_history([
+            {
+                'pozycja_id': pos.id,
+                'typ': 'usunieto',
+                'ilosc': pos.ilosc,
+                'jednostka_g_ml_szt': pos.jednostka_g_ml_szt,
+                'komentarz': komentarz,
+                'uzytkownik_id': user_id,
+                'utworzono': now,
+            }
+            for pos in positions
+        ])
+        
+        if AuditLog.enabled():
+            po = {'usunieto': now, 'usunal_id': user_id, 'zaktualizowano': now}
+            AuditLog.track(db.session, [
+                AuditLog.entry(
+                    TYPE_UPDATE, FridgeItem.__tablename__, pos.id,
+                    przed={'usunieto': None, 'usunal_id': None}, po=po,
+                    uzytkownik_id=user_id, lodowka_id=lodowka_id, czas=now,
+                )
+                for pos in positions
+            ])
+        
+        return len(positions)
+    
+    @staticmethod
+    def get_summary(lodowka_id):
+        """
+        Zwraca liczniki dashboardu dla lodówki jednym zapytaniem
+        
+        Wynik jest trzymany w cache procesu (FRIDGE_SUMMARY_CACHE_TTL sekund,
+        najdłużej do końca dnia) razem z wersją zawartości lodówki. Każdy
+        odczyt porównuje ją z lodowka.wersja_zawartosci (odczyt po kluczu
+        głównym), więc zmiana obsłużona przez inny worker też unieważnia cache.
+        
+        Args:
+            lodowka_id: ID lodówki
+        
+        Returns:
+            Dict z kluczami:
+            - count: liczba zgrupowanych produktów (jak w widoku lodówki)
+            - expiring_soon_count: liczba pozycji ważnych do jutra
+            - expired_count: liczba pozycji przeterminowanych
+        """
+        dzisiaj = date.today()
+        ttl = current_app.config.get('FRIDGE_SUMMARY_CACHE_TTL', 0)
+        now = time.monotonic()
+        
+        if ttl:
+            wersja = (
+                db.session.query(Lodowka.wersja_zawartosci)
+                .filter(Lodowka.id == lodowka_id)
+                .scalar()
+            )
+            with _summary_cache_lock:
+                cached = _summary_cache.get(lodowka_id)
+            if cached and cached[:2] == (dzisiaj, wersja) and cached[2] > now:
+                return dict(cached[3])
+        
+        jutro = dzisiaj + timedelta(days=1)
+        
+        # Grupy jak w widoku lodówki, z liczbą pozycji w każdej grupie
+        groups = (
+            db.session.query(
+                func.min(FridgeItem.wazne_do).label('wazne_do'),
+                func.count(FridgeItem.id).label('pozycje'),
+            )
+            .filter(FridgeItem.lodowka_id == lodowka_id)
+            .filter(FridgeItem.usunieto.is_(None))
+            .group_by(FridgeItem.group_key)
+            .subquery()
+        )
+        
+        row = db.session.query(
+            func.count().label('count'),
+            func.sum(case((groups.c.wazne_do == jutro, groups.c.pozycje), else_=0)).label('expiring_soon_count'),
+            func.sum(case((groups.c.wazne_do < dzisiaj, groups.c.pozycje), else_=0)).label('expired_count'),
+        ).select_from(groups).one()
+        
+        summary = {
+            'count': int(row.count or 0),
+            'expiring_soon_count': int(row.expiring_soon_count or 0),
+            'expired_count': int(row.expired_count or 0),
+        }
+        
+        if ttl:
+            with _summary_cache_lock:
+                _summary_cache[lodowka_id] = (dzisiaj, wersja, now + ttl, summary)
+        
+        return dict(summary)
+    
+    @staticmethod
+    def invalidate_summary(lodowka_id):
+        """
+        Unieważnia liczniki dashboardu po zmianie zawartości lodówki
+        
+        Wywoływane po commit zmiany: czyści cache tego workera i zwiększa
+        lodowka.wersja_zawartosci (osobny commit), co unieważnia wpisy
+        w pozostałych workerach. Błąd zapisu wersji jest tylko logowany -
+        inne workery pokażą wtedy liczniki najdłużej FRIDGE_SUMMARY_CACHE_TTL.
+        
+        Args:
+            lodowka_id: ID lodówki
+        """
+        with _summary_cache_lock:
+            _summary_cache.pop(lodowka_id, None)
+        
+        try:
+            db.session.execute(
+                update(Lodowka)
+                .where(Lodowka.id == lodowka_id)
+                .values(wersja_zawartosci=Lodowka.wersja_zawartosci + 1)
+            )
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            current_app.logger.warning(f"Nie udało się zwiększyć wersji lodówki {lodowka_id}: {e}")
+    
     @staticmethod
     def get_user_fridge_items(user_id, include_expired=False):
         """
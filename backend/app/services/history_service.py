@@ -0,0 +1,169 @@
+# Serwis historii operacji
+# Stronicowanie kursorem po (utworzono, id) - bez OFFSET przy dużych historiach
+
+import base64
+from datetime import date, datetime, timedelta
+from typing import Dict, Optional
+
+from sqlalchemy import and_, or_
+
+from ..extensions import db
+from ..models import FridgeItem, OperationHistory, Product
+from .fridge_service import FridgeService
+
+
+class HistoryService:
+    """
+    Serwis historii operacji na pozycjach lodówki.
+
+    Strony są wyznaczane kursorem (utworzono, id) ostatniego wiersza
+    poprzedniej strony, więc każda strona to krótki skan indeksu
+    historia_operacji_pozycji_index_8 (utworzono; InnoDB dokłada id),
+    niezależnie od tego, jak daleko w historii jest użytkownik.
+    """
+
+    OPERATION_TYPES = ('dodano', 'zuzyto', 'usunieto')
+    DEFAULT_PAGE_SIZE = 50
+    MAX_PAGE_SIZE = 200
+
+    @staticmethod
+    def encode_cursor(utworzono: datetime, operation_id: int) -> str:
+        """Kursor strony - nieprzezroczysty dla klienta"""
+        raw = f"{utworzono.isoformat()}|{operation_id}"
+        return base64.urlsafe_b64encode(raw.encode('ascii')).decode('ascii')
+
+    @staticmethod
+    def decode_cursor(cursor: str):
+        """
+        Returns:
+            Krotka (utworzono, id)
+
+        Raises:
+            ValueError: Gdy kursor jest nieprawidłowy
+        """
+        try:
+            raw = base64.urlsafe_b64decode(cursor.encode('ascii')).decode('ascii')
+            utworzono, operation_id = raw.split('|')
+            return datetime.fromisoformat(utworzono), int(operation_id)
+        except (ValueError, UnicodeError):
+            raise ValueError('Nieprawidłowy kursor strony')
+
+    @staticmethod
+    def _base_query(lodowka_id: int):
+        """
+        Operacje z lodówki z nazwą produktu - jedno zapytanie z JOIN
+        zamiast wyszukiwania pozycji i produktu dla każdego wiersza
+        """
+        return db.session.query(
+            OperationHistory,
+            FridgeItem.produkt_id,
+            FridgeItem.nazwa_wlasna,
+            Product.nazwa.label('produkt_nazwa'),
+        ).join(
+            FridgeItem, FridgeItem.id == OperationHistory.pozycja_id
+        ).outerjoin(
+            Product, Product.id == FridgeItem.produkt_id
+        ).filter(
+            FridgeItem.lodowka_id == lodowka_id
+        )
+
+    @staticmethod
+    def _to_dict(row) -> Dict:
+        operation = row.OperationHistory
+        return {
+            'id': operation.id,
+            'typ': operation.typ,
+            'ilosc': float(operation.ilosc) if operation.ilosc is not None else None,
+            'jednostka': operation.jednostka_g_ml_szt,
+            'komentarz': operation.komentarz or '',
+            'utworzono': operation.utworzono.isoformat() if operation.utworzono else None,
+            'pozycja_id': operation.pozycja_id,
+            'produkt_id': row.produkt_id,
+            'nazwa': row.nazwa_wlasna or row.produkt_nazwa or 'Produkt bez nazwy',
+        }
+
+    @staticmethod
+    def get_operations(user_id, limit: Optional[int] = None, cursor: Optional[str] = None,
+                       typ: Optional[str] = None, date_from: Optional[date] = None,
+                       date_to: Optional[date] = None, produkt_id: Optional[int] = None) -> Dict:
+        """
+        Strona historii operacji z lodówki użytkownika, od najnowszych
+
+        Args:
+            user_id: ID użytkownika (właściciela lodówki)
+            limit: Liczba operacji na stronie (domyślnie DEFAULT_PAGE_SIZE)
+            cursor: next_cursor z poprzedniej strony
+            typ: Typ operacji ('dodano' / 'zuzyto' / 'usunieto')
+            date_from: Pierwszy dzień zakresu (włącznie)
+            date_to: Ostatni dzień zakresu (włącznie)
+            produkt_id: Tylko operacje na pozycjach tego produktu
+
+        Returns:
+            Dict z kluczami operations i next_cursor (None na ostatniej stronie)
+
+        Raises:
+            ValueError: Przy nieprawidłowych filtrach lub kursorze
+        """
+        limit = limit or HistoryService.DEFAULT_PAGE_SIZE
+        if limit < 1 or limit > HistoryService.MAX_PAGE_SIZE:
+            raise ValueError(f'Liczba operacji na stronie musi być od 1 do {HistoryService.MAX_PAGE_SIZE}')
+        if typ and typ not in HistoryService.OPERATION_TYPES:
+            raise ValueError('Nieprawidłowy typ operacji')
+        if date_from and date_to and date_from > date_to:
+            raise ValueError('Data początkowa jest późniejsza niż końcowa')
+
+        lodowka = FridgeService.get_user_fridge(user_id)
+        if not lodowka:
+            return {'operations': [], 'next_cursor': None}
+
+        query = HistoryService._base_query(lodowka.id)
+        if typ:
+            query = query.filter(OperationHistory.typ == typ)
+        if date_from:
+            query = query.filter(OperationHistory.utworzono >= datetime.combine(date_from, datetime.min.time()))
+        if date_to:
+            query = query.filter(
+                OperationHistory.utworzono < datetime.combine(date_to + timedelta(days=1), datetime.min.time())
+            )
+        if produkt_id:
+            query = query.filter(FridgeItem.produkt_id == produkt_id)
+        if cursor:
+            # (utworzono, id) < kursor - rozpisane, żeby MySQL użył zakresu na indeksie
+            cursor_time, cursor_id = HistoryService.decode_cursor(cursor)
+            query = query.filter(or_(
+                OperationHistory.utworzono < cursor_time,
+                and_(OperationHistory.utworzono == cursor_time, OperationHistory.id < cursor_id),
+            ))
+
+        # Jeden wiersz więcej mówi, czy jest następna strona
+        rows = query.order_by(
+            OperationHistory.utworzono.desc(), OperationHistory.id.desc()
+        ).limit(limit + 1).all()
+
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            last = rows[-1].OperationHistory
+            next_cursor = HistoryService.encode_cursor(last.utworzono, last.id)
+
+        return {
+            'operations': [HistoryService._to_dict(row) for row in rows],
+            'next_cursor': next_cursor,
+        }
+
+    @staticmethod
+    def get_operation(user_id, operation_id: int) -> Optional[Dict]:
+        """
+        Szczegóły operacji - tylko z lodówki użytkownika
+
+        Returns:
+            Dict operacji lub None, gdy nie istnieje albo należy do innej lodówki
+        """
+        lodowka = FridgeService.get_user_fridge(user_id)
+        if not lodowka:
+            return None
+
+        row = HistoryService._base_query(lodowka.id)\
+            .filter(OperationHistory.id == operation_id)\
+            .first()
+        return HistoryService._to_dict(row) if row else None
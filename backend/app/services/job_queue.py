@@ -0,0 +1,368 @@
+# Kolejka zadań w tle
+# Pula wątków o ograniczonej liczbie wykonawców, status zadań we wspólnym pliku SQLite
+
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from flask import current_app
+
+
+# Stan kolejek w procesie:
+# - _executors: {nazwa_kolejki: ThreadPoolExecutor}
+# - _slots: {nazwa_kolejki: BoundedSemaphore} - miejsca puli wspólne dla zadań
+#   i pracy wykonywanej w wątku żądania (strumień Asystenta Kucharza)
+# - _heartbeats: {plik_magazynu: {'thread', 'active'}} - wątek odświeżający
+#   puls zadań procesu i liczba przyjętych, jeszcze niezakończonych zadań
+# Status zadań (i łączenie duplikatów) jest w pliku JOB_STORE_PATH, więc
+# odpytanie o zadanie trafiające do innego workera gunicorna też je widzi.
+_executors = {}
+_slots = {}
+_heartbeats = {}
+_heartbeat_process = {'pid': None}
+_lock = threading.Lock()
+
+_schema_ready = set()
+_schema_lock = threading.Lock()
+
+STATUS_QUEUED = 'queued'
+STATUS_RUNNING = 'running'
+STATUS_DONE = 'done'
+STATUS_FAILED = 'failed'
+
+_COLUMNS = 'id, kolejka, wlasciciel, status, wynik, blad, utworzono, zakonczono, COALESCE(puls, utworzono)'
+
+# Kolumny dodane po pierwszej wersji pliku - uzupełniane w istniejących plikach
+_ADDED_COLUMNS = {'proces': 'TEXT', 'puls': 'REAL'}
+
+STALE_ERROR = 'Zadanie przerwane'
+
+
+class JobQueue:
+    """
+    Lokalna kolejka zadań w tle.
+
+    Każda nazwana kolejka ma własną pulę wątków (JOB_WORKERS[nazwa]), więc
+    długie wywołania modelu AI nie blokują workerów serwera HTTP, a liczba
+    równoległych wywołań odpowiada możliwościom hosta Ollama. Zadania
+    z tym samym kluczem, które jeszcze się nie zakończyły, są łączone
+    w jedno. Zadanie uruchamiane jest w kontekście aplikacji.
+
+    Zadanie wykonuje worker, który je przyjął, ale jego status, wynik
+    i limit JOB_QUEUE_LIMIT są wspólne dla wszystkich workerów hosta
+    (plik SQLite jak w RecipeCache). Przy kilku hostach JOB_STORE_PATH
+    musi wskazywać wspólny wolumin albo ruch musi być przypięty do hosta.
+
+    Limit JOB_WORKERS[nazwa] obejmuje też pracę zajmującą miejsce przez
+    try_acquire (strumieniowe generowanie przepisów), więc oba wejścia
+    do modelu AI dzielą jedną pulę.
+
+    Proces, który przyjął zadania, co JOB_HEARTBEAT_INTERVAL odświeża ich
+    puls. Zadanie bez pulsu dłużej niż JOB_HEARTBEAT_TIMEOUT (worker
+    zrestartowany) jest nieudane - nie łączy się z nim kolejnych zgłoszeń
+    i nie liczy do limitu kolejki.
+    """
+
+    @staticmethod
+    def _process():
+        """Identyfikator procesu workera (po fork gunicorna PID jest inny)"""
+        return f"{socket.gethostname()}:{os.getpid()}"
+
+    @staticmethod
+    def _path():
+        path = current_app.config.get('JOB_STORE_PATH')
+        if not path:
+            os.makedirs(current_app.instance_path, exist_ok=True)
+            path = os.path.join(current_app.instance_path, 'jobs.sqlite3')
+        return path
+
+    @staticmethod
+    def _connect():
+        """Połączenie w trybie autocommit - transakcje otwierane jawnie (BEGIN IMMEDIATE)"""
+        path = JobQueue._path()
+        conn = sqlite3.connect(path, timeout=5, isolation_level=None)
+        if path not in _schema_ready:
+            with _schema_lock:
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS zadania ("
+                    " id TEXT PRIMARY KEY,"
+                    " kolejka TEXT NOT NULL,"
+                    " klucz TEXT,"
+                    " wlasciciel TEXT,"
+                    " status TEXT NOT NULL,"
+                    " wynik TEXT,"
+                    " blad TEXT,"
+                    " utworzono REAL NOT NULL,"
+                    " zakonczono REAL,"
+                    " proces TEXT,"
+                    " puls REAL)"
+                )
+                conn.execute("CREATE INDEX IF NOT EXISTS zadania_kolejka_status ON zadania (kolejka, status)")
+                existing = {row[1] for row in conn.execute("PRAGMA table_info(zadania)")}
+                for column, column_type in _ADDED_COLUMNS.items():
+                    if column not in existing:
+                        conn.execute(f"ALTER TABLE zadania ADD COLUMN {column} {column_type}")
+                _schema_ready.add(path)
+        return conn
+
+    @staticmethod
+    def _to_dict(row, stale_before=None):
+        """Wiersz zadania; niezakończone bez pulsu od stale_before jest zwracane jako nieudane"""
+        job_id, queue, owner, status, result, error, created, finished, heartbeat = row
+        if stale_before is not None and finished is None and heartbeat < stale_before:
+            status, error = STATUS_FAILED, STALE_ERROR
+        return {
+            'id': job_id,
+            'queue': queue,
+            'owner_id': owner,
+            'status': status,
+            'result': json.loads(result) if result is not None else None,
+            'error': error,
+            'created': created,
+            'finished': finished,
+        }
+
+    @staticmethod
+    def _executor(name):
+        with _lock:
+            executor = _executors.get(name)
+            if executor is None:
+                workers = current_app.config['JOB_WORKERS'].get(name, 1)
+                executor = _executors[name] = ThreadPoolExecutor(
+                    max_workers=workers, thread_name_prefix=f'jobs-{name}'
+                )
+            return executor
+
+    @staticmethod
+    def _slot(name, app=None):
+        with _lock:
+            slot = _slots.get(name)
+            if slot is None:
+                workers = (app or current_app).config['JOB_WORKERS'].get(name, 1)
+                slot = _slots[name] = threading.BoundedSemaphore(workers)
+            return slot
+
+    @staticmethod
+    def try_acquire(name):
+        """
+        Zajmuje miejsce w puli kolejki dla pracy wykonywanej poza nią
+        (np. strumieniowanie w wątku żądania) - bez czekania
+
+        Returns:
+            True gdy miejsce zajęto; należy je zwolnić przez release(name)
+        """
+        return JobQueue._slot(name).acquire(blocking=False)
+
+    @staticmethod
+    def release(name):
+        """Zwalnia miejsce zajęte przez try_acquire"""
+        JobQueue._slot(name).release()
+
+    @staticmethod
+    def _prune(conn, now, config):
+        """
+        Usuwa zakończone zadania starsze niż JOB_RESULT_TTL, a niezakończone
+        bez pulsu od JOB_HEARTBEAT_TIMEOUT (worker, który je przyjął, przestał
+        działać) oznacza jako nieudane - żeby nie blokowały limitu kolejki
+        """
+        conn.execute(
+            "DELETE FROM zadania WHERE zakonczono IS NOT NULL AND zakonczono < ?",
+            (now - config['JOB_RESULT_TTL'],),
+        )
+        conn.execute(
+            "UPDATE zadania SET status = ?, blad = ?, zakonczono = ?"
+            " WHERE zakonczono IS NULL AND COALESCE(puls, utworzono) < ?",
+            (STATUS_FAILED, STALE_ERROR, now, now - config['JOB_HEARTBEAT_TIMEOUT']),
+        )
+
+    @staticmethod
+    def _start_heartbeat(app, path):
+        """Liczy przyjęte zadanie i uruchamia wątek pulsu procesu, jeśli nie działa"""
+        with _lock:
+            if _heartbeat_process['pid'] != os.getpid():
+                # Wątki nie przechodzą przez fork - stan rodzica jest nieaktualny
+                _heartbeats.clear()
+                _heartbeat_process['pid'] = os.getpid()
+            state = _heartbeats.setdefault(path, {'thread': None, 'active': 0})
+            state['active'] += 1
+            if state['thread'] is None:
+                state['thread'] = threading.Thread(
+                    target=JobQueue._beat, args=(app, state), name='jobs-heartbeat', daemon=True,
+                )
+                state['thread'].start()
+        return state
+
+    @staticmethod
+    def _finish_heartbeat(state):
+        """Zadanie procesu zakończone - wątek pulsu kończy się, gdy nie ma już żadnego"""
+        with _lock:
+            state['active'] -= 1
+
+    @staticmethod
+    def _beat(app, state):
+        """Pętla wątku pulsu - odświeża puls niezakończonych zadań tego procesu"""
+        interval = app.config['JOB_HEARTBEAT_INTERVAL']
+        process = JobQueue._process()
+        while True:
+            time.sleep(interval)
+            with _lock:
+                if state['active'] <= 0:
+                    state['thread'] = None
+                    return
+            with app.app_context():
+                try:
+                    conn = JobQueue._connect()
+                    try:
+                        conn.execute(
+                            "UPDATE zadania SET puls = ? WHERE proces = ? AND zakonczono IS NULL",
+                            (time.time(), process),
+                        )
+                    finally:
+                        conn.close()
+                except sqlite3.Error:
+                    app.logger.exception("Nie udało się odświeżyć pulsu zadań")
+
+    @staticmethod
+    def submit(name, fn, *args, key=None, owner_id=None):
+        """
+        Dodaje zadanie do kolejki
+
+        Args:
+            name: Nazwa kolejki (np. 'ai')
+            fn: Funkcja wykonywana w tle - jej wynik (JSON) trafia do job['result']
+            *args: Argumenty funkcji
+            key: Opcjonalny klucz łączenia duplikatów
+            owner_id: Właściciel zadania (sprawdzany przy odczycie)
+
+        Returns:
+            Słownik ze statusem zadania (nowego lub już trwającego)
+
+        Raises:
+            ValueError: Gdy w kolejce czeka już JOB_QUEUE_LIMIT zadań
+                        albo magazyn statusów jest niedostępny
+        """
+        app = current_app._get_current_object()
+        now = time.time()
+        key_json = json.dumps(key) if key is not None else None
+        owner = str(owner_id) if owner_id is not None else None
+
+        try:
+            conn = JobQueue._connect()
+            try:
+                # Blokada zapisu pliku - sprawdzenie duplikatu i limitu jest
+                # atomowe także między procesami
+                conn.execute("BEGIN IMMEDIATE")
+                try:
+                    JobQueue._prune(conn, now, app.config)
+
+                    if key_json is not None:
+                        existing = conn.execute(
+                            f"SELECT {_COLUMNS} FROM zadania"
+                            " WHERE kolejka = ? AND klucz = ? AND status IN (?, ?)",
+                            (name, key_json, STATUS_QUEUED, STATUS_RUNNING),
+                        ).fetchone()
+                        if existing is not None:
+                            conn.execute("COMMIT")
+                            return JobQueue._to_dict(existing)
+
+                    pending = conn.execute(
+                        "SELECT COUNT(*) FROM zadania WHERE kolejka = ? AND status IN (?, ?)",
+                        (name, STATUS_QUEUED, STATUS_RUNNING),
+                    ).fetchone()[0]
+                    if pending >= app.config['JOB_QUEUE_LIMIT']:
+                        raise ValueError("Zbyt wiele oczekujących zadań, spróbuj ponownie za chwilę")
+
+                    job_id = uuid.uuid4().hex
+                    conn.execute(
+                        "INSERT INTO zadania (id, kolejka, klucz, wlasciciel, status, utworzono, proces, puls)"
+                        " VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                        (job_id, name, key_json, owner, STATUS_QUEUED, now, JobQueue._process(), now),
+                    )
+                    conn.execute("COMMIT")
+                except BaseException:
+                    conn.execute("ROLLBACK")
+                    raise
+            finally:
+                conn.close()
+        except sqlite3.Error as e:
+            app.logger.error(f"Magazyn statusów zadań niedostępny: {e}")
+            raise ValueError("Kolejka zadań jest chwilowo niedostępna, spróbuj ponownie za chwilę")
+
+        heartbeat = JobQueue._start_heartbeat(app, JobQueue._path())
+        JobQueue._executor(name).submit(JobQueue._run, app, job_id, name, fn, args, heartbeat)
+        return {
+            'id': job_id,
+            'queue': name,
+            'owner_id': owner,
+            'status': STATUS_QUEUED,
+            'result': None,
+            'error': None,
+            'created': now,
+            'finished': None,
+        }
+
+    @staticmethod
+    def _update(app, job_id, **values):
+        """Zapis zmiany statusu - błąd magazynu jest tylko logowany"""
+        columns = ', '.join(f"{column} = ?" for column in values)
+        try:
+            conn = JobQueue._connect()
+            try:
+                conn.execute(f"UPDATE zadania SET {columns} WHERE id = ?", (*values.values(), job_id))
+            finally:
+                conn.close()
+        except sqlite3.Error:
+            app.logger.exception(f"Nie udało się zapisać statusu zadania {job_id}")
+
+    @staticmethod
+    def _run(app, job_id, name, fn, args, heartbeat):
+        """Wykonanie zadania w wątku puli"""
+        status, result, error = STATUS_DONE, None, None
+        # Miejsce w puli może być zajęte przez strumień - zadanie czeka jako queued
+        try:
+            with app.app_context(), JobQueue._slot(name, app):
+                JobQueue._update(app, job_id, status=STATUS_RUNNING, puls=time.time())
+                try:
+                    result = json.dumps(fn(*args), ensure_ascii=False, default=str)
+                except Exception as e:
+                    app.logger.exception(f"Zadanie {job_id} w kolejce {name} nie powiodło się")
+                    status, error = STATUS_FAILED, str(e)
+
+                JobQueue._update(app, job_id, status=status, wynik=result, blad=error, zakonczono=time.time())
+        finally:
+            JobQueue._finish_heartbeat(heartbeat)
+
+    @staticmethod
+    def get(job_id, owner_id=None):
+        """
+        Pobiera status zadania
+
+        Args:
+            job_id: ID zadania
+            owner_id: Gdy podany - zadanie innego właściciela traktujemy jak nieistniejące
+
+        Returns:
+            Słownik zadania lub None (zadanie bez pulsu - jako nieudane)
+        """
+        stale_before = time.time() - current_app.config['JOB_HEARTBEAT_TIMEOUT']
+        try:
+            conn = JobQueue._connect()
+            try:
+                row = conn.execute(f"SELECT {_COLUMNS} FROM zadania WHERE id = ?", (job_id,)).fetchone()
+            finally:
+                conn.close()
+        except sqlite3.Error as e:
+            current_app.logger.warning(f"Magazyn statusów zadań niedostępny: {e}")
+            return None
+
+        if row is None:
+            return None
+        job = JobQueue._to_dict(row, stale_before)
+        if owner_id is not None and job['owner_id'] != str(owner_id):
+            return None
+        return job
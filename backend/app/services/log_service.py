@@ -0,0 +1,139 @@
+# Serwis przeglądania logów zdarzeń
+# Stronicowanie kursorem po (czas, id), bez kolumn przed/po w widoku listy
+
+import json
+from datetime import date, datetime, timedelta
+from typing import Dict, Optional
+
+from sqlalchemy import and_, or_
+
+from ..extensions import db
+from ..models import Log
+from .history_service import HistoryService
+
+
+class LogService:
+    """
+    Serwis listy logi_zdarzen.
+
+    Strony wyznacza kursor (czas, id) ostatniego wiersza, więc każda
+    strona to krótki skan indeksu: logi_zdarzen_index_12 (uzytkownik_id,
+    czas) przy filtrze użytkownika, logi_zdarzen_index_11 (tabela,
+    rekord_id) przy filtrze rekordu, w pozostałych przypadkach
+    logi_zdarzen_index_13 (czas). Kolumny przed/po (longtext) są
+    pobierane tylko na życzenie.
+    """
+
+    DEFAULT_PAGE_SIZE = 50
+    MAX_PAGE_SIZE = 200
+
+    LIST_COLUMNS = ('id', 'czas', 'typ', 'tabela', 'rekord_id', 'uzytkownik_id', 'lodowka_id')
+    DETAIL_COLUMNS = ('przed', 'po')
+
+    @staticmethod
+    def _parse_json(value):
+        """Kolumny przed/po zawierają JSON - zwracane jako obiekty"""
+        if value is None:
+            return None
+        try:
+            return json.loads(value)
+        except ValueError:
+            return value
+
+    @staticmethod
+    def _to_dict(row, details: bool) -> Dict:
+        result = {
+            'id': row.id,
+            'czas': row.czas.isoformat() if row.czas else None,
+            'typ': row.typ,
+            'tabela': row.tabela,
+            'rekord_id': row.rekord_id,
+            'uzytkownik_id': row.uzytkownik_id,
+            'lodowka_id': row.lodowka_id,
+        }
+        if details:
+            result['przed'] = LogService._parse_json(row.przed)
+            result['po'] = LogService._parse_json(row.po)
+        return result
+
+    @staticmethod
+    def get_logs(limit: Optional[int] = None, cursor: Optional[str] = None, typ: Optional[str] = None,
+                 tabela: Optional[str] = None, rekord_id: Optional[int] = None,
+                 uzytkownik_id: Optional[int] = None, lodowka_id: Optional[int] = None,
+                 date_from: Optional[date] = None, date_to: Optional[date] = None,
+                 details: bool = False) -> Dict:
+        """
+        Strona logów zdarzeń, od najnowszych
+
+        Args:
+            limit: Liczba wpisów na stronie (domyślnie DEFAULT_PAGE_SIZE)
+            cursor: next_cursor z poprzedniej strony
+            typ: Typ zdarzenia (np. 'INSERT' / 'UPDATE' / 'DELETE')
+            tabela: Nazwa tabeli
+            rekord_id: ID rekordu (tylko razem z tabela)
+            uzytkownik_id: Użytkownik, który wykonał zmianę
+            lodowka_id: Lodówka, której dotyczy zdarzenie
+            date_from: Pierwszy dzień zakresu (włącznie)
+            date_to: Ostatni dzień zakresu (włącznie)
+            details: Czy dołączyć kolumny przed/po
+
+        Returns:
+            Dict z kluczami logs i next_cursor (None na ostatniej stronie)
+
+        Raises:
+            ValueError: Przy nieprawidłowych filtrach lub kursorze
+        """
+        limit = limit or LogService.DEFAULT_PAGE_SIZE
+        if limit < 1 or limit > LogService.MAX_PAGE_SIZE:
+            raise ValueError(f'Liczba wpisów na stronie musi być od 1 do {LogService.MAX_PAGE_SIZE}')
+        if rekord_id is not None and not tabela:
+            raise ValueError('Filtr rekord_id wymaga podania tabeli')
+        if date_from and date_to and date_from > date_to:
+            raise ValueError('Data początkowa jest późniejsza niż końcowa')
+
+        columns = LogService.LIST_COLUMNS + (LogService.DETAIL_COLUMNS if details else ())
+        query = db.session.query(*(getattr(Log, name) for name in columns))
+
+        if typ:
+            query = query.filter(Log.typ == typ)
+        if tabela:
+            query = query.filter(Log.tabela == tabela)
+        if rekord_id is not None:
+            query = query.filter(Log.rekord_id == rekord_id)
+        if uzytkownik_id is not None:
+            query = query.filter(Log.uzytkownik_id == uzytkownik_id)
+        if lodowka_id is not None:
+            query = query.filter(Log.lodowka_id == lodowka_id)
+        if date_from:
+            query = query.filter(Log.czas >= datetime.combine(date_from, datetime.min.time()))
+        if date_to:
+            query = query.filter(Log.czas < datetime.combine(date_to + timedelta(days=1), datetime.min.time()))
+        if cursor:
+            # (czas, id) < kursor - rozpisane, żeby MySQL użył zakresu na indeksie
+            cursor_time, cursor_id = HistoryService.decode_cursor(cursor)
+            query = query.filter(or_(
+                Log.czas < cursor_time,
+                and_(Log.czas == cursor_time, Log.id < cursor_id),
+            ))
+
+        # Jeden wiersz więcej mówi, czy jest następna strona
+        rows = query.order_by(Log.czas.desc(), Log.id.desc()).limit(limit + 1).all()
+
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = HistoryService.encode_cursor(rows[-1].czas, rows[-1].id)
+
+        return {
+            'logs': [LogService._to_dict(row, details) for row in rows],
+            'next_cursor': next_cursor,
+        }
+
+    @staticmethod
+    def get_log(log_id: int) -> Optional[Dict]:
+        """Pełny wpis logu razem z przed/po (None gdy nie istnieje)"""
+        columns = LogService.LIST_COLUMNS + LogService.DETAIL_COLUMNS
+        row = db.session.query(*(getattr(Log, name) for name in columns))\
+            .filter(Log.id == log_id)\
+            .first()
+        return LogService._to_dict(row, details=True) if row else None
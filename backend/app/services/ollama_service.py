@@ -0,0 +1,174 @@
+# Serwis stanu Ollama
+# Zapamiętana dostępność lokalnego modelu z wyłącznikiem (circuit breaker)
+
+import threading
+import time
+
+import requests
+from flask import current_app
+
+from ..extensions import http
+
+
+# Stan zdrowia Ollama wspólny dla całego procesu:
+# - available: wynik ostatniego sprawdzenia (None = jeszcze nie sprawdzano)
+# - checked_at: kiedy sprawdzono (monotonic)
+# - failures: kolejne nieudane próby (sprawdzenia i wywołania modelu)
+# - open_until: do kiedy wyłącznik jest otwarty - Ollama jest pomijana
+# - probing: trwa sprawdzanie w tle
+_health = {
+    'available': None,
+    'checked_at': 0.0,
+    'failures': 0,
+    'open_until': 0.0,
+    'probing': False,
+}
+_health_lock = threading.Lock()
+
+
+class OllamaService:
+    """
+    Serwis monitorujący dostępność Ollama.
+
+    Zamiast zapytania do /api/tags przed każdym przepisem trzyma ostatni
+    wynik przez OLLAMA_HEALTH_TTL sekund i odświeża go w tle. Po
+    OLLAMA_FAILURE_THRESHOLD kolejnych błędach otwiera wyłącznik na
+    OLLAMA_COOLDOWN sekund - w tym czasie asystent od razu używa przepisów
+    zapasowych, bez czekania na timeout.
+    """
+
+    @staticmethod
+    def _settings():
+        """Ustawienia z konfiguracji aplikacji (wątek w tle nie ma kontekstu)"""
+        config = current_app.config
+        return {
+            'session': http.session,
+            'tags_url': config['OLLAMA_BASE_URL'].rstrip('/') + '/api/tags',
+            'timeout': config['OLLAMA_PROBE_TIMEOUT'],
+            'ttl': config['OLLAMA_HEALTH_TTL'],
+            'threshold': config['OLLAMA_FAILURE_THRESHOLD'],
+            'cooldown': config['OLLAMA_COOLDOWN'],
+        }
+
+    @staticmethod
+    def _probe(settings):
+        """
+        Jedno sprawdzenie /api/tags
+
+        Returns:
+            bool: True jeśli Ollama odpowiada
+        """
+        try:
+            response = settings['session'].get(settings['tags_url'], timeout=settings['timeout'])
+            return response.status_code == 200
+        except requests.exceptions.RequestException:
+            return False
+
+    @staticmethod
+    def _record(ok, settings):
+        """Zapisuje wynik sprawdzenia lub wywołania modelu"""
+        now = time.monotonic()
+        with _health_lock:
+            _health['checked_at'] = now
+            _health['available'] = ok
+            if ok:
+                _health['failures'] = 0
+                _health['open_until'] = 0.0
+            else:
+                _health['failures'] += 1
+                if _health['failures'] >= settings['threshold']:
+                    _health['open_until'] = now + settings['cooldown']
+
+    @staticmethod
+    def _probe_and_record(settings):
+        """Sprawdzenie w tle - zdejmuje flagę probing po zakończeniu"""
+        try:
+            OllamaService._record(OllamaService._probe(settings), settings)
+        finally:
+            with _health_lock:
+                _health['probing'] = False
+
+    @staticmethod
+    def is_available():
+        """
+        Zwraca dostępność Ollama bez blokowania żądania.
+
+        Tylko pierwsze sprawdzenie w procesie jest synchroniczne. Gdy wynik
+        jest starszy niż TTL, zwracany jest ostatni znany stan, a nowe
+        sprawdzenie startuje w osobnym wątku. Przy otwartym wyłączniku
+        zwraca False bez żadnego połączenia.
+
+        Returns:
+            bool: True jeśli można wywołać model
+        """
+        settings = OllamaService._settings()
+        now = time.monotonic()
+
+        with _health_lock:
+            if _health['open_until'] > now:
+                return False
+            first_check = _health['available'] is None
+            stale = now - _health['checked_at'] >= settings['ttl']
+            start_probe = not first_check and stale and not _health['probing']
+            if start_probe:
+                _health['probing'] = True
+
+        if first_check:
+            ok = OllamaService._probe(settings)
+            OllamaService._record(ok, settings)
+            return ok
+
+        if start_probe:
+            threading.Thread(
+                target=OllamaService._probe_and_record,
+                args=(settings,),
+                daemon=True,
+            ).start()
+
+        with _health_lock:
+            return bool(_health['available'])
+
+    @staticmethod
+    def record_success():
+        """Udane wywołanie modelu - zamyka wyłącznik"""
+        OllamaService._record(True, OllamaService._settings())
+
+    @staticmethod
+    def record_failure():
+        """Błąd połączenia, timeout lub błąd serwera przy wywołaniu modelu"""
+        OllamaService._record(False, OllamaService._settings())
+
+    @staticmethod
+    def record_http_error(error):
+        """
+        Błąd HTTP wywołania modelu - 404 (model niepobrany) i 5xx liczą się
+        jako awaria, bo /api/tags odpowiada wtedy 200 i sprawdzenie by jej
+        nie wykryło; pozostałe statusy (błąd zapytania) nie
+
+        Args:
+            error: requests.exceptions.HTTPError
+        """
+        status = error.response.status_code if error.response is not None else None
+        if status is None or status == 404 or status >= 500:
+            OllamaService.record_failure()
+
+    @staticmethod
+    def get_status():
+        """
+        Aktualny stan monitora (do diagnostyki)
+
+        Returns:
+            Dict z kluczami available, failures, circuit_open
+        """
+        with _health_lock:
+            return {
+                'available': _health['available'],
+                'failures': _health['failures'],
+                'circuit_open': _health['open_until'] > time.monotonic(),
+            }
+
+    @staticmethod
+    def reset():
+        """Zapomina stan (np. po zmianie konfiguracji lub w testach)"""
+        with _health_lock:
+            _health.update(available=None, checked_at=0.0, failures=0, open_until=0.0, probing=False)
@@ -0,0 +1,66 @@
+# Projekcja odpowiedzi OpenFoodFacts
+# W bazie zostają tylko pola czytane przez aplikację, surowa odpowiedź jest kompresowana
+
+import json
+import zlib
+from typing import Any, Dict, Optional
+
+
+# Pola produktu używane przez aplikację (nazwa, marka, kategoria, kod)
+PRODUCT_FIELDS = ('code', 'product_name', 'brands', 'categories')
+
+# Klucze nutriments czytane przy wyliczaniu wartości na 100g
+NUTRIMENT_KEYS = (
+    'energy-kcal_100g', 'energy-kcal',
+    'proteins_100g', 'proteins',
+    'fat_100g', 'fat',
+    'carbohydrates_100g', 'carbohydrates',
+    'fiber_100g', 'fiber',
+    'salt_100g', 'salt',
+)
+
+
+def project_product(product: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Zostawia z obiektu produktu tylko pola używane przez aplikację
+    """
+    projected = {key: product[key] for key in PRODUCT_FIELDS if key in product}
+    nutriments = product.get('nutriments') or {}
+    projected['nutriments'] = {key: nutriments[key] for key in NUTRIMENT_KEYS if key in nutriments}
+    return projected
+
+
+def project_response(data: Any) -> Any:
+    """
+    Projekcja odpowiedzi API - produktu (/api/v0/product) lub wyszukiwania (search.pl)
+
+    Słowa kluczowe, tagi, obrazy, składniki itp. są pomijane - zajmują
+    kilka-kilkadziesiąt KB na produkt, a aplikacja ich nie czyta.
+
+    Args:
+        data: Odpowiedź JSON z OpenFoodFacts
+
+    Returns:
+        Odpowiedź z tą samą strukturą, ograniczona do czytanych pól
+    """
+    if not isinstance(data, dict):
+        return data
+
+    projected = {key: data[key] for key in ('status', 'code', 'count') if key in data}
+    if isinstance(data.get('product'), dict):
+        projected['product'] = project_product(data['product'])
+    if isinstance(data.get('products'), list):
+        projected['products'] = [project_product(p) for p in data['products'] if isinstance(p, dict)]
+    return projected
+
+
+def compress(data: Any) -> bytes:
+    """Surowa odpowiedź jako JSON skompresowany zlib"""
+    return zlib.compress(json.dumps(data, ensure_ascii=False, separators=(',', ':')).encode('utf-8'), 6)
+
+
+def decompress(blob: Optional[bytes]) -> Any:
+    """Odtwarza surową odpowiedź zapisaną przez compress (None gdy brak)"""
+    if blob is None:
+        return None
+    return json.loads(zlib.decompress(blob).decode('utf-8'))
@@ -0,0 +1,209 @@
+# Lokalny indeks wyszukiwania produktów
+# Trigramy nazwy, marki i kategorii w pamięci procesu - bez zapytań do OpenFoodFacts
+
+import threading
+import time
+from collections import Counter, defaultdict
+from typing import Iterable, List, Optional, Tuple
+
+from flask import current_app
+from sqlalchemy import event
+from sqlalchemy.orm import Session, object_session
+
+from ..extensions import db
+from ..models import Product
+from ..models.product import normalize_name
+
+
+# Stan indeksu wspólny dla procesu:
+# - docs: {produkt_id: zbiór trigramów}
+# - lengths: {produkt_id: długość znormalizowanego tekstu} (krótsze wyżej przy remisie)
+# - grams: {trigram: zbiór produkt_id}
+# - built_at: kiedy zbudowano (monotonic, 0 = jeszcze nie)
+_index = {
+    'docs': {},
+    'lengths': {},
+    'grams': defaultdict(set),
+    'built_at': 0.0,
+}
+_index_lock = threading.Lock()
+
+
+def normalize_text(text: Optional[str]) -> str:
+    """
+    Tekst do porównań - ta sama normalizacja co produkty.nazwa_norm
+
+    'Mleko ŁACIATE 3,2%' -> 'mleko laciate 3.2%'
+    """
+    return normalize_name(text)
+
+
+def trigrams(text: str) -> set:
+    """
+    Zbiór trigramów słów (jak pg_trgm) - słowo dopełnione dwiema spacjami z przodu
+    i jedną z tyłu, więc początek słowa daje własne trigramy ('  m', ' ml')
+    i wyszukiwanie po prefiksie działa od trzech znaków
+    """
+    grams = set()
+    for word in text.split():
+        padded = f'  {word} '
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+class ProductSearchIndex:
+    """
+    Indeks trigramowy słownika produktów (nazwa, marka, kategoria).
+
+    Budowany przy pierwszym wyszukiwaniu i aktualizowany po każdym commit,
+    który dodaje, zmienia lub usuwa produkt w tym procesie. Zmiany z innych
+    procesów (workerów) trafiają do indeksu przy pełnej przebudowie, co
+    PRODUCT_INDEX_TTL sekund.
+    """
+
+    @staticmethod
+    def _document(nazwa, marka, kategoria) -> str:
+        """Znormalizowany tekst indeksowany dla produktu"""
+        return normalize_text(' '.join(filter(None, [nazwa, marka, kategoria])))
+
+    @staticmethod
+    def _add_locked(product_id: int, text: str):
+        ProductSearchIndex._remove_locked(product_id)
+        grams = trigrams(text)
+        _index['docs'][product_id] = grams
+        _index['lengths'][product_id] = len(text)
+        for gram in grams:
+            _index['grams'][gram].add(product_id)
+
+    @staticmethod
+    def _remove_locked(product_id: int):
+        for gram in _index['docs'].pop(product_id, ()):
+            ids = _index['grams'].get(gram)
+            if ids is not None:
+                ids.discard(product_id)
+                if not ids:
+                    del _index['grams'][gram]
+        _index['lengths'].pop(product_id, None)
+
+    @staticmethod
+    def rebuild():
+        """Buduje indeks od nowa z tabeli produkty (bez usuniętych)"""
+        rows = db.session.query(Product.id, Product.nazwa, Product.marka, Product.kategoria)\
+            .filter(Product.usunieto.is_(None))\
+            .all()
+
+        docs, lengths, grams = {}, {}, defaultdict(set)
+        for row in rows:
+            text = ProductSearchIndex._document(row.nazwa, row.marka, row.kategoria)
+            docs[row.id] = trigrams(text)
+            lengths[row.id] = len(text)
+            for gram in docs[row.id]:
+                grams[gram].add(row.id)
+
+        with _index_lock:
+            _index.update(docs=docs, lengths=lengths, grams=grams, built_at=time.monotonic())
+
+    @staticmethod
+    def _ensure_fresh():
+        ttl = current_app.config['PRODUCT_INDEX_TTL']
+        with _index_lock:
+            built_at = _index['built_at']
+        if not built_at or time.monotonic() - built_at >= ttl:
+            ProductSearchIndex.rebuild()
+
+    @staticmethod
+    def search(term: str, limit: int = 10) -> List[int]:
+        """
+        Wyszukuje produkty po fragmentach słów
+
+        Wynik to udział trigramów zapytania obecnych w produkcie; zwracane
+        są produkty z wynikiem co najmniej PRODUCT_SEARCH_MIN_SCORE,
+        od najlepiej dopasowanych (przy remisie - krótsze opisy).
+
+        Args:
+            term: Wpisany tekst
+            limit: Maksymalna liczba wyników
+
+        Returns:
+            Lista ID produktów
+        """
+        query = trigrams(normalize_text(term))
+        if not query:
+            return []
+        ProductSearchIndex._ensure_fresh()
+        min_score = current_app.config['PRODUCT_SEARCH_MIN_SCORE']
+
+        with _index_lock:
+            hits = Counter()
+            for gram in query:
+                hits.update(_index['grams'].get(gram, ()))
+            ranked = sorted(
+                (
+                    (-count / len(query), _index['lengths'][product_id], product_id)
+                    for product_id, count in hits.items()
+                    if count / len(query) >= min_score
+                ),
+            )
+        return [product_id for _, _, product_id in ranked[:limit]]
+
+    @staticmethod
+    def apply_changes(changed: Iterable[Tuple[int, bool, str]], removed: Iterable[int]):
+        """
+        Nanosi zmiany z zatwierdzonej transakcji (tylko gdy indeks jest zbudowany)
+
+        Args:
+            changed: Krotki (produkt_id, usunięty, tekst dokumentu)
+            removed: ID produktów usuniętych z tabeli
+        """
+        with _index_lock:
+            if not _index['built_at']:
+                return
+            for product_id in removed:
+                ProductSearchIndex._remove_locked(product_id)
+            for product_id, deleted, text in changed:
+                if deleted:
+                    ProductSearchIndex._remove_locked(product_id)
+                else:
+                    ProductSearchIndex._add_locked(product_id, text)
+
+    @staticmethod
+    def reset():
+        """Zapomina indeks (np. w testach) - następne wyszukiwanie go zbuduje"""
+        with _index_lock:
+            _index.update(docs={}, lengths={}, grams=defaultdict(set), built_at=0.0)
+
+
+# Zmiany produktów zbierane w sesji i nanoszone na indeks dopiero po commit,
+# żeby wycofana transakcja nie zostawiła w indeksie nieistniejących wpisów
+
+@event.listens_for(Product, "after_insert")
+@event.listens_for(Product, "after_update")
+def _track_product_change(mapper, connection, target):
+    session = object_session(target)
+    if session is not None:
+        session.info.setdefault('product_index_changed', {})[target.id] = (
+            target.id,
+            target.usunieto is not None,
+            ProductSearchIndex._document(target.nazwa, target.marka, target.kategoria),
+        )
+
+
+@event.listens_for(Product, "after_delete")
+def _track_product_delete(mapper, connection, target):
+    session = object_session(target)
+    if session is not None:
+        session.info.setdefault('product_index_removed', set()).add(target.id)
+
+
+@event.listens_for(Session, "after_commit")
+def _apply_product_changes(session):
+    changed = session.info.pop('product_index_changed', {})
+    removed = session.info.pop('product_index_removed', set())
+    if changed or removed:
+        ProductSearchIndex.apply_changes(changed.values(), removed)
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _discard_product_changes(session, previous_transaction):
+    session.info.pop('product_index_changed', None)
+    session.info.pop('product_index_removed', None)
@@ -2,11 +2,20 @@
 # Serwis zarządzania produktami z integracją OpenFoodFacts API
 
 import requests
-from datetime import datetime
-from typing import List, Dict, Optional
+from datetime import datetime, timedelta
+from typing import Iterable, List, Dict, Optional, Tuple
+from flask import current_app
 from sqlalchemy import and_
+from sqlalchemy.orm import load_only, undefer
 from ..extensions import db
-from ..models import Product, WartosciOdzywcze
+from ..models import CacheApi, Product, WartosciOdzywcze, ZrodloApi
+from ..models.product import normalize_name
+from .api_cache import ApiCache
+from .bulk import bulk_upsert
+from .rate_limiter import RateLimiter
+from .job_queue import JobQueue
+from .openfoodfacts_payload import compress, project_response
+from .product_index import ProductSearchIndex, trigrams
 
 
 class ProductService:
@@ -14,6 +23,18 @@ class ProductService:
     
     OPENFOODFACTS_API_URL = "https://world.openfoodfacts.org/api/v2/product/{barcode}"
     
+    # Kolumny wartości odżywczych ładowane w widokach list (bez JSON z API)
+    LIST_NUTRITION_COLUMNS = (
+        WartosciOdzywcze.na_100g_kcal,
+        WartosciOdzywcze.na_100g_bialko_g,
+        WartosciOdzywcze.na_100g_tluszcz_g,
+        WartosciOdzywcze.na_100g_weglowodany_g,
+        WartosciOdzywcze.na_100g_blonnik_g,
+        WartosciOdzywcze.na_100g_sol_g,
+        WartosciOdzywcze.zrodlo_id,
+        WartosciOdzywcze.pobrano,
+    )
+    
     @staticmethod
     def get_all_products(include_deleted=False) -> List[Dict]:
         """
@@ -27,7 +48,7 @@ class ProductService:
         """
         query = db.session.query(Product, WartosciOdzywcze).outerjoin(
             WartosciOdzywcze, Product.id == WartosciOdzywcze.produkt_id
-        )
+        ).options(load_only(*ProductService.LIST_NUTRITION_COLUMNS))
         
         if not include_deleted:
             query = query.filter(Product.usunieto.is_(None))
@@ -65,6 +86,39 @@ class ProductService:
         
         return products
     
+    @staticmethod
+    def resolve_products(product_ids: Iterable[Optional[int]], with_nutrition: bool = False,
+                         with_payload: bool = False) -> Dict[int, Tuple[Product, Optional[WartosciOdzywcze]]]:
+        """
+        Pobiera wiele produktów (opcjonalnie z wartościami odżywczymi) jednym zapytaniem
+        
+        Zastępuje pojedyncze Product.get() w pętlach po grupach - zbiera unikalne
+        produkt_id ze strony i wykonuje jedno zapytanie z IN (...).
+        
+        Args:
+            product_ids: ID produktów (duplikaty i None są pomijane)
+            with_nutrition: Czy dołączyć wartości odżywcze (LEFT JOIN)
+            with_payload: Czy od razu załadować odp_api (domyślnie odroczone)
+            
+        Returns:
+            Słownik {produkt_id: (Product, WartosciOdzywcze lub None)}
+        """
+        ids = {product_id for product_id in product_ids if product_id}
+        if not ids:
+            return {}
+        
+        if with_nutrition:
+            query = db.session.query(Product, WartosciOdzywcze).outerjoin(
+                WartosciOdzywcze, Product.id == WartosciOdzywcze.produkt_id
+            ).filter(Product.id.in_(ids))
+            if with_payload:
+                query = query.options(undefer(WartosciOdzywcze.odp_api))
+            rows = query.all()
+            return {product.id: (product, wartosci) for product, wartosci in rows}
+        
+        products = db.session.query(Product).filter(Product.id.in_(ids)).all()
+        return {product.id: (product, None) for product in products}
+    
     @staticmethod
     def get_product_by_id(product_id: int) -> Optional[Dict]:
         """
@@ -80,7 +134,9 @@ class ProductService:
         if not product:
             return None
         
-        wartosci = WartosciOdzywcze.query.filter_by(produkt_id=product_id).first()
+        wartosci = WartosciOdzywcze.query.filter_by(produkt_id=product_id)\
+            .options(undefer(WartosciOdzywcze.odp_api))\
+            .first()
         
         product_dict = {
             'id': product.id,
@@ -105,12 +161,62 @@ class ProductService:
                 'blonnik_g': float(wartosci.na_100g_blonnik_g) if wartosci.na_100g_blonnik_g else None,
                 'sol_g': float(wartosci.na_100g_sol_g) if wartosci.na_100g_sol_g else None,
                 'zrodlo_id': wartosci.zrodlo_id,
-                'pobrano': wartosci.pobrano
+                'pobrano': wartosci.pobrano,
+                'status': wartosci.status
             }
             product_dict['wartosci_odzywcze_full'] = wartosci.odp_api
         
         return product_dict
     
+    @staticmethod
+    def fetch_openfoodfacts(barcode: str, rate_limiter: Optional[RateLimiter] = None) -> Dict:
+        """
+        Pobiera produkt z OpenFoodFacts przez cache_api
+        
+        Kod nieznany OpenFoodFacts (404) jest zapisywany w cache na
+        API_CACHE_NOT_FOUND_TTL i zwracany jak odpowiedź bez produktu
+        (data['status'] != 1), a nie jako błąd zapytania.
+        
+        Args:
+            barcode: Kod kreskowy produktu
+            rate_limiter: Opcjonalny ogranicznik zapytań sieciowych
+            
+        Returns:
+            Wynik ApiCache.fetch (status, data, cache_id, source)
+        """
+        return ApiCache.fetch(
+            ZrodloApi.OPENFOODFACTS_ID,
+            ProductService.OPENFOODFACTS_API_URL.format(barcode=barcode),
+            timedelta(seconds=current_app.config['API_CACHE_PRODUCT_TTL']),
+            barcode=barcode,
+            rate_limiter=rate_limiter,
+            project=project_response,
+            not_found_ttl=timedelta(seconds=current_app.config['API_CACHE_NOT_FOUND_TTL'])
+        )
+    
+    @staticmethod
+    def _nutrition_columns(data: Dict, cache_id: Optional[int]) -> Dict:
+        """
+        Kolumny wartosci_odzywcze z odpowiedzi OpenFoodFacts
+        """
+        product_data = data.get('product', {})
+        nutriments = product_data.get('nutriments', {})
+        return {
+            'zrodlo_id': ZrodloApi.OPENFOODFACTS_ID,
+            'cache_id': cache_id,
+            'na_100g_kcal': nutriments.get('energy-kcal_100g') or nutriments.get('energy-kcal'),
+            'na_100g_bialko_g': nutriments.get('proteins_100g') or nutriments.get('proteins'),
+            'na_100g_tluszcz_g': nutriments.get('fat_100g') or nutriments.get('fat'),
+            'na_100g_weglowodany_g': nutriments.get('carbohydrates_100g') or nutriments.get('carbohydrates'),
+            'na_100g_blonnik_g': nutriments.get('fiber_100g') or nutriments.get('fiber'),
+            'na_100g_sol_g': nutriments.get('salt_100g') or nutriments.get('salt'),
+            # Pełna odpowiedź jest skompresowana w cache_api.odpowiedz_surowa (cache_id)
+            'odp_api': project_response(data),
+            'api': None,
+            'pobrano': datetime.utcnow(),
+            'status': WartosciOdzywcze.STATUS_OK,
+        }
+    
     @staticmethod
     def enrich_from_openfoodfacts(barcode: str, product_id: Optional[int] = None) -> Dict:
         """
@@ -125,11 +231,9 @@ class ProductService:
         """
         try:
             # Zapytanie do OpenFoodFacts API
-            url = ProductService.OPENFOODFACTS_API_URL.format(barcode=barcode)
-            response = requests.get(url, timeout=10)
-            response.raise_for_status()
-            
-            data = response.json()
+            # (przez cache_api - popularne kody są pobierane z sieci raz na okres ważności)
+            cached = ProductService.fetch_openfoodfacts(barcode)
+            data = cached['data']
             
             if data.get('status') != 1:
                 return {
@@ -138,7 +242,6 @@ class ProductService:
                 }
             
             product_data = data.get('product', {})
-            nutriments = product_data.get('nutriments', {})
             
             # Jeśli nie podano product_id, szukamy istniejącego produktu
             if not product_id:
@@ -160,16 +263,8 @@ class ProductService:
                 db.session.add(wartosci)
             
             # Aktualizujemy wartości odżywcze
-            wartosci.zrodlo_id = 1  # OpenFoodFacts
-            wartosci.na_100g_kcal = nutriments.get('energy-kcal_100g') or nutriments.get('energy-kcal')
-            wartosci.na_100g_bialko_g = nutriments.get('proteins_100g') or nutriments.get('proteins')
-            wartosci.na_100g_tluszcz_g = nutriments.get('fat_100g') or nutriments.get('fat')
-            wartosci.na_100g_weglowodany_g = nutriments.get('carbohydrates_100g') or nutriments.get('carbohydrates')
-            wartosci.na_100g_blonnik_g = nutriments.get('fiber_100g') or nutriments.get('fiber')
-            wartosci.na_100g_sol_g = nutriments.get('salt_100g') or nutriments.get('salt')
-            wartosci.odp_api = data
-            wartosci.api = product_data
-            wartosci.pobrano = datetime.utcnow()
+            for column, value in ProductService._nutrition_columns(data, cached['cache_id']).items():
+                setattr(wartosci, column, value)
             
             db.session.commit()
             
@@ -195,6 +290,272 @@ class ProductService:
                 'message': f'Błąd podczas zapisywania danych: {str(e)}'
             }
     
+    @staticmethod
+    def mark_enrichment_pending(product_id: int) -> WartosciOdzywcze:
+        """
+        Oznacza wartości odżywcze produktu jako pobierane (status 'pending')
+        
+        Tworzy wiersz wartosci_odzywcze, jeśli go nie ma. Nie wykonuje commit -
+        po zatwierdzeniu transakcji należy wywołać schedule_enrichment.
+        
+        Args:
+            product_id: ID produktu
+            
+        Returns:
+            Obiekt WartosciOdzywcze
+        """
+        wartosci = WartosciOdzywcze.query.filter_by(produkt_id=product_id).first()
+        if not wartosci:
+            wartosci = WartosciOdzywcze(produkt_id=product_id)
+            db.session.add(wartosci)
+        wartosci.status = WartosciOdzywcze.STATUS_PENDING
+        return wartosci
+    
+    @staticmethod
+    def schedule_enrichment(product_id: int, barcode: str, update_product: bool = False) -> Dict:
+        """
+        Zleca pobranie danych z OpenFoodFacts w tle (kolejka 'openfoodfacts')
+        
+        Kolejne zlecenia dla tego samego produktu, zanim poprzednie się
+        zakończy, są łączone w jedno zadanie.
+        
+        Args:
+            product_id: ID produktu
+            barcode: Kod kreskowy
+            update_product: Czy nadpisać nazwę, markę i kategorię produktu danymi z API
+            
+        Returns:
+            Słownik ze statusem zadania (JobQueue)
+        
+        Raises:
+            ValueError: Gdy kolejka jest pełna
+        """
+        return JobQueue.submit(
+            'openfoodfacts',
+            ProductService._run_enrichment,
+            product_id, barcode, update_product,
+            key=('enrich', product_id)
+        )
+    
+    @staticmethod
+    def _run_enrichment(product_id: int, barcode: str, update_product: bool) -> Dict:
+        """
+        Zadanie w tle - pobiera dane i ustawia status 'ok' lub 'failed'
+        """
+        result = ProductService.enrich_from_openfoodfacts(barcode, product_id)
+        
+        try:
+            if result['success']:
+                if update_product:
+                    product = db.session.get(Product, product_id)
+                    data = result.get('data', {})
+                    if product:
+                        product.nazwa = data.get('nazwa') or product.nazwa
+                        product.marka = data.get('marka') or product.marka
+                        product.kategoria = data.get('kategoria') or product.kategoria
+                        db.session.commit()
+            else:
+                WartosciOdzywcze.query.filter_by(produkt_id=product_id).update(
+                    {'status': WartosciOdzywcze.STATUS_FAILED}, synchronize_session=False
+                )
+                db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+        
+        return result
+    
+    @staticmethod
+    def find_products_to_enrich(stale_before: Optional[datetime] = None,
+                                limit: Optional[int] = None) -> List[Tuple[int, str]]:
+        """
+        Produkty z kodem kreskowym bez wartości odżywczych lub z nieaktualnymi
+        
+        Args:
+            stale_before: Wartości pobrane przed tą datą są odświeżane (None = tylko brakujące)
+            limit: Maksymalna liczba produktów
+            
+        Returns:
+            Lista (produkt_id, barcode) w kolejności ID
+        """
+        missing = WartosciOdzywcze.id.is_(None) | WartosciOdzywcze.pobrano.is_(None)
+        if stale_before is not None:
+            missing = missing | (WartosciOdzywcze.pobrano < stale_before)
+        
+        query = (
+            db.session.query(Product.id, Product.barcode_13cyf)
+            .outerjoin(WartosciOdzywcze, WartosciOdzywcze.produkt_id == Product.id)
+            .filter(Product.usunieto.is_(None))
+            .filter(Product.barcode_13cyf.isnot(None))
+            .filter(Product.barcode_13cyf != '')
+            .filter(missing)
+            .order_by(Product.id)
+        )
+        if limit:
+            query = query.limit(limit)
+        return [(row.id, row.barcode_13cyf) for row in query]
+    
+    @staticmethod
+    def enrich_batch(stale_before: Optional[datetime] = None, limit: Optional[int] = None,
+                     workers: Optional[int] = None) -> Dict:
+        """
+        Masowo uzupełnia wartości odżywcze z OpenFoodFacts
+        
+        Zapytania idą równolegle (pula OPENFOODFACTS_WORKERS wątków, każdy
+        z własnym kontekstem aplikacji i sesją), ze wspólnym limitem
+        OPENFOODFACTS_RATE_LIMIT zapytań sieciowych na minutę. Odpowiedzi
+        z cache_api nie zużywają limitu. Wyniki zapisywane są jednym
+        upsertem po produkt_id.
+        
+        Args:
+            stale_before: Odśwież też wartości pobrane przed tą datą
+            limit: Maksymalna liczba produktów
+            workers: Liczba równoległych zapytań (domyślnie z konfiguracji)
+            
+        Returns:
+            Słownik z wynikiem operacji i licznikami checked/enriched/not_found/failed
+        """
+        from concurrent.futures import ThreadPoolExecutor
+        
+        app = current_app._get_current_object()
+        products = ProductService.find_products_to_enrich(stale_before, limit)
+        limiter = RateLimiter(app.config['OPENFOODFACTS_RATE_LIMIT'])
+        
+        def fetch(barcode):
+            with app.app_context():
+                try:
+                    return ProductService.fetch_openfoodfacts(barcode, rate_limiter=limiter)
+                except requests.RequestException as e:
+                    return {'error': str(e)}
+        
+        with ThreadPoolExecutor(max_workers=workers or app.config['OPENFOODFACTS_WORKERS']) as pool:
+            results = list(pool.map(fetch, [barcode for _, barcode in products]))
+        
+        rows = []
+        not_found = failed = 0
+        for (product_id, _), result in zip(products, results):
+            if 'error' in result:
+                failed += 1
+            elif result['data'].get('status') != 1:
+                not_found += 1
+            else:
+                rows.append(dict(
+                    ProductService._nutrition_columns(result['data'], result['cache_id']),
+                    produkt_id=product_id
+                ))
+        
+        try:
+            if rows:
+                update_columns = [col for col in rows[0] if col != 'produkt_id']
+                bulk_upsert(WartosciOdzywcze, rows, ['produkt_id'], update_columns)
+                db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            return {
+                'success': False,
+                'message': f'Błąd podczas zapisywania danych: {str(e)}'
+            }
+        
+        return {
+            'success': True,
+            'message': f'Uzupełniono {len(rows)} z {len(products)} produktów',
+            'checked': len(products),
+            'enriched': len(rows),
+            'not_found': not_found,
+            'failed': failed
+        }
+
+    @staticmethod
+    def compact_api_payloads(batch_size: int = 500) -> Dict:
+        """
+        Przepisuje zapisane odpowiedzi OpenFoodFacts do postaci z projekcją
+
+        cache_api: pełna odpowiedź trafia skompresowana do odpowiedz_surowa,
+        w odpowiedz zostaje projekcja. wartosci_odzywcze: odp_api dostaje
+        projekcję, a zdublowana kolumna api jest czyszczona; jeśli wiersz nie
+        ma cache_id, pełna odpowiedź zapisywana jest w nowym wierszu cache_api
+        (już wygasłym - przy następnym odczycie zostanie pobrana ponownie).
+        Wiersze czytane są partiami po id, commit po każdej partii.
+
+        Args:
+            batch_size: Liczba wierszy w partii
+
+        Returns:
+            Słownik z wynikiem operacji i licznikami cache_rows/nutrition_rows
+        """
+        cache_rows = nutrition_rows = 0
+
+        try:
+            last_id = 0
+            while True:
+                batch = CacheApi.query\
+                    .options(undefer(CacheApi.odpowiedz_surowa))\
+                    .filter(CacheApi.zrodlo_id == ZrodloApi.OPENFOODFACTS_ID)\
+                    .filter(CacheApi.id > last_id)\
+                    .order_by(CacheApi.id)\
+                    .limit(batch_size)\
+                    .all()
+                if not batch:
+                    break
+                for row in batch:
+                    if row.odpowiedz_surowa is None and row.odpowiedz is not None:
+                        row.odpowiedz_surowa = compress(row.odpowiedz)
+                        row.odpowiedz = project_response(row.odpowiedz)
+                        cache_rows += 1
+                last_id = batch[-1].id
+                db.session.commit()
+                db.session.expunge_all()
+
+            last_id = 0
+            while True:
+                batch = db.session.query(WartosciOdzywcze, Product.barcode_13cyf)\
+                    .join(Product, Product.id == WartosciOdzywcze.produkt_id)\
+                    .options(undefer(WartosciOdzywcze.odp_api), undefer(WartosciOdzywcze.api))\
+                    .filter(WartosciOdzywcze.id > last_id)\
+                    .order_by(WartosciOdzywcze.id)\
+                    .limit(batch_size)\
+                    .all()
+                if not batch:
+                    break
+                for wartosci, barcode in batch:
+                    if wartosci.odp_api is None:
+                        continue
+                    projected = project_response(wartosci.odp_api)
+                    if wartosci.api is None and projected == wartosci.odp_api:
+                        continue
+                    if wartosci.cache_id is None:
+                        cache_row = CacheApi(
+                            zrodlo_id=ZrodloApi.OPENFOODFACTS_ID,
+                            barcode=barcode,
+                            odpowiedz=projected,
+                            odpowiedz_surowa=compress(wartosci.odp_api),
+                            http_status=200,
+                            pobrano=wartosci.pobrano or datetime.utcnow(),
+                            wygasa=wartosci.pobrano or datetime.utcnow()
+                        )
+                        db.session.add(cache_row)
+                        db.session.flush()
+                        wartosci.cache_id = cache_row.id
+                    wartosci.odp_api = projected
+                    wartosci.api = None
+                    nutrition_rows += 1
+                last_id = batch[-1][0].id
+                db.session.commit()
+                db.session.expunge_all()
+        except Exception as e:
+            db.session.rollback()
+            return {
+                'success': False,
+                'message': f'Błąd podczas przepisywania odpowiedzi API: {str(e)}'
+            }
+
+        return {
+            'success': True,
+            'message': f'Przepisano {cache_rows} wierszy cache_api i {nutrition_rows} wierszy wartosci_odzywcze',
+            'cache_rows': cache_rows,
+            'nutrition_rows': nutrition_rows
+        }
+
     @staticmethod
     def create_product(data: Dict) -> Dict:
         """
@@ -217,11 +578,27 @@ class ProductService:
             )
             
             db.session.add(product)
+            db.session.flush()
+            
+            # Jeśli podano kod kreskowy, dane z OpenFoodFacts pobierane są w tle
+            if product.barcode_13cyf:
+                ProductService.mark_enrichment_pending(product.id)
+            
             db.session.commit()
             
-            # Jeśli podano kod kreskowy, spróbuj pobrać dane z OpenFoodFacts
             if product.barcode_13cyf:
-                ProductService.enrich_from_openfoodfacts(product.barcode_13cyf, product.id)
+                try:
+                    ProductService.schedule_enrichment(product.id, product.barcode_13cyf)
+                except ValueError as e:
+                    # Kolejka pełna - status 'failed' zamiast wiecznego 'pending';
+                    # produkt (bez daty pobrania) uzupełni flask enrich-products
+                    current_app.logger.warning(
+                        f"Nie zlecono pobrania danych produktu {product.id} z OpenFoodFacts: {e}"
+                    )
+                    WartosciOdzywcze.query.filter_by(produkt_id=product.id).update(
+                        {'status': WartosciOdzywcze.STATUS_FAILED}, synchronize_session=False
+                    )
+                    db.session.commit()
             
             return {
                 'success': True,
@@ -315,6 +692,164 @@ class ProductService:
                 'message': f'Błąd podczas usuwania produktu: {str(e)}'
             }
     
+    @staticmethod
+    def match_product(nazwa: str, barcode: Optional[str] = None) -> Tuple[Optional[Product], Optional[str]]:
+        """
+        Dopasowuje wpisaną nazwę (i kod kreskowy) do produktu ze słownika
+        
+        Kolejność: kod kreskowy, ta sama nazwa po normalizacji (indeks
+        nazwa_norm - 'Mleko 3,2%' == 'mleko 3.2 %'), a na końcu podobieństwo
+        trigramów nazwy (Jaccard) co najmniej PRODUCT_MATCH_MIN_SIMILARITY
+        wśród kandydatów z lokalnego indeksu wyszukiwania.
+        
+        Dopasowanie 'fuzzy' to tylko podpowiedź - przy tym progu podobne są
+        też różne produkty ('Pomidor' / 'Pomidory', 'Sok jabłkowy' /
+        'Sok jabłkowy 100%'), więc nie należy nim nadpisywać nazwy.
+        
+        Args:
+            nazwa: Nazwa wpisana przez użytkownika
+            barcode: Opcjonalny kod kreskowy
+            
+        Returns:
+            Krotka (Product lub None, sposób dopasowania: 'barcode' / 'name' / 'fuzzy' / None)
+        """
+        active = Product.query.filter(Product.usunieto.is_(None))
+        
+        if barcode:
+            product = active.filter(Product.barcode_13cyf == barcode).first()
+            if product:
+                return product, 'barcode'
+        
+        nazwa_norm = normalize_name(nazwa)
+        if not nazwa_norm:
+            return None, None
+        
+        product = active.filter(Product.nazwa_norm == nazwa_norm).order_by(Product.id).first()
+        if product:
+            return product, 'name'
+        
+        candidate_ids = ProductSearchIndex.search(nazwa_norm, limit=10)
+        if not candidate_ids:
+            return None, None
+        
+        wanted = trigrams(nazwa_norm)
+        min_similarity = current_app.config['PRODUCT_MATCH_MIN_SIMILARITY']
+        best, best_similarity = None, 0.0
+        for product in active.filter(Product.id.in_(candidate_ids)).order_by(Product.id):
+            grams = trigrams(product.nazwa_norm or normalize_name(product.nazwa))
+            similarity = len(wanted & grams) / len(wanted | grams)
+            if similarity > best_similarity:
+                best, best_similarity = product, similarity
+        
+        if best is not None and best_similarity >= min_similarity:
+            return best, 'fuzzy'
+        return None, None
+    
+    @staticmethod
+    def backfill_name_keys(batch_size: int = 500) -> Dict:
+        """
+        Uzupełnia produkty.nazwa_norm dla istniejących wierszy
+        
+        Normalizacja jest w Pythonie (normalize_name), więc migracja SQL tylko
+        dodaje kolumnę. Wiersze czytane są partiami po id, commit po każdej partii.
+        
+        Args:
+            batch_size: Liczba wierszy w partii
+            
+        Returns:
+            Słownik z wynikiem operacji i licznikiem updated
+        """
+        updated = 0
+        
+        try:
+            last_id = 0
+            while True:
+                batch = db.session.query(Product.id, Product.nazwa, Product.nazwa_norm)\
+                    .filter(Product.id > last_id)\
+                    .order_by(Product.id)\
+                    .limit(batch_size)\
+                    .all()
+                if not batch:
+                    break
+                changes = [
+                    {'id': row.id, 'nazwa_norm': normalize_name(row.nazwa)[:190]}
+                    for row in batch
+                    if row.nazwa_norm != normalize_name(row.nazwa)[:190]
+                ]
+                if changes:
+                    db.session.execute(db.update(Product), changes)
+                    updated += len(changes)
+                last_id = batch[-1].id
+                db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            return {
+                'success': False,
+                'message': f'Błąd podczas uzupełniania nazwa_norm: {str(e)}'
+            }
+        
+        return {
+            'success': True,
+            'message': f'Uzupełniono nazwa_norm w {updated} produktach',
+            'updated': updated
+        }
+    
+    @staticmethod
+    def search_products(search_term: str, page_size: int = 5, remote: bool = True) -> Dict:
+        """
+        Wyszukuje produkty najpierw w lokalnym słowniku, potem w OpenFoodFacts
+        
+        Lokalnie brane są tylko produkty z kodem kreskowym (wyniki służą do
+        przypisania kodu). OpenFoodFacts jest odpytywane tylko, gdy lokalny
+        indeks nic nie znalazł - dzięki temu wyszukiwanie działa też offline.
+        
+        Args:
+            search_term: Fraza do wyszukania (może być początkiem słowa)
+            page_size: Maksymalna liczba wyników (domyślnie 5)
+            remote: Czy przy braku lokalnych wyników pytać OpenFoodFacts
+            
+        Returns:
+            Dict jak search_openfoodfacts, z dodatkowym kluczem source ('local' / 'openfoodfacts')
+        """
+        # Zapas na produkty bez kodu kreskowego, odrzucane poniżej
+        product_ids = ProductSearchIndex.search(search_term, limit=page_size * 4)
+        resolved = ProductService.resolve_products(product_ids, with_nutrition=True)
+        
+        products = []
+        for product_id in product_ids:
+            product, wartosci = resolved.get(product_id, (None, None))
+            if not product or not product.barcode_13cyf or product.usunieto:
+                continue
+            products.append({
+                'barcode': product.barcode_13cyf,
+                'nazwa': product.nazwa,
+                'marka': product.marka or '',
+                'kategoria': product.kategoria or '',
+                'kcal': float(wartosci.na_100g_kcal) if wartosci and wartosci.na_100g_kcal else None,
+                'bialko_g': float(wartosci.na_100g_bialko_g) if wartosci and wartosci.na_100g_bialko_g else None,
+                'tluszcz_g': float(wartosci.na_100g_tluszcz_g) if wartosci and wartosci.na_100g_tluszcz_g else None,
+                'weglowodany_g': float(wartosci.na_100g_weglowodany_g) if wartosci and wartosci.na_100g_weglowodany_g else None
+            })
+            if len(products) == page_size:
+                break
+        
+        if products:
+            return {
+                'success': True,
+                'products': products,
+                'count': len(products),
+                'source': 'local'
+            }
+        
+        if not remote:
+            return {
+                'success': False,
+                'message': 'Nie znaleziono produktów w lokalnym słowniku',
+                'source': 'local'
+            }
+        
+        return dict(ProductService.search_openfoodfacts(search_term, page_size), source='openfoodfacts')
+    
     @staticmethod
     def search_openfoodfacts(search_term: str, page_size: int = 5) -> Dict:
         """
@@ -339,10 +874,15 @@ class ProductService:
                 'fields': 'code,product_name,brands,categories,nutriments'
             }
             
-            response = requests.get(search_url, params=params, timeout=10)
-            response.raise_for_status()
-            
-            data = response.json()
+            cached = ApiCache.fetch(
+                ZrodloApi.OPENFOODFACTS_ID,
+                search_url,
+                timedelta(seconds=current_app.config['API_CACHE_SEARCH_TTL']),
+                zapytanie=f"search:{page_size}:{' '.join(search_term.lower().split())}",
+                params=params,
+                project=project_response
+            )
+            data = cached['data']
             
             if data.get('count', 0) == 0:
                 return {
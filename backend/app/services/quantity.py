@@ -0,0 +1,163 @@
+# Ilości produktów w całkowitych jednostkach bazowych
+# Dokładna arytmetyka bez mieszania float/Decimal przy sumowaniu i zużywaniu
+
+from decimal import Decimal, ROUND_HALF_UP
+
+# Mnożnik jednostki -> jednostka bazowa (liczba całkowita):
+# - waga: mg, objętość: µl, sztuki: tysięczne części sztuki
+# Kolumny ilości mają 3 miejsca po przecinku, więc każda zapisana
+# wartość przelicza się na bazę bez reszty.
+UNIT_FACTORS = {
+    'g': 1000,
+    'kg': 1000000,
+    'ml': 1000,
+    'l': 1000000,
+    'szt': 1000,
+}
+
+UNIT_KINDS = {
+    'g': 'weight',
+    'kg': 'weight',
+    'ml': 'volume',
+    'l': 'volume',
+    'szt': 'piece',
+}
+
+# Najmniejsza zapisywalna porcja (0.001 jednostki) w jednostkach bazowych
+UNIT_STEPS = {unit: factor // 1000 for unit, factor in UNIT_FACTORS.items()}
+
+_THOUSANDTH = Decimal('0.001')
+
+
+def _to_decimal(amount):
+    """Decimal bez konwersji, int/float/str przez reprezentację tekstową."""
+    if isinstance(amount, Decimal):
+        return amount
+    return Decimal(str(amount))
+
+
+def to_base_int(value):
+    """
+    Zaokrągla sumę z bazy (Decimal z MySQL, float z SQLite) do liczby całkowitej.
+    """
+    if value is None:
+        return 0
+    return int(round(value))
+
+
+def to_base_amounts(amounts, units):
+    """
+    Przelicza całą listę ilości na jednostki bazowe naraz.
+
+    Args:
+        amounts: Ilości (Decimal z kolumn Numeric(10,3) lub int)
+        units: Jednostki odpowiadające ilościom
+
+    Returns:
+        Lista liczb całkowitych w jednostkach bazowych
+    """
+    factors = UNIT_FACTORS
+    return [int(amount * factors.get(unit, 1000)) for amount, unit in zip(amounts, units)]
+
+
+def normalize_to_base_unit(amount, unit):
+    """
+    Normalizuje ilość do całkowitej jednostki bazowej.
+    - g, kg → mg (miligramy)
+    - ml, l → µl (mikrolitry)
+    - szt → tysięczne części sztuki
+
+    Returns: (amount_in_base_unit, base_unit_type)
+    """
+    base = (_to_decimal(amount) * UNIT_FACTORS.get(unit, 1000)).to_integral_value(ROUND_HALF_UP)
+    return int(base), UNIT_KINDS.get(unit, 'piece')
+
+
+def format_amount_display(base_amount, unit_type):
+    """
+    Formatuje ilość bazową do najlepszej jednostki wyświetlania.
+    - weight: mg → g lub kg
+    - volume: µl → ml lub l
+    - piece: szt
+
+    Returns: (formatted_amount, display_unit)
+    """
+    if unit_type == 'weight':
+        if base_amount >= 1000000:  # >= 1kg
+            return round(base_amount / 1000000, 2), 'kg'
+        return round(base_amount / 1000, 1), 'g'
+    elif unit_type == 'volume':
+        if base_amount >= 1000000:  # >= 1l
+            return round(base_amount / 1000000, 2), 'l'
+        return round(base_amount / 1000, 1), 'ml'
+    else:  # piece
+        pieces = base_amount / 1000
+        return (int(pieces) if base_amount % 1000 == 0 else round(pieces, 2)), 'szt'
+
+
+def from_base_unit(base_amount, unit):
+    """
+    Przelicza całkowitą ilość bazową na jednostkę pozycji (Decimal, 3 miejsca).
+
+    Zakłada, że base_amount jest wielokrotnością UNIT_STEPS[unit].
+    """
+    return Decimal(base_amount // UNIT_STEPS.get(unit, 1)).scaleb(-3).quantize(_THOUSANDTH)
+
+
+def round_up_to_step(base_amount, unit):
+    """
+    Zaokrągla ilość bazową w górę do najmniejszej porcji zapisywalnej w danej jednostce.
+    """
+    step = UNIT_STEPS.get(unit, 1)
+    return -(-base_amount // step) * step
+
+
+class Quantity:
+    """
+    Ilość w całkowitych jednostkach bazowych (mg, µl lub 1/1000 szt).
+
+    Pozwala sumować i porównywać ilości w różnych jednostkach tego samego
+    rodzaju (g + kg, ml + l) bez błędów zaokrągleń.
+    """
+
+    __slots__ = ('base', 'kind')
+
+    def __init__(self, base, kind):
+        self.base = int(base)
+        self.kind = kind
+
+    @classmethod
+    def from_unit(cls, amount, unit):
+        """Tworzy ilość z wartości w jednostce g/kg/ml/l/szt."""
+        base, kind = normalize_to_base_unit(amount, unit)
+        return cls(base, kind)
+
+    def to_unit(self, unit):
+        """Ilość w podanej jednostce jako Decimal z dokładnością 0.001."""
+        return from_base_unit(self.base, unit)
+
+    def display(self):
+        """(ilość, jednostka) w najlepszej jednostce wyświetlania."""
+        return format_amount_display(self.base, self.kind)
+
+    def __add__(self, other):
+        return Quantity(self.base + other.base, self.kind)
+
+    def __sub__(self, other):
+        return Quantity(self.base - other.base, self.kind)
+
+    def __eq__(self, other):
+        return isinstance(other, Quantity) and (self.base, self.kind) == (other.base, other.kind)
+
+    def __lt__(self, other):
+        return self.base < other.base
+
+    def __le__(self, other):
+        return self.base <= other.base
+
+    def __bool__(self):
+        return self.base > 0
+
+    def __repr__(self):
+        amount, unit = self.display()
+        return f"<Quantity {amount} {unit}>"
@@ -0,0 +1,31 @@
+# Ogranicznik liczby zapytań do API zewnętrznych
+# Wspólny dla wątków puli - równomiernie rozkłada zapytania w czasie
+
+import threading
+import time
+
+
+class RateLimiter:
+    """
+    Prosty ogranicznik: co najwyżej `per_minute` zapytań na minutę.
+
+    Każde acquire() rezerwuje kolejny wolny slot czasowy i czeka do niego,
+    więc równoległe wątki nie przekraczają limitu dostawcy.
+    """
+
+    def __init__(self, per_minute):
+        self._interval = 60.0 / per_minute if per_minute > 0 else 0.0
+        self._next_slot = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Czeka na wolny slot"""
+        if not self._interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot)
+            self._next_slot = slot + self._interval
+        delay = slot - now
+        if delay > 0:
+            time.sleep(delay)
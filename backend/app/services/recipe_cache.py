@@ -0,0 +1,164 @@
+# Cache przepisów Asystenta Kucharza
+# Lokalna baza SQLite (moduł sqlite3) z TTL i usuwaniem najdawniej używanych wpisów
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from flask import current_app
+
+
+_schema_ready = set()
+_schema_lock = threading.Lock()
+
+
+def normalize_message(user_message):
+    """
+    Normalizuje wiadomość użytkownika do klucza cache
+    (małe litery, pojedyncze spacje, bez spacji na brzegach)
+    """
+    if not user_message:
+        return ''
+    return ' '.join(user_message.lower().split())
+
+
+def fridge_fingerprint(fridge_items):
+    """
+    Odcisk zawartości lodówki istotnej dla promptu.
+
+    Prompt zawiera tylko nazwy produktów, więc zmiana ilości nie unieważnia
+    przepisów, a dodanie lub zużycie całego produktu - tak.
+
+    Args:
+        fridge_items: Lista słowników z get_user_fridge_items
+
+    Returns:
+        Hex SHA-256 z posortowanej listy nazw
+    """
+    names = sorted(item['nazwa'] for item in fridge_items)
+    return hashlib.sha256(json.dumps(names, ensure_ascii=False).encode('utf-8')).hexdigest()
+
+
+class RecipeCache:
+    """
+    Cache odpowiedzi modelu AI.
+
+    Klucz: odcisk lodówki + znormalizowana wiadomość + model + wersja promptu.
+    Przechowywane są tylko przepisy wygenerowane przez Ollama (nie zapasowe).
+    """
+
+    @staticmethod
+    def _path():
+        path = current_app.config.get('RECIPE_CACHE_PATH')
+        if not path:
+            os.makedirs(current_app.instance_path, exist_ok=True)
+            path = os.path.join(current_app.instance_path, 'recipe_cache.sqlite3')
+        return path
+
+    @staticmethod
+    def _connect():
+        path = RecipeCache._path()
+        conn = sqlite3.connect(path, timeout=5)
+        if path not in _schema_ready:
+            with _schema_lock:
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS przepisy_cache ("
+                    " klucz TEXT PRIMARY KEY,"
+                    " odpowiedz TEXT NOT NULL,"
+                    " utworzono REAL NOT NULL,"
+                    " wygasa REAL NOT NULL,"
+                    " uzyto REAL NOT NULL)"
+                )
+                conn.execute("CREATE INDEX IF NOT EXISTS przepisy_cache_uzyto ON przepisy_cache (uzyto)")
+                conn.commit()
+                _schema_ready.add(path)
+        return conn
+
+    @staticmethod
+    def make_key(fridge_items, user_message, model, prompt_version):
+        """
+        Buduje klucz cache
+
+        Returns:
+            Hex SHA-256
+        """
+        raw = '|'.join([
+            fridge_fingerprint(fridge_items),
+            normalize_message(user_message),
+            model,
+            str(prompt_version),
+        ])
+        return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+    @staticmethod
+    def get(key):
+        """
+        Pobiera zapisane przepisy
+
+        Returns:
+            Lista przepisów lub None (brak, wygasło albo cache wyłączony)
+        """
+        if current_app.config['RECIPE_CACHE_TTL'] <= 0:
+            return None
+        now = time.time()
+        try:
+            conn = RecipeCache._connect()
+            try:
+                row = conn.execute(
+                    "SELECT odpowiedz FROM przepisy_cache WHERE klucz = ? AND wygasa > ?",
+                    (key, now),
+                ).fetchone()
+                if row is None:
+                    return None
+                conn.execute("UPDATE przepisy_cache SET uzyto = ? WHERE klucz = ?", (now, key))
+                conn.commit()
+                return json.loads(row[0])
+            finally:
+                conn.close()
+        except (sqlite3.Error, ValueError) as e:
+            current_app.logger.warning(f"Cache przepisów niedostępny: {e}")
+            return None
+
+    @staticmethod
+    def put(key, recipes):
+        """
+        Zapisuje przepisy i usuwa wpisy wygasłe oraz ponad RECIPE_CACHE_MAX_ENTRIES
+        (najdawniej używane)
+        """
+        ttl = current_app.config['RECIPE_CACHE_TTL']
+        if ttl <= 0:
+            return
+        max_entries = current_app.config['RECIPE_CACHE_MAX_ENTRIES']
+        now = time.time()
+        try:
+            conn = RecipeCache._connect()
+            try:
+                conn.execute(
+                    "INSERT OR REPLACE INTO przepisy_cache (klucz, odpowiedz, utworzono, wygasa, uzyto)"
+                    " VALUES (?, ?, ?, ?, ?)",
+                    (key, json.dumps(recipes, ensure_ascii=False), now, now + ttl, now),
+                )
+                conn.execute("DELETE FROM przepisy_cache WHERE wygasa <= ?", (now,))
+                conn.execute(
+                    "DELETE FROM przepisy_cache WHERE klucz IN ("
+                    " SELECT klucz FROM przepisy_cache ORDER BY uzyto DESC LIMIT -1 OFFSET ?)",
+                    (max_entries,),
+                )
+                conn.commit()
+            finally:
+                conn.close()
+        except sqlite3.Error as e:
+            current_app.logger.warning(f"Nie udało się zapisać przepisów w cache: {e}")
+
+    @staticmethod
+    def clear():
+        """Usuwa wszystkie wpisy (np. po zmianie modelu)"""
+        conn = RecipeCache._connect()
+        try:
+            conn.execute("DELETE FROM przepisy_cache")
+            conn.commit()
+        finally:
+            conn.close()
@@ -0,0 +1,86 @@
+# Przyrostowy parser przepisów z odpowiedzi modelu AI
+# Zwraca każdy przepis, gdy tylko jego obiekt JSON jest kompletny
+
+import json
+
+
+class RecipeStreamParser:
+    """
+    Parser odpowiedzi w formacie {"recipes": [{...}, {...}]} lub [{...}, {...}]
+    podawanej kawałkami (strumień tokenów z Ollama).
+
+    Śledzi zagnieżdżenie nawiasów poza łańcuchami znaków. Obiekt, którego
+    rodzicem jest tablica najwyższego poziomu (lub tablica w obiekcie
+    głównym), jest traktowany jako przepis i zwracany po domknięciu.
+    Tekst przed i po JSON (np. komentarz modelu) jest ignorowany.
+    """
+
+    def __init__(self):
+        self._buffer = []
+        self._pos = 0
+        self._stack = []
+        self._in_string = False
+        self._escape = False
+        self._start = None
+
+    def feed(self, chunk):
+        """
+        Dopisuje kawałek odpowiedzi
+
+        Args:
+            chunk: Tekst z kolejnego fragmentu strumienia
+
+        Returns:
+            Lista przepisów (dict) domkniętych w tym fragmencie
+        """
+        recipes = []
+        for char in chunk:
+            self._buffer.append(char)
+            self._pos += 1
+
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif char == '\\':
+                    self._escape = True
+                elif char == '"':
+                    self._in_string = False
+                continue
+
+            if char == '"':
+                # Łańcuch poza JSON (tekst przed odpowiedzią) nie jest śledzony
+                self._in_string = bool(self._stack)
+            elif char in '{[':
+                if char == '{' and self._is_recipe_parent():
+                    self._start = self._pos - 1
+                self._stack.append(char)
+            elif char in '}]' and self._stack:
+                self._stack.pop()
+                if char == '}' and self._start is not None and self._is_recipe_parent():
+                    recipe = self._decode(self._start, self._pos)
+                    if recipe is not None:
+                        recipes.append(recipe)
+                    self._start = None
+        return recipes
+
+    def _is_recipe_parent(self):
+        """Czy bieżący kontener to tablica przepisów"""
+        return self._stack in (['['], ['{', '['])
+
+    def _decode(self, start, end):
+        try:
+            value = json.loads(''.join(self._buffer[start:end]))
+        except ValueError:
+            return None
+        return value if isinstance(value, dict) else None
+
+
+def parse_recipes(text):
+    """
+    Wyciąga kompletne przepisy z całej (także uciętej lub otoczonej tekstem)
+    odpowiedzi modelu
+
+    Returns:
+        Lista przepisów
+    """
+    return RecipeStreamParser().feed(text)
@@ -0,0 +1,268 @@
+# Serwis statystyk operacji
+# Dzienne sumy historii (statystyki_operacji_dzienne) zamiast agregacji surowej historii
+
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional
+
+from sqlalchemy import func
+
+from ..extensions import db
+from ..models import FridgeItem, Lodowka, OperationHistory, Product, StatystykiDzienne
+from ..models.product import normalize_name
+from .bulk import bulk_upsert
+from .quantity import format_amount_display, normalize_to_base_unit
+
+
+class StatisticsService:
+    """
+    Serwis statystyk historii operacji.
+
+    Każdy zapis historii powiększa dzienne sumy jednym upsertem
+    (liczba_operacji += n, ilosc_bazowa += x), więc statystyki i liczniki
+    na koncie czytają kilka wierszy na dzień zamiast całej historii.
+    """
+
+    KEY_COLUMNS = ['lodowka_id', 'dzien', 'grupa', 'typ', 'rodzaj']
+
+    @staticmethod
+    def product_group(produkt_id, nazwa_wlasna) -> str:
+        """Klucz produktu w statystykach: 'p:<produkt_id>' albo 'n:<znormalizowana nazwa>'"""
+        if produkt_id is not None:
+            return f"p:{produkt_id}"
+        return f"n:{normalize_name(nazwa_wlasna)}"[:200]
+
+    @staticmethod
+    def _accumulate(totals: Dict, lodowka_id, produkt_id, nazwa_wlasna, produkt_nazwa,
+                    typ, ilosc, jednostka, utworzono):
+        """Dodaje jedną operację do słownika sum {klucz: wiersz}"""
+        grupa = StatisticsService.product_group(produkt_id, nazwa_wlasna)
+        base_amount, rodzaj = normalize_to_base_unit(ilosc or 0, jednostka)
+        dzien = (utworzono or datetime.utcnow()).date()
+
+        key = (lodowka_id, dzien, grupa, typ, rodzaj)
+        row = totals.get(key)
+        if row is None:
+            row = totals[key] = {
+                'lodowka_id': lodowka_id,
+                'dzien': dzien,
+                'grupa': grupa,
+                'typ': typ,
+                'rodzaj': rodzaj,
+                'produkt_id': produkt_id,
+                'nazwa': (nazwa_wlasna or produkt_nazwa or '')[:190] or None,
+                'liczba_operacji': 0,
+                'ilosc_bazowa': 0,
+            }
+        row['liczba_operacji'] += 1
+        row['ilosc_bazowa'] += base_amount
+
+    @staticmethod
+    def _upsert(totals: Dict):
+        bulk_upsert(
+            StatystykiDzienne,
+            list(totals.values()),
+            StatisticsService.KEY_COLUMNS,
+            ['produkt_id', 'nazwa'],
+            increment_columns=['liczba_operacji', 'ilosc_bazowa'],
+        )
+
+    @staticmethod
+    def record_operations(entries: List[Dict]):
+        """
+        Dolicza nowe wpisy historii do dziennych sum. Nie wykonuje commit.
+
+        Args:
+            entries: Słowniki z kolumnami historia_operacji_pozycji
+                     (pozycja_id, typ, ilosc, jednostka_g_ml_szt, utworzono)
+        """
+        if not entries:
+            return
+
+        positions = {
+            row.id: row
+            for row in db.session.query(
+                FridgeItem.id, FridgeItem.lodowka_id, FridgeItem.produkt_id,
+                FridgeItem.nazwa_wlasna, Product.nazwa.label('produkt_nazwa'),
+            ).outerjoin(
+                Product, Product.id == FridgeItem.produkt_id
+            ).filter(
+                FridgeItem.id.in_({entry['pozycja_id'] for entry in entries})
+            )
+        }
+
+        totals = {}
+        for entry in entries:
+            position = positions.get(entry['pozycja_id'])
+            if position is None:
+                continue
+            StatisticsService._accumulate(
+                totals, position.lodowka_id, position.produkt_id, position.nazwa_wlasna,
+                position.produkt_nazwa, entry['typ'], entry['ilosc'], entry['jednostka_g_ml_szt'],
+                entry.get('utworzono'),
+            )
+        StatisticsService._upsert(totals)
+
+    @staticmethod
+    def rebuild(lodowka_id: Optional[int] = None, batch_size: int = 5000) -> Dict:
+        """
+        Odtwarza dzienne sumy z pełnej historii operacji
+
+        Usunięcie starych sum i przeliczenie idą w jednej transakcji, więc
+        zapisy historii w trakcie przebudowy nie są liczone podwójnie.
+        Historia czytana jest partiami po id.
+
+        Args:
+            lodowka_id: Tylko ta lodówka (domyślnie wszystkie)
+            batch_size: Liczba wpisów historii w partii
+
+        Returns:
+            Słownik z wynikiem operacji i licznikami operations/rows
+        """
+        operations = 0
+        try:
+            delete = db.session.query(StatystykiDzienne)
+            if lodowka_id is not None:
+                delete = delete.filter(StatystykiDzienne.lodowka_id == lodowka_id)
+            delete.delete(synchronize_session=False)
+
+            last_id = 0
+            while True:
+                query = db.session.query(
+                    OperationHistory.id, OperationHistory.typ, OperationHistory.ilosc,
+                    OperationHistory.jednostka_g_ml_szt, OperationHistory.utworzono,
+                    FridgeItem.lodowka_id, FridgeItem.produkt_id, FridgeItem.nazwa_wlasna,
+                    Product.nazwa.label('produkt_nazwa'),
+                ).join(
+                    FridgeItem, FridgeItem.id == OperationHistory.pozycja_id
+                ).outerjoin(
+                    Product, Product.id == FridgeItem.produkt_id
+                ).filter(OperationHistory.id > last_id)
+                if lodowka_id is not None:
+                    query = query.filter(FridgeItem.lodowka_id == lodowka_id)
+                batch = query.order_by(OperationHistory.id).limit(batch_size).all()
+                if not batch:
+                    break
+
+                totals = {}
+                for row in batch:
+                    StatisticsService._accumulate(
+                        totals, row.lodowka_id, row.produkt_id, row.nazwa_wlasna, row.produkt_nazwa,
+                        row.typ, row.ilosc, row.jednostka_g_ml_szt, row.utworzono,
+                    )
+                StatisticsService._upsert(totals)
+                operations += len(batch)
+                last_id = batch[-1].id
+
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            return {
+                'success': False,
+                'message': f'Błąd podczas przebudowy statystyk: {str(e)}'
+            }
+
+        rows = StatystykiDzienne.query
+        if lodowka_id is not None:
+            rows = rows.filter(StatystykiDzienne.lodowka_id == lodowka_id)
+        rows = rows.count()
+        return {
+            'success': True,
+            'message': f'Przeliczono {operations} operacji do {rows} wierszy statystyk',
+            'operations': operations,
+            'rows': rows
+        }
+
+    @staticmethod
+    def _user_rollups(user_id):
+        return db.session.query(StatystykiDzienne).join(
+            Lodowka, Lodowka.id == StatystykiDzienne.lodowka_id
+        ).filter(Lodowka.wlasciciel_id == user_id)
+
+    @staticmethod
+    def count_operations(user_id) -> int:
+        """Liczba wszystkich operacji w lodówkach użytkownika"""
+        total = StatisticsService._user_rollups(user_id)\
+            .with_entities(func.sum(StatystykiDzienne.liczba_operacji))\
+            .scalar()
+        return int(total or 0)
+
+    @staticmethod
+    def _top_products(query, typ: str, limit: int) -> List[Dict]:
+        rows = query.filter(StatystykiDzienne.typ == typ).with_entities(
+            StatystykiDzienne.grupa,
+            StatystykiDzienne.rodzaj,
+            func.max(StatystykiDzienne.produkt_id).label('produkt_id'),
+            func.max(StatystykiDzienne.nazwa).label('nazwa'),
+            func.sum(StatystykiDzienne.liczba_operacji).label('liczba_operacji'),
+            func.sum(StatystykiDzienne.ilosc_bazowa).label('ilosc_bazowa'),
+        ).group_by(
+            StatystykiDzienne.grupa, StatystykiDzienne.rodzaj
+        ).order_by(
+            func.sum(StatystykiDzienne.liczba_operacji).desc(), StatystykiDzienne.grupa
+        ).limit(limit).all()
+
+        products = []
+        for row in rows:
+            amount, unit = format_amount_display(int(row.ilosc_bazowa or 0), row.rodzaj)
+            products.append({
+                'produkt_id': row.produkt_id,
+                'nazwa': row.nazwa or 'Produkt bez nazwy',
+                'liczba_operacji': int(row.liczba_operacji),
+                'ilosc': float(amount),
+                'jednostka': unit,
+            })
+        return products
+
+    @staticmethod
+    def get_statistics(user_id, days: int = 30, top: int = 5, today: Optional[date] = None) -> Dict:
+        """
+        Statystyki operacji z ostatnich dni
+
+        Args:
+            user_id: ID użytkownika (właściciela lodówki)
+            days: Liczba dni wstecz, łącznie z dzisiejszym
+            top: Liczba produktów w rankingach
+            today: Dzień końcowy (domyślnie dzisiaj, UTC)
+
+        Returns:
+            Dict z kluczami date_from, date_to, totals ({typ: liczba}),
+            most_added, most_wasted (listy produktów) i daily
+            (lista {dzien, dodano, zuzyto, usunieto})
+
+        Raises:
+            ValueError: Gdy days jest spoza zakresu 1-366
+        """
+        if days < 1 or days > 366:
+            raise ValueError('Zakres statystyk musi mieć od 1 do 366 dni')
+
+        date_to = today or datetime.utcnow().date()
+        date_from = date_to - timedelta(days=days - 1)
+        query = StatisticsService._user_rollups(user_id).filter(
+            StatystykiDzienne.dzien >= date_from,
+            StatystykiDzienne.dzien <= date_to,
+        )
+
+        per_day = query.with_entities(
+            StatystykiDzienne.dzien,
+            StatystykiDzienne.typ,
+            func.sum(StatystykiDzienne.liczba_operacji).label('liczba_operacji'),
+        ).group_by(StatystykiDzienne.dzien, StatystykiDzienne.typ).all()
+
+        totals = {}
+        daily = {}
+        for row in per_day:
+            count = int(row.liczba_operacji)
+            totals[row.typ] = totals.get(row.typ, 0) + count
+            daily.setdefault(row.dzien, {})[row.typ] = count
+
+        return {
+            'date_from': date_from.isoformat(),
+            'date_to': date_to.isoformat(),
+            'totals': totals,
+            'most_added': StatisticsService._top_products(query, 'dodano', top),
+            'most_wasted': StatisticsService._top_products(query, 'usunieto', top),
+            'daily': [
+                dict(daily[dzien], dzien=dzien.isoformat())
+                for dzien in sorted(daily)
+            ],
+        }
@@ -0,0 +1,238 @@
+# Analiza marnowania żywności
+# Strumień historii operacji przetwarzany partiami kolumn - bez obiektów ORM na wiersz
+
+from datetime import date, datetime
+from typing import Dict, Iterator, Optional, Tuple
+
+from sqlalchemy import select
+
+from ..extensions import db
+from ..models import FridgeItem, OperationHistory, Product, WartosciOdzywcze
+from .quantity import UNIT_KINDS, format_amount_display, to_base_amounts
+from .statistics_service import StatisticsService
+
+
+# Kolumny strumienia historii (kolejność jak w WasteAnalytics._select)
+COLUMNS = (
+    'lodowka_id', 'typ', 'ilosc', 'jednostka', 'utworzono', 'dodano_pozycje',
+    'produkt_id', 'nazwa_wlasna', 'produkt_nazwa', 'gramow_na_szt', 'kcal_100g',
+)
+
+_SECONDS_PER_DAY = 86400
+
+
+class _WasteAccumulator:
+    """
+    Sumy dla jednego gospodarstwa (lodówki), doliczane partiami kolumn.
+
+    Dla każdego produktu (klucz jak w statystykach dziennych + rodzaj
+    jednostki): ilości dodane / zużyte / wyrzucone w jednostkach bazowych
+    oraz ważone ilością sumy dni od dodania pozycji do zużycia i wyrzucenia.
+    Dla miesięcy: masa (g) i kcal wyrzuconej żywności.
+    """
+
+    def __init__(self):
+        self.products = {}
+        self.months = {}
+
+    def add_batch(self, columns: Dict[str, tuple]):
+        """
+        Dolicza partię wierszy podaną jako kolumny (krotki tej samej długości)
+        """
+        base_amounts = to_base_amounts([amount or 0 for amount in columns['ilosc']], columns['jednostka'])
+        groups = [
+            StatisticsService.product_group(produkt_id, nazwa)
+            for produkt_id, nazwa in zip(columns['produkt_id'], columns['nazwa_wlasna'])
+        ]
+        kinds = [UNIT_KINDS.get(unit, 'piece') for unit in columns['jednostka']]
+        days = [
+            max((done - added).total_seconds(), 0) / _SECONDS_PER_DAY if done and added else None
+            for done, added in zip(columns['utworzono'], columns['dodano_pozycje'])
+        ]
+
+        for i, typ in enumerate(columns['typ']):
+            if typ not in ('dodano', 'zuzyto', 'usunieto'):
+                continue
+            key = (groups[i], kinds[i])
+            product = self.products.get(key)
+            if product is None:
+                product = self.products[key] = {
+                    'produkt_id': columns['produkt_id'][i],
+                    'nazwa': columns['nazwa_wlasna'][i] or columns['produkt_nazwa'][i] or 'Produkt bez nazwy',
+                    'rodzaj': kinds[i],
+                    'dodano': 0, 'zuzyto': 0, 'usunieto': 0,
+                    'dni_zuzycia': 0.0, 'dni_wyrzucenia': 0.0,
+                }
+            amount = base_amounts[i]
+            product[typ] += amount
+
+            if typ == 'zuzyto' and days[i] is not None:
+                product['dni_zuzycia'] += days[i] * amount
+            elif typ == 'usunieto':
+                if days[i] is not None:
+                    product['dni_wyrzucenia'] += days[i] * amount
+                self._add_wasted(columns, i, kinds[i], amount)
+
+    def _add_wasted(self, columns, i, kind, amount):
+        """Masa i kaloryczność wyrzuconej ilości w miesiącu operacji"""
+        when = columns['utworzono'][i]
+        month = self.months.setdefault(when.strftime('%Y-%m') if when else 'brak daty', {
+            'wyrzucono_operacji': 0, 'masa_g': 0.0, 'kcal': 0.0, 'bez_masy_operacji': 0,
+        })
+        month['wyrzucono_operacji'] += 1
+
+        # Objętość liczona jak woda (1 ml = 1 g); sztuki tylko ze znanym gramow_na_szt
+        if kind in ('weight', 'volume'):
+            grams = amount / 1000
+        elif columns['gramow_na_szt'][i]:
+            grams = amount / 1000 * float(columns['gramow_na_szt'][i])
+        else:
+            month['bez_masy_operacji'] += 1
+            return
+        month['masa_g'] += grams
+        if columns['kcal_100g'][i] is not None:
+            month['kcal'] += grams * float(columns['kcal_100g'][i]) / 100
+
+    def result(self, top: Optional[int] = None) -> Dict:
+        """
+        Raport: produkty od najwyższego udziału wyrzuconej ilości, miesiące rosnąco
+        """
+        products = []
+        for product in self.products.values():
+            if not product['dodano'] and not product['usunieto']:
+                continue
+            amount_wasted, unit = format_amount_display(product['usunieto'], product['rodzaj'])
+            amount_added, _ = format_amount_display(product['dodano'], product['rodzaj'])
+            products.append({
+                'produkt_id': product['produkt_id'],
+                'nazwa': product['nazwa'],
+                'jednostka': unit,
+                'dodano': float(amount_added),
+                'wyrzucono': float(amount_wasted),
+                # Może przekroczyć 1, gdy pozycje dodano przed początkiem okresu
+                'wskaznik_marnowania': (
+                    round(product['usunieto'] / product['dodano'], 3) if product['dodano'] else None
+                ),
+                'sredni_czas_do_zuzycia_dni': (
+                    round(product['dni_zuzycia'] / product['zuzyto'], 1) if product['zuzyto'] else None
+                ),
+                'sredni_czas_do_wyrzucenia_dni': (
+                    round(product['dni_wyrzucenia'] / product['usunieto'], 1) if product['usunieto'] else None
+                ),
+            })
+        products.sort(key=lambda p: (-(p['wskaznik_marnowania'] or 0), -p['wyrzucono'], p['nazwa']))
+
+        return {
+            'produkty': products[:top] if top else products,
+            'miesiace': [
+                dict(
+                    month,
+                    miesiac=key,
+                    masa_g=round(month['masa_g'], 1),
+                    kcal=round(month['kcal'], 1),
+                )
+                for key, month in sorted(self.months.items())
+            ],
+        }
+
+
+class WasteAnalytics:
+    """
+    Raport marnowania żywności z historii operacji.
+
+    Historia jest czytana strumieniowo (yield_per) jednym zapytaniem
+    z JOIN do pozycji, produktu i wartości odżywczych. Każda partia
+    wierszy jest transponowana na kolumny, przeliczana na jednostki
+    bazowe naraz (to_base_amounts) i doliczana do sum - pamięć zależy
+    od liczby produktów, nie od długości historii.
+    """
+
+    DEFAULT_BATCH_SIZE = 5000
+
+    @staticmethod
+    def _select(since: Optional[date] = None, lodowka_id: Optional[int] = None):
+        stmt = select(
+            FridgeItem.lodowka_id,
+            OperationHistory.typ,
+            OperationHistory.ilosc,
+            OperationHistory.jednostka_g_ml_szt,
+            OperationHistory.utworzono,
+            FridgeItem.utworzono,
+            FridgeItem.produkt_id,
+            FridgeItem.nazwa_wlasna,
+            Product.nazwa,
+            Product.gramow_na_szt,
+            WartosciOdzywcze.na_100g_kcal,
+        ).join(
+            FridgeItem, FridgeItem.id == OperationHistory.pozycja_id
+        ).outerjoin(
+            Product, Product.id == FridgeItem.produkt_id
+        ).outerjoin(
+            WartosciOdzywcze, WartosciOdzywcze.produkt_id == FridgeItem.produkt_id
+        )
+        if since is not None:
+            stmt = stmt.where(OperationHistory.utworzono >= datetime.combine(since, datetime.min.time()))
+        if lodowka_id is not None:
+            stmt = stmt.where(FridgeItem.lodowka_id == lodowka_id)
+        return stmt
+
+    @staticmethod
+    def _stream(stmt, batch_size: int) -> Iterator[Dict[str, tuple]]:
+        """Partie wierszy jako słowniki kolumn {nazwa: krotka}"""
+        result = db.session.execute(stmt.execution_options(yield_per=batch_size))
+        for partition in result.partitions():
+            yield dict(zip(COLUMNS, zip(*partition)))
+
+    @staticmethod
+    def household_report(lodowka_id: int, since: Optional[date] = None, top: Optional[int] = None,
+                         batch_size: int = DEFAULT_BATCH_SIZE) -> Dict:
+        """
+        Raport marnowania dla jednej lodówki
+
+        Args:
+            lodowka_id: ID lodówki
+            since: Tylko operacje od tego dnia
+            top: Maksymalna liczba produktów w raporcie
+            batch_size: Liczba wierszy w partii strumienia
+
+        Returns:
+            Dict z listami produkty i miesiace
+        """
+        accumulator = _WasteAccumulator()
+        stmt = WasteAnalytics._select(since=since, lodowka_id=lodowka_id)
+        for columns in WasteAnalytics._stream(stmt, batch_size):
+            accumulator.add_batch(columns)
+        return accumulator.result(top)
+
+    @staticmethod
+    def all_households(since: Optional[date] = None, top: Optional[int] = None,
+                       batch_size: int = DEFAULT_BATCH_SIZE) -> Iterator[Tuple[int, Dict]]:
+        """
+        Raporty wszystkich lodówek jednym przebiegiem po historii
+
+        Strumień jest posortowany po lodówce, więc raport jest oddawany,
+        gdy tylko zaczną się wiersze następnej - w pamięci są sumy jednej
+        lodówki naraz.
+
+        Yields:
+            Krotki (lodowka_id, raport jak household_report)
+        """
+        stmt = WasteAnalytics._select(since=since).order_by(FridgeItem.lodowka_id, OperationHistory.id)
+        current_id, accumulator = None, None
+
+        for columns in WasteAnalytics._stream(stmt, batch_size):
+            # Podział partii na odcinki tej samej lodówki
+            ids = columns['lodowka_id']
+            start = 0
+            for end in range(1, len(ids) + 1):
+                if end < len(ids) and ids[end] == ids[start]:
+                    continue
+                if ids[start] != current_id:
+                    if accumulator is not None:
+                        yield current_id, accumulator.result(top)
+                    current_id, accumulator = ids[start], _WasteAccumulator()
+                accumulator.add_batch({name: values[start:end] for name, values in columns.items()})
+                start = end
+
+        if accumulator is not None:
+            yield current_id, accumulator.result(top)
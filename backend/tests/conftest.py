@@ -0,0 +1,32 @@
+# Wspólne fixture'y dla testów
+# Aplikacja testowa z bazą SQLite w pamięci
+
+import sys
+import os
+
+import pytest
+
+# Dodanie ścieżki do głównego pakietu
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app import create_app
+from app.config import TestingConfig
+from app.extensions import db
+from app.models import User, Lodowka
+
+
+@pytest.fixture
+def app(tmp_path):
+    """
+    Aplikacja z pustą bazą SQLite, jedną lodówką i jednym użytkownikiem
+    """
+    app = create_app(TestingConfig)
+    app.config['JOB_STORE_PATH'] = str(tmp_path / 'jobs.sqlite3')
+    with app.app_context():
+        db.create_all()
+        db.session.add(User(id=1, email='senior@test.pl', haslo_hash='x'))
+        db.session.add(Lodowka(id=1, wlasciciel_id=1))
+        db.session.commit()
+        yield app
+        db.session.remove()
+        db.drop_all()
@@ -0,0 +1,132 @@
+# Testy endpointów Asystenta Kucharza
+# Ollama i jej monitor są podmienione, pula 'ai' to prawdziwa JobQueue
+
+import json
+import threading
+
+import pytest
+from flask_jwt_extended import create_access_token
+
+from app.extensions import db
+from app.models import FridgeItem, Lodowka, User
+from app.routes import ai
+from app.services.job_queue import JobQueue
+from app.services.ollama_service import OllamaService
+
+RECIPE = {
+    'title': 'Omlet',
+    'ingredients_from_fridge': ['Jajka', 'Mleko'],
+    'ingredients_to_buy': [],
+    'steps': ['Roztrzep jajka', 'Usmaż'],
+    'calories_per_100g': 150,
+}
+
+
+@pytest.fixture
+def client(app, tmp_path, monkeypatch):
+    """Klient zalogowany jako właściciel lodówki z dwoma produktami"""
+    app.config['RECIPE_CACHE_PATH'] = str(tmp_path / 'recipes.sqlite3')
+    db.session.add_all([
+        FridgeItem(id=1, lodowka_id=1, nazwa_wlasna='Jajka', ilosc=6, jednostka_g_ml_szt='szt'),
+        FridgeItem(id=2, lodowka_id=1, nazwa_wlasna='Mleko', ilosc=1, jednostka_g_ml_szt='l'),
+    ])
+    db.session.commit()
+    monkeypatch.setattr(OllamaService, 'is_available', staticmethod(lambda: True))
+
+    client = app.test_client()
+    client.set_cookie('access_token_cookie', create_access_token(identity='1'))
+    return client
+
+
+def _events(response):
+    return [json.loads(line) for line in response.get_data(as_text=True).splitlines() if line]
+
+
+def _slot_is_free():
+    if not JobQueue.try_acquire('ai'):
+        return False
+    JobQueue.release('ai')
+    return True
+
+
+def test_stream_refuses_when_ai_pool_is_full(client):
+    assert JobQueue.try_acquire('ai')
+    try:
+        response = client.post('/ai/kucharz/stream', json={})
+        assert response.status_code == 429
+        assert response.headers['Retry-After'] == '10'
+    finally:
+        JobQueue.release('ai')
+
+
+def test_stream_releases_slot_after_recipes(client, monkeypatch):
+    def stream(prompt):
+        assert not _slot_is_free()
+        text = json.dumps({'recipes': [RECIPE, dict(RECIPE, title='Naleśniki')]})
+        yield text[:40]
+        yield text[40:]
+
+    monkeypatch.setattr(ai, 'stream_ollama_api', stream)
+
+    events = _events(client.post('/ai/kucharz/stream', json={}))
+
+    assert [e['type'] for e in events] == ['meta', 'mode', 'recipe', 'recipe', 'done']
+    assert [e['recipe']['title'] for e in events if e['type'] == 'recipe'] == ['Omlet', 'Naleśniki']
+    assert _slot_is_free()
+
+    # Ta sama lodówka - przepisy z cache, bez Ollamy
+    monkeypatch.setattr(ai, 'stream_ollama_api', None)
+    assert _events(client.post('/ai/kucharz/stream', json={}))[1] == {
+        'type': 'mode', 'ai_mode': 'ollama', 'cached': True
+    }
+
+
+def test_stream_releases_slot_when_client_disconnects(client, monkeypatch):
+    monkeypatch.setattr(ai, 'stream_ollama_api', lambda prompt: iter([json.dumps({'recipes': [RECIPE]})]))
+
+    response = client.post('/ai/kucharz/stream', json={}, buffered=False)
+    assert json.loads(next(response.response))['type'] == 'meta'
+    assert not _slot_is_free()
+
+    response.close()
+    assert _slot_is_free()
+
+
+def test_stream_falls_back_without_ollama(client, monkeypatch):
+    monkeypatch.setattr(OllamaService, 'is_available', staticmethod(lambda: False))
+
+    events = _events(client.post('/ai/kucharz/stream', json={'user_message': 'na słodko'}))
+
+    assert events[1]['ai_mode'] == 'fallback'
+    assert events[-1] == {'type': 'done', 'ai_mode': 'fallback'}
+    assert any(e['type'] == 'recipe' for e in events)
+    assert _slot_is_free()
+
+
+def test_chef_job_status_is_visible_to_owner_only(client, app, monkeypatch):
+    release = threading.Event()
+
+    def generate(fridge_items, recipes_count, user_message, cache_key):
+        release.wait(2)
+        return {'success': True, 'recipes': [RECIPE], 'ai_mode': 'ollama'}
+
+    monkeypatch.setattr(ai, 'generate_ollama_recipes', generate)
+
+    response = client.post('/ai/kucharz', json={})
+    assert response.status_code == 202
+    status_url = response.get_json()['status_url']
+    assert client.post('/ai/kucharz', json={}).get_json()['job_id'] == response.get_json()['job_id']
+
+    db.session.add_all([User(id=2, email='inny@test.pl', haslo_hash='x'), Lodowka(id=2, wlasciciel_id=2)])
+    db.session.commit()
+    other = app.test_client()
+    other.set_cookie('access_token_cookie', create_access_token(identity='2'))
+    assert other.get(status_url).status_code == 404
+
+    release.set()
+    for _ in range(200):
+        job = client.get(status_url).get_json()
+        if job['status'] == 'done':
+            break
+        threading.Event().wait(0.01)
+    assert job['recipes'] == [RECIPE]
@@ -0,0 +1,151 @@
+# Testy cache odpowiedzi API (tabela cache_api + LRU)
+# Sieć jest podmieniona na obiekt zliczający zapytania
+
+from datetime import datetime, timedelta
+
+import pytest
+import requests
+
+from app.extensions import db
+from app.models import CacheApi, ZrodloApi
+from app.services import api_cache
+from app.services.api_cache import ApiCache
+from app.services.openfoodfacts_payload import decompress, project_response
+
+
+class _Response:
+    def __init__(self, status_code, data=None, etag=None):
+        self.status_code = status_code
+        self._data = data
+        self.headers = {'ETag': etag} if etag else {}
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.HTTPError(f'{self.status_code}')
+
+    def json(self):
+        return self._data
+
+
+class _Http:
+    def __init__(self, responses):
+        self.responses = responses
+        self.calls = []
+
+    def get(self, url, params=None, headers=None):
+        self.calls.append(headers or {})
+        return self.responses.pop(0)
+
+
+def test_read_through_and_revalidation(app, monkeypatch):
+    """
+    Sieć -> LRU -> cache_api, a po wygaśnięciu rewalidacja przez If-None-Match
+    """
+    db.session.add(ZrodloApi(id=ZrodloApi.OPENFOODFACTS_ID, nazwa='OpenFoodFacts'))
+    db.session.commit()
+    fake = _Http([_Response(200, {'status': 1}, etag='"v1"'), _Response(304)])
+    monkeypatch.setattr(api_cache, 'http', fake)
+    ApiCache.clear_lru()
+    fetch = lambda: ApiCache.fetch(1, 'https://off/5900', timedelta(days=1), barcode='5900')
+
+    assert fetch()['source'] == 'network'
+    assert fetch()['source'] == 'lru'
+    ApiCache.clear_lru()
+    assert fetch()['source'] == 'db'
+    assert len(fake.calls) == 1
+
+    ApiCache.clear_lru()
+    row = CacheApi.query.one()
+    row.wygasa = datetime.utcnow() - timedelta(seconds=1)
+    db.session.commit()
+
+    result = fetch()
+    assert result['source'] == 'revalidated'
+    assert result['data'] == {'status': 1}
+    assert fake.calls[1] == {'If-None-Match': '"v1"'}
+    assert CacheApi.query.one().wygasa > datetime.utcnow()
+    ApiCache.clear_lru()
+
+
+def test_projection_keeps_read_fields_and_compressed_raw(app, monkeypatch):
+    """
+    W odpowiedz zostaje projekcja, pełna odpowiedź jest w odpowiedz_surowa
+    """
+    db.session.add(ZrodloApi(id=ZrodloApi.OPENFOODFACTS_ID, nazwa='OpenFoodFacts'))
+    db.session.commit()
+    raw = {
+        'status': 1,
+        'code': '5900',
+        'product': {
+            'product_name': 'Mleko',
+            'brands': 'Łaciate',
+            '_keywords': ['mleko'] * 100,
+            'nutriments': {'energy-kcal_100g': 60, 'sugars_100g': 4.7},
+        },
+    }
+    monkeypatch.setattr(api_cache, 'http', _Http([_Response(200, raw)]))
+    ApiCache.clear_lru()
+
+    result = ApiCache.fetch(1, 'https://off/5900', timedelta(days=1), barcode='5900',
+                            project=project_response)
+    ApiCache.clear_lru()
+
+    expected = {
+        'status': 1,
+        'code': '5900',
+        'product': {'product_name': 'Mleko', 'brands': 'Łaciate', 'nutriments': {'energy-kcal_100g': 60}},
+    }
+    assert result['data'] == expected
+    row = CacheApi.query.one()
+    assert row.odpowiedz == expected
+    assert decompress(row.odpowiedz_surowa) == raw
+
+
+def test_fetch_leaves_caller_session_alone(app, monkeypatch):
+    """
+    Zapis cache nie zatwierdza ani nie wycofuje transakcji wywołującego
+    """
+    db.session.add(ZrodloApi(id=ZrodloApi.OPENFOODFACTS_ID, nazwa='OpenFoodFacts'))
+    db.session.commit()
+    monkeypatch.setattr(api_cache, 'http', _Http([_Response(200, {'status': 1})]))
+    ApiCache.clear_lru()
+
+    def forbidden():
+        raise AssertionError('ApiCache.fetch nie może kończyć transakcji sesji')
+
+    monkeypatch.setattr(db.session, 'commit', forbidden)
+    monkeypatch.setattr(db.session, 'rollback', forbidden)
+    result = ApiCache.fetch(1, 'https://off/5900', timedelta(days=1), barcode='5900')
+    monkeypatch.undo()
+    ApiCache.clear_lru()
+
+    assert result['source'] == 'network'
+    assert CacheApi.query.one().id == result['cache_id']
+
+
+def test_not_found_is_cached_as_negative_result(app, monkeypatch):
+    """
+    404 z not_found_ttl trafia do cache_api na krótszy czas, bez niego jest błędem
+    """
+    db.session.add(ZrodloApi(id=ZrodloApi.OPENFOODFACTS_ID, nazwa='OpenFoodFacts'))
+    db.session.commit()
+    fake = _Http([_Response(404), _Response(404, {'status': 0, 'status_verbose': 'product not found'})])
+    monkeypatch.setattr(api_cache, 'http', fake)
+    ApiCache.clear_lru()
+
+    with pytest.raises(requests.HTTPError):
+        ApiCache.fetch(1, 'https://off/0000', timedelta(days=7), barcode='0000')
+    assert CacheApi.query.count() == 0
+
+    fetch = lambda: ApiCache.fetch(1, 'https://off/0000', timedelta(days=7), barcode='0000',
+                                   project=project_response, not_found_ttl=timedelta(hours=1))
+    result = fetch()
+    assert (result['status'], result['data'], result['source']) == (404, {'status': 0}, 'network')
+    ApiCache.clear_lru()
+    assert fetch()['source'] == 'db'
+    assert len(fake.calls) == 2
+
+    row = CacheApi.query.one()
+    assert row.http_status == 404
+    assert row.wygasa < datetime.utcnow() + timedelta(hours=2)
+    ApiCache.clear_lru()
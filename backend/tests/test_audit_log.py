@@ -0,0 +1,126 @@
+# Testy dziennika zmian (logi_zdarzen)
+# Migawki z zdarzeń sesji, zapis po commit i zapis w tle partiami
+
+import json
+from datetime import date
+from decimal import Decimal
+
+from flask_jwt_extended import create_access_token
+
+from app.extensions import db
+from app.models import FridgeItem, Log, Product, User
+from app.models.fridge_item import compute_group_key
+from app.services.audit_log import AuditLog
+from app.services.fridge_service import FridgeService
+
+
+def test_changes_are_logged_after_commit(app):
+    app.config.update(AUDIT_LOG_ENABLED=True, AUDIT_LOG_ASYNC=False)
+
+    product = Product(id=1, nazwa='Mleko')
+    db.session.add_all([
+        product,
+        FridgeItem(id=1, lodowka_id=1, produkt_id=1, ilosc=1, jednostka_g_ml_szt='l'),
+    ])
+    db.session.commit()
+
+    inserted = {log.tabela: log for log in Log.query.filter_by(typ='INSERT')}
+    assert set(inserted) == {'produkty', 'magazyn_pozycje_lodowki'}
+    assert inserted['magazyn_pozycje_lodowki'].lodowka_id == 1
+    assert json.loads(inserted['produkty'].po)['nazwa'] == 'Mleko'
+
+    assert product.nazwa == 'Mleko'
+    product.nazwa = 'Mleko 2%'
+    db.session.commit()
+    update = Log.query.filter_by(typ='UPDATE').one()
+    assert (update.tabela, update.rekord_id) == ('produkty', 1)
+    assert json.loads(update.przed)['nazwa'] == 'Mleko'
+    assert json.loads(update.po)['nazwa'] == 'Mleko 2%'
+
+    # Wycofana transakcja nie zostawia wpisów, hasło nie trafia do dziennika
+    product.nazwa = 'Kefir'
+    db.session.flush()
+    db.session.rollback()
+    user = db.session.get(User, 1)
+    assert user.imie is None
+    user.haslo_hash = 'nowy'
+    user.imie = 'Anna'
+    db.session.commit()
+
+    assert Log.query.filter_by(typ='UPDATE', tabela='produkty').count() == 1
+    user_update = Log.query.filter_by(tabela='uzytkownicy').one()
+    assert (json.loads(user_update.przed), json.loads(user_update.po)) == ({'imie': None}, {'imie': 'Anna'})
+
+
+def test_bulk_consume_and_discard_are_logged(app):
+    """
+    UPDATE na zbiorach (zużycie, wyrzucenie) omija session.dirty - wpisy dołącza serwis
+    """
+    app.config.update(AUDIT_LOG_ENABLED=True, AUDIT_LOG_ASYNC=False)
+
+    wazne_do = date(2030, 1, 1)
+    db.session.add_all([
+        FridgeItem(id=1, lodowka_id=1, nazwa_wlasna='Mąka', ilosc=Decimal('500'),
+                   jednostka_g_ml_szt='g', wazne_do=wazne_do),
+        FridgeItem(id=2, lodowka_id=1, nazwa_wlasna='Mąka', ilosc=Decimal('1'),
+                   jednostka_g_ml_szt='kg', wazne_do=wazne_do),
+    ])
+    db.session.commit()
+    group_key = compute_group_key(None, 'Mąka', wazne_do)
+
+    FridgeService.consume_from_group(1, group_key, 0.7, user_id=1)
+    db.session.commit()
+
+    updates = {log.rekord_id: log for log in Log.query.filter_by(typ='UPDATE')}
+    assert set(updates) == {1, 2}
+    assert all(log.tabela == 'magazyn_pozycje_lodowki' and log.lodowka_id == 1 and log.uzytkownik_id == 1
+               for log in updates.values())
+    first_po = json.loads(updates[1].po)
+    first_przed = json.loads(updates[1].przed)
+    assert (Decimal(first_przed.pop('ilosc')), first_przed) == (500, {'usunieto': None, 'usunal_id': None})
+    assert (Decimal(first_po['ilosc']), first_po['usunal_id']) == (0, 1)
+    assert first_po['usunieto'] is not None
+    assert Decimal(json.loads(updates[2].przed)['ilosc']) == 1
+    assert Decimal(json.loads(updates[2].po)['ilosc']) == Decimal('0.8')
+    assert 'usunieto' not in json.loads(updates[2].po)
+
+    # Wycofane wyrzucenie nie zostawia wpisów, zatwierdzone - jeden na pozycję
+    FridgeService.discard(1, 1, item_id=2)
+    db.session.rollback()
+    assert Log.query.filter_by(typ='UPDATE').count() == 2
+
+    FridgeService.discard(1, 1, group_key=group_key)
+    db.session.commit()
+    discarded = Log.query.filter_by(typ='UPDATE', rekord_id=2).order_by(Log.id.desc()).first()
+    assert json.loads(discarded.przed) == {'usunieto': None, 'usunal_id': None}
+    assert json.loads(discarded.po)['usunal_id'] == 1
+    assert Log.query.filter_by(typ='UPDATE').count() == 3
+
+
+def test_background_writer_flushes_on_shutdown(app):
+    app.config.update(AUDIT_LOG_ASYNC=True, AUDIT_LOG_BATCH_SIZE=2, AUDIT_LOG_FLUSH_INTERVAL=60)
+
+    AuditLog.record([
+        AuditLog.entry('EKSPORT', 'lodowka', 1, po={'format': 'csv'}, uzytkownik_id=1)
+        for _ in range(5)
+    ])
+    AuditLog.shutdown()
+
+    assert Log.query.filter_by(typ='EKSPORT').count() == 5
+
+
+def test_api_entries_cannot_use_model_change_types(app):
+    """
+    POST /logs/api/logs przyjmuje własne typy, ale nie INSERT/UPDATE/DELETE
+    """
+    app.config.update(AUDIT_LOG_ENABLED=True, AUDIT_LOG_ASYNC=False)
+    client = app.test_client()
+    client.set_cookie('access_token_cookie', create_access_token(identity='1'))
+
+    for typ in ('UPDATE', ' delete '):
+        response = client.post('/logs/api/logs', json={'typ': typ, 'tabela': 'produkty', 'rekord_id': 1})
+        assert response.status_code == 400
+
+    response = client.post('/logs/api/logs', json={'typ': 'EKSPORT', 'tabela': 'lodowka', 'rekord_id': 1})
+    assert response.status_code == 202
+    assert [(log.typ, log.uzytkownik_id) for log in Log.query] == [('EKSPORT', 1)]
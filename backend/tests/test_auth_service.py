@@ -0,0 +1,40 @@
+# Testy serwisu autentykacji
+# Cache użytkownika w żądaniu i cache imion w nawigacji
+
+from app.extensions import db
+from app.models import User
+from app.services.auth_service import AuthService
+
+
+def test_get_user_by_id_cached_per_request(app):
+    """
+    W jednym żądaniu ten sam użytkownik jest pobierany z bazy tylko raz
+    """
+    with app.test_request_context():
+        from flask import g
+
+        first = AuthService.get_user_by_id('1')
+        assert g._users_by_id == {1: first}
+        assert AuthService.get_user_by_id(1) is first
+
+
+def test_display_name_cache_invalidation(app):
+    """
+    Imię jest serwowane z cache do czasu unieważnienia po edycji profilu
+    """
+    user = db.session.get(User, 1)
+    user.imie = 'Jan'
+    db.session.commit()
+
+    with app.test_request_context():
+        assert AuthService.get_display_name(1) == 'Jan'
+
+    user.imie = 'Janina'
+    db.session.commit()
+
+    with app.test_request_context():
+        assert AuthService.get_display_name(1) == 'Jan'
+        AuthService.invalidate_display_name(1)
+        assert AuthService.get_display_name(1) == 'Janina'
+
+    AuthService.invalidate_display_name(1)
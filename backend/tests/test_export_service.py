@@ -0,0 +1,70 @@
+# Testy eksportu logów i historii operacji
+# Strumień fragmentów CSV / NDJSON z filtrami
+
+import csv
+import io
+import json
+from datetime import date, datetime
+
+import pytest
+
+from app.extensions import db
+from app.models import FridgeItem, Log, OperationHistory, Product
+from app.services.export_service import ExportService
+
+
+def _seed():
+    db.session.add_all([
+        Log(id=1, typ='INSERT', tabela='produkty', rekord_id=1, uzytkownik_id=1, czas=datetime(2025, 3, 1, 8)),
+        Log(id=2, typ='UPDATE', tabela='produkty', rekord_id=1, uzytkownik_id=None, czas=datetime(2025, 3, 2, 8),
+            przed='{"nazwa": "Mleko"}', po='{"nazwa": "Mleko 2%"}'),
+        Log(id=3, typ='DELETE', tabela='produkty', rekord_id=1, uzytkownik_id=1, czas=datetime(2025, 3, 5, 8)),
+        Product(id=1, nazwa='Mleko'),
+        FridgeItem(id=1, lodowka_id=1, produkt_id=1, ilosc=1, jednostka_g_ml_szt='l'),
+        FridgeItem(id=2, lodowka_id=2, nazwa_wlasna='Cudze', ilosc=1, jednostka_g_ml_szt='szt'),
+        OperationHistory(id=1, pozycja_id=1, typ='dodano', ilosc=1, jednostka_g_ml_szt='l',
+                         uzytkownik_id=1, utworzono=datetime(2025, 3, 1, 8)),
+        OperationHistory(id=2, pozycja_id=1, typ='zuzyto', ilosc=0.25, jednostka_g_ml_szt='l',
+                         uzytkownik_id=1, utworzono=datetime(2025, 3, 2, 8)),
+        OperationHistory(id=3, pozycja_id=2, typ='dodano', ilosc=1, jednostka_g_ml_szt='szt',
+                         utworzono=datetime(2025, 3, 2, 9)),
+    ])
+    db.session.commit()
+
+
+def test_logs_csv_with_filters(app):
+    _seed()
+
+    chunks = list(ExportService.export_logs(
+        'csv', date_from=date(2025, 3, 1), date_to=date(2025, 3, 4), batch_size=1
+    ))
+    rows = list(csv.reader(io.StringIO(''.join(chunks))))
+
+    # nagłówek + jeden fragment na partię
+    assert len(chunks) == 3
+    assert rows[0] == list(ExportService.LOG_COLUMNS)
+    assert [row[0] for row in rows[1:]] == ['1', '2']
+    assert rows[2][7:] == ['{"nazwa": "Mleko"}', '{"nazwa": "Mleko 2%"}']
+
+    by_user = ''.join(ExportService.export_logs('csv', uzytkownik_id=1))
+    assert [row[0] for row in csv.reader(io.StringIO(by_user))][1:] == ['1', '3']
+
+
+def test_operations_ndjson_scoped_to_fridge(app):
+    _seed()
+
+    lines = ''.join(ExportService.export_operations(1, 'ndjson')).splitlines()
+
+    assert [json.loads(line) for line in lines] == [
+        {'id': 1, 'utworzono': '2025-03-01T08:00:00', 'typ': 'dodano', 'nazwa': 'Mleko', 'ilosc': 1.0,
+         'jednostka': 'l', 'komentarz': None, 'pozycja_id': 1, 'produkt_id': 1, 'uzytkownik_id': 1},
+        {'id': 2, 'utworzono': '2025-03-02T08:00:00', 'typ': 'zuzyto', 'nazwa': 'Mleko', 'ilosc': 0.25,
+         'jednostka': 'l', 'komentarz': None, 'pozycja_id': 1, 'produkt_id': 1, 'uzytkownik_id': 1},
+    ]
+
+
+def test_invalid_parameters_fail_before_streaming(app):
+    with pytest.raises(ValueError):
+        ExportService.export_logs('xlsx')
+    with pytest.raises(ValueError):
+        ExportService.export_operations(1, 'csv', date_from=date(2025, 3, 2), date_to=date(2025, 3, 1))
@@ -0,0 +1,167 @@
+# Testy serwisu lodówki
+# Sprawdzają grupowanie pozycji na bazie SQLite w pamięci
+
+from datetime import date, timedelta
+from decimal import Decimal
+
+import pytest
+
+from app.extensions import db
+from app.models import FridgeItem, OperationHistory, Product
+from app.models.fridge_item import compute_group_key
+from app.services import fridge_service
+from app.services.fridge_service import FridgeService
+
+
+def test_grouped_items_sum_mixed_units(app):
+    """
+    Pozycje z tej samej grupy w g i kg są sumowane w miligramach
+    """
+    wazne_do = date(2030, 1, 1)
+    db.session.add_all([
+        FridgeItem(id=1, lodowka_id=1, nazwa_wlasna='Mąka', ilosc=Decimal('500'),
+                   jednostka_g_ml_szt='g', wazne_do=wazne_do),
+        FridgeItem(id=2, lodowka_id=1, nazwa_wlasna='Mąka', ilosc=Decimal('1.5'),
+                   jednostka_g_ml_szt='kg', wazne_do=wazne_do),
+        FridgeItem(id=3, lodowka_id=1, nazwa_wlasna='Jajka', ilosc=6,
+                   jednostka_g_ml_szt='szt'),
+    ])
+    db.session.commit()
+
+    groups = FridgeService.get_grouped_items(1)
+
+    assert [g['repr_id'] for g in groups] == [1, 3]
+    assert groups[0]['base_amount'] == 2000000
+    assert groups[0]['unit_type'] == 'weight'
+    assert groups[0]['liczba_pozycji'] == 2
+    assert groups[1]['unit_type'] == 'piece'
+    assert groups[1]['base_amount'] == 6000
+
+
+def test_grouped_items_expiring_filter(app):
+    """
+    Filtr expiring_until pomija pozycje bez daty ważności i z późniejszą datą
+    """
+    db.session.add_all([
+        FridgeItem(id=1, lodowka_id=1, nazwa_wlasna='Jogurt', ilosc=1,
+                   jednostka_g_ml_szt='szt', wazne_do=date(2030, 1, 1)),
+        FridgeItem(id=2, lodowka_id=1, nazwa_wlasna='Ser', ilosc=1,
+                   jednostka_g_ml_szt='szt', wazne_do=date(2030, 2, 1)),
+        FridgeItem(id=3, lodowka_id=1, nazwa_wlasna='Sól', ilosc=1,
+                   jednostka_g_ml_szt='szt'),
+    ])
+    db.session.commit()
+
+    groups = FridgeService.get_grouped_items(1, expiring_until=date(2030, 1, 15))
+
+    assert [g['nazwa_wlasna'] for g in groups] == ['Jogurt']
+
+
+def test_summary_counts_and_invalidation(app):
+    """
+    Liczniki dashboardu: grupy, pozycje wygasające jutro i przeterminowane
+    """
+    dzisiaj = date.today()
+    jutro = dzisiaj + timedelta(days=1)
+    wczoraj = dzisiaj - timedelta(days=1)
+    db.session.add_all([
+        FridgeItem(id=1, lodowka_id=1, nazwa_wlasna='Kefir', ilosc=1,
+                   jednostka_g_ml_szt='szt', wazne_do=jutro),
+        FridgeItem(id=2, lodowka_id=1, nazwa_wlasna='Kefir', ilosc=1,
+                   jednostka_g_ml_szt='szt', wazne_do=jutro),
+        FridgeItem(id=3, lodowka_id=1, nazwa_wlasna='Szynka', ilosc=100,
+                   jednostka_g_ml_szt='g', wazne_do=wczoraj),
+    ])
+    db.session.commit()
+
+    assert FridgeService.get_summary(1) == {
+        'count': 2, 'expiring_soon_count': 2, 'expired_count': 1
+    }
+
+    db.session.add(FridgeItem(id=4, lodowka_id=1, nazwa_wlasna='Masło', ilosc=1,
+                              jednostka_g_ml_szt='szt'))
+    db.session.commit()
+    assert FridgeService.get_summary(1)['count'] == 2
+
+    FridgeService.invalidate_summary(1)
+    assert FridgeService.get_summary(1)['count'] == 3
+
+    # Zmiana w innym workerze: tutaj zostaje stary wpis, ale wersja lodówki jest nowsza
+    stale = dict(fridge_service._summary_cache)
+    db.session.add(FridgeItem(id=5, lodowka_id=1, nazwa_wlasna='Ser', ilosc=1,
+                              jednostka_g_ml_szt='szt'))
+    db.session.commit()
+    FridgeService.invalidate_summary(1)
+    fridge_service._summary_cache.update(stale)
+    assert FridgeService.get_summary(1)['count'] == 4
+    FridgeService.invalidate_summary(1)
+
+
+def test_group_key_maintained_on_write(app):
+    """
+    group_key jest ustawiany przy dodaniu i przeliczany po zmianie produktu
+    """
+    item = FridgeItem(id=1, lodowka_id=1, nazwa_wlasna='Mleko', ilosc=1,
+                      jednostka_g_ml_szt='l', wazne_do=date(2030, 1, 1))
+    db.session.add(item)
+    db.session.commit()
+
+    assert item.group_key == compute_group_key(None, 'Mleko', date(2030, 1, 1))
+    assert compute_group_key(None, '', None) != compute_group_key(None, None, None)
+
+    db.session.add(Product(id=7, nazwa='Mleko 2%'))
+    item.produkt_id = 7
+    db.session.commit()
+
+    assert item.group_key == compute_group_key(7, 'Mleko', date(2030, 1, 1))
+    assert FridgeService.get_group_items(1, item.group_key) == [item]
+
+
+def test_consume_from_group_bulk(app):
+    """
+    Zużycie przechodzi po najstarszych pozycjach i zapisuje historię każdej z nich
+    """
+    wazne_do = date(2030, 1, 1)
+    db.session.add_all([
+        FridgeItem(id=1, lodowka_id=1, nazwa_wlasna='Mąka', ilosc=Decimal('500'),
+                   jednostka_g_ml_szt='g', wazne_do=wazne_do),
+        FridgeItem(id=2, lodowka_id=1, nazwa_wlasna='Mąka', ilosc=Decimal('1'),
+                   jednostka_g_ml_szt='kg', wazne_do=wazne_do),
+    ])
+    db.session.commit()
+    group_key = compute_group_key(None, 'Mąka', wazne_do)
+
+    # Suma 1.5 kg jest wyświetlana w kg
+    assert FridgeService.consume_from_group(1, group_key, 0.7, user_id=1) == 2
+    db.session.commit()
+
+    first, second = db.session.get(FridgeItem, 1), db.session.get(FridgeItem, 2)
+    assert first.usunieto is not None
+    assert second.usunieto is None
+    assert second.ilosc == Decimal('0.8')
+    assert [h.ilosc for h in OperationHistory.query.order_by(OperationHistory.pozycja_id)] == [
+        Decimal('500'), Decimal('0.2')
+    ]
+    assert [h.typ for h in OperationHistory.query.order_by(OperationHistory.pozycja_id)] == ['zuzyto', 'zuzyto']
+
+    # Pozostałe 0.8 kg jest wyświetlane w gramach
+    with pytest.raises(ValueError):
+        FridgeService.consume_from_group(1, group_key, 801, user_id=1)
+
+
+def test_discard_group(app):
+    """
+    Wyrzucenie grupy oznacza wszystkie jej pozycje jednym UPDATE
+    """
+    db.session.add_all([
+        FridgeItem(id=1, lodowka_id=1, nazwa_wlasna='Jogurt', ilosc=1, jednostka_g_ml_szt='szt'),
+        FridgeItem(id=2, lodowka_id=1, nazwa_wlasna='Jogurt', ilosc=2, jednostka_g_ml_szt='szt'),
+        FridgeItem(id=3, lodowka_id=1, nazwa_wlasna='Ser', ilosc=1, jednostka_g_ml_szt='szt'),
+    ])
+    db.session.commit()
+
+    assert FridgeService.discard(1, 1, group_key=compute_group_key(None, 'Jogurt', None)) == 2
+    db.session.commit()
+
+    assert [g['nazwa_wlasna'] for g in FridgeService.get_grouped_items(1)] == ['Ser']
+    assert OperationHistory.query.filter_by(typ='usunieto').count() == 2
@@ -0,0 +1,70 @@
+# Testy serwisu historii operacji
+# Stronicowanie kursorem i filtry na bazie SQLite w pamięci
+
+from datetime import date, datetime
+
+import pytest
+
+from app.extensions import db
+from app.models import FridgeItem, Lodowka, OperationHistory, Product, User
+from app.services.history_service import HistoryService
+
+
+def _seed():
+    db.session.add_all([
+        User(id=2, email='inny@test.pl', haslo_hash='x'),
+        Lodowka(id=2, wlasciciel_id=2),
+        Product(id=1, nazwa='Mleko'),
+        FridgeItem(id=1, lodowka_id=1, produkt_id=1, ilosc=1, jednostka_g_ml_szt='l'),
+        FridgeItem(id=2, lodowka_id=1, nazwa_wlasna='Pomidory', ilosc=3, jednostka_g_ml_szt='szt'),
+        FridgeItem(id=3, lodowka_id=2, nazwa_wlasna='Cudze', ilosc=1, jednostka_g_ml_szt='szt'),
+    ])
+    same_time = datetime(2025, 3, 2, 12, 0)
+    db.session.add_all([
+        OperationHistory(id=1, pozycja_id=1, typ='dodano', ilosc=1, jednostka_g_ml_szt='l',
+                         utworzono=datetime(2025, 3, 1, 8, 0)),
+        OperationHistory(id=2, pozycja_id=2, typ='dodano', ilosc=3, jednostka_g_ml_szt='szt', utworzono=same_time),
+        OperationHistory(id=3, pozycja_id=2, typ='zuzyto', ilosc=1, jednostka_g_ml_szt='szt', utworzono=same_time),
+        OperationHistory(id=4, pozycja_id=1, typ='zuzyto', ilosc=0.5, jednostka_g_ml_szt='l',
+                         utworzono=datetime(2025, 3, 3, 9, 0)),
+        OperationHistory(id=5, pozycja_id=3, typ='dodano', ilosc=1, jednostka_g_ml_szt='szt',
+                         utworzono=datetime(2025, 3, 4, 9, 0)),
+    ])
+    db.session.commit()
+
+
+def test_keyset_pages_cover_history_once(app):
+    """
+    Strony po 2 zwracają każdą operację raz, także przy równym utworzono
+    """
+    _seed()
+
+    seen, cursor = [], None
+    while True:
+        page = HistoryService.get_operations(1, limit=2, cursor=cursor)
+        seen += [op['id'] for op in page['operations']]
+        cursor = page['next_cursor']
+        if cursor is None:
+            break
+
+    assert seen == [4, 3, 2, 1]
+    first = HistoryService.get_operations(1, limit=1)['operations'][0]
+    assert (first['nazwa'], first['produkt_id']) == ('Mleko', 1)
+
+
+def test_filters_and_ownership(app):
+    _seed()
+
+    by_type = HistoryService.get_operations(1, typ='zuzyto')['operations']
+    assert [op['id'] for op in by_type] == [4, 3]
+    in_range = HistoryService.get_operations(1, date_from=date(2025, 3, 2), date_to=date(2025, 3, 2))
+    assert [op['id'] for op in in_range['operations']] == [3, 2]
+    by_product = HistoryService.get_operations(1, produkt_id=1)['operations']
+    assert [op['id'] for op in by_product] == [4, 1]
+
+    assert HistoryService.get_operation(1, 5) is None
+    assert HistoryService.get_operation(2, 5)['nazwa'] == 'Cudze'
+    with pytest.raises(ValueError):
+        HistoryService.get_operations(1, typ='zjedzono')
+    with pytest.raises(ValueError):
+        HistoryService.get_operations(1, cursor='nie-kursor')
@@ -0,0 +1,17 @@
+# Testy wspólnego klienta HTTP
+
+from app.extensions import http
+
+
+def test_session_is_shared_and_pooled(app):
+    """
+    Jedna sesja na aplikację, z pulą i ponawianiem z konfiguracji
+    """
+    app.config.update(HTTP_POOL_MAXSIZE=4, HTTP_RETRIES=1)
+    session = http.session
+
+    assert http.session is session
+    adapter = session.get_adapter('https://world.openfoodfacts.org')
+    assert adapter._pool_maxsize == 4
+    assert adapter.max_retries.total == 1
+    assert http.default_timeout(120) == (app.config['HTTP_CONNECT_TIMEOUT'], 120)
@@ -0,0 +1,106 @@
+# Testy kolejki zadań w tle
+
+import sqlite3
+import threading
+import time
+
+import pytest
+
+from app import create_app
+from app.config import TestingConfig
+from app.services.job_queue import JobQueue
+
+
+def _wait_done(job_id, owner_id=None):
+    for _ in range(200):
+        job = JobQueue.get(job_id, owner_id=owner_id)
+        if job['status'] in ('done', 'failed'):
+            return job
+        threading.Event().wait(0.01)
+    raise AssertionError('Zadanie nie zakończyło się')
+
+
+def test_duplicates_are_coalesced(app):
+    """
+    Drugie zgłoszenie z tym samym kluczem dostaje trwające zadanie
+    """
+    release = threading.Event()
+
+    def work(value):
+        release.wait(2)
+        return {'value': value}
+
+    first = JobQueue.submit('test', work, 1, key=('1', 'abc'), owner_id='1')
+    second = JobQueue.submit('test', work, 2, key=('1', 'abc'), owner_id='1')
+    release.set()
+
+    assert second['id'] == first['id']
+    assert _wait_done(first['id'], owner_id='1')['result'] == {'value': 1}
+    assert JobQueue.get(first['id'], owner_id='2') is None
+
+
+def test_failed_job_and_queue_limit(app):
+    """
+    Wyjątek w zadaniu ustawia status failed; przepełniona kolejka odrzuca zadanie
+    """
+    def broken():
+        raise RuntimeError('awaria')
+
+    job = JobQueue.submit('test', broken)
+    assert _wait_done(job['id'])['error'] == 'awaria'
+
+    app.config.update(JOB_QUEUE_LIMIT=0)
+    with pytest.raises(ValueError):
+        JobQueue.submit('test', broken)
+
+
+def test_acquired_slot_is_shared_with_jobs(app):
+    """
+    Miejsce zajęte poza kolejką (strumień) wstrzymuje zadania tej samej puli
+    """
+    assert JobQueue.try_acquire('test-slot')
+    assert not JobQueue.try_acquire('test-slot')
+
+    job = JobQueue.submit('test-slot', lambda: 'ok')
+    threading.Event().wait(0.05)
+    assert JobQueue.get(job['id'])['status'] == 'queued'
+
+    JobQueue.release('test-slot')
+    assert _wait_done(job['id'])['result'] == 'ok'
+
+
+def test_status_is_shared_between_workers(app):
+    """
+    Status zadania czyta też inny worker (inna aplikacja, ten sam JOB_STORE_PATH);
+    zadanie workera, który przestał odświeżać puls, jest nieudane, a trwające nie
+    """
+    app.config.update(JOB_HEARTBEAT_INTERVAL=0.02, JOB_HEARTBEAT_TIMEOUT=0.3)
+    job = JobQueue.submit('test', lambda: {'value': 1}, owner_id='1')
+    _wait_done(job['id'])
+
+    other = create_app(TestingConfig)
+    other.config.update(JOB_STORE_PATH=app.config['JOB_STORE_PATH'], JOB_HEARTBEAT_TIMEOUT=0.3)
+    with other.app_context():
+        assert JobQueue.get(job['id'], owner_id=1)['result'] == {'value': 1}
+
+    # Wiersz zadania zrestartowanego workera - puls sprzed limitu
+    conn = sqlite3.connect(app.config['JOB_STORE_PATH'])
+    with conn:
+        conn.execute(
+            "INSERT INTO zadania (id, kolejka, klucz, status, utworzono, proces, puls)"
+            " VALUES ('orphan', 'test', '\"k\"', 'running', ?, 'host:1', ?)",
+            (time.time() - 5, time.time() - 5),
+        )
+    conn.close()
+    assert JobQueue.get('orphan')['error'] == 'Zadanie przerwane'
+
+    release = threading.Event()
+    alive = JobQueue.submit('test', release.wait, 2)
+    threading.Event().wait(0.5)
+    try:
+        # Duplikat nie dołącza do osieroconego zadania, trwające ma świeży puls
+        assert JobQueue.submit('test', lambda: None, key='k')['id'] != 'orphan'
+        assert JobQueue.get(alive['id'])['status'] == 'running'
+    finally:
+        release.set()
+    assert _wait_done(alive['id'])['status'] == 'done'
@@ -0,0 +1,83 @@
+# Testy listy logów zdarzeń
+# Stronicowanie kursorem, filtry i widok bez kolumn przed/po
+
+from datetime import date, datetime
+
+import pytest
+from flask_jwt_extended import create_access_token
+
+from app.extensions import db
+from app.models import Log, User
+from app.services.log_service import LogService
+
+
+def _seed():
+    same_time = datetime(2025, 3, 2, 12, 0)
+    db.session.add_all([
+        Log(id=1, typ='INSERT', tabela='produkty', rekord_id=1, uzytkownik_id=1, czas=datetime(2025, 3, 1, 8),
+            po='{"nazwa": "Mleko"}'),
+        Log(id=2, typ='UPDATE', tabela='produkty', rekord_id=1, uzytkownik_id=1, czas=same_time,
+            przed='{"nazwa": "Mleko"}', po='{"nazwa": "Mleko 2%"}'),
+        Log(id=3, typ='INSERT', tabela='magazyn_pozycje_lodowki', rekord_id=5, lodowka_id=1, czas=same_time),
+        Log(id=4, typ='DELETE', tabela='magazyn_pozycje_lodowki', rekord_id=5, lodowka_id=1,
+            czas=datetime(2025, 3, 4, 9)),
+    ])
+    db.session.commit()
+
+
+def test_keyset_pages_cover_logs_once(app):
+    _seed()
+
+    seen, cursor = [], None
+    while True:
+        page = LogService.get_logs(limit=2, cursor=cursor)
+        seen.extend(log['id'] for log in page['logs'])
+        cursor = page['next_cursor']
+        if not cursor:
+            break
+
+    assert seen == [4, 3, 2, 1]
+    assert 'przed' not in LogService.get_logs()['logs'][0]
+
+
+def test_filters_and_details(app):
+    _seed()
+
+    by_record = LogService.get_logs(tabela='produkty', rekord_id=1, details=True)['logs']
+    assert [log['id'] for log in by_record] == [2, 1]
+    assert by_record[0]['przed'] == {'nazwa': 'Mleko'}
+
+    assert [log['id'] for log in LogService.get_logs(lodowka_id=1, typ='INSERT')['logs']] == [3]
+    assert [log['id'] for log in LogService.get_logs(
+        uzytkownik_id=1, date_from=date(2025, 3, 2), date_to=date(2025, 3, 3)
+    )['logs']] == [2]
+    assert LogService.get_log(2)['po'] == {'nazwa': 'Mleko 2%'}
+
+    with pytest.raises(ValueError):
+        LogService.get_logs(rekord_id=1)
+
+
+def test_log_routes_require_admin_role(app):
+    """
+    Strona i API logów tylko dla rola == 'admin' - zwykły użytkownik dostaje 403 / przekierowanie
+    """
+    _seed()
+    db.session.add(User(id=2, email='admin@test.pl', haslo_hash='x', rola='admin'))
+    db.session.commit()
+
+    def client(user_id):
+        client = app.test_client()
+        client.set_cookie('access_token_cookie', create_access_token(identity=str(user_id)))
+        return client
+
+    user, admin = client(1), client(2)
+    api_urls = ('/logs/api/logs', '/logs/api/logs/2', '/logs/api/logs/export?format=ndjson')
+
+    page = user.get('/logs/')
+    assert page.status_code == 302 and page.headers['Location'] == '/account'
+    assert [user.get(url).status_code for url in api_urls] == [403, 403, 403]
+
+    assert admin.get('/logs/').status_code == 200
+    assert [admin.get(url).status_code for url in api_urls] == [200, 200, 200]
+    assert admin.get('/logs/api/logs/2').get_json()['log']['po'] == {'nazwa': 'Mleko 2%'}
+    assert len(admin.get('/logs/api/logs/export?format=ndjson').get_data(as_text=True).splitlines()) == 4
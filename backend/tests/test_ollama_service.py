@@ -0,0 +1,72 @@
+# Testy monitora dostępności Ollama
+# Sprawdzenie /api/tags jest podmienione, bez prawdziwych połączeń
+
+from types import SimpleNamespace
+
+import requests
+
+from app.routes import ai
+from app.services.ollama_service import OllamaService
+
+
+def test_circuit_opens_after_failures(app, monkeypatch):
+    """
+    Po progu błędów Ollama jest pomijana bez kolejnych sprawdzeń
+    """
+    app.config.update(OLLAMA_FAILURE_THRESHOLD=2, OLLAMA_COOLDOWN=60, OLLAMA_HEALTH_TTL=0)
+    probes = []
+    monkeypatch.setattr(OllamaService, '_probe', staticmethod(lambda settings: probes.append(1) or False))
+    OllamaService.reset()
+
+    # Pierwsze sprawdzenie jest synchroniczne
+    assert OllamaService.is_available() is False
+    assert probes == [1]
+
+    OllamaService.record_failure()
+    assert OllamaService.get_status()['circuit_open'] is True
+
+    # Otwarty wyłącznik - żadnego połączenia
+    assert OllamaService.is_available() is False
+    assert probes == [1]
+
+    OllamaService.record_success()
+    assert OllamaService.get_status() == {'available': True, 'failures': 0, 'circuit_open': False}
+    OllamaService.reset()
+
+
+def test_cached_state_within_ttl(app, monkeypatch):
+    """
+    W czasie TTL zwracany jest zapamiętany wynik
+    """
+    app.config.update(OLLAMA_HEALTH_TTL=300)
+    probes = []
+    monkeypatch.setattr(OllamaService, '_probe', staticmethod(lambda settings: probes.append(1) or True))
+    OllamaService.reset()
+
+    assert OllamaService.is_available() is True
+    assert OllamaService.is_available() is True
+    assert probes == [1]
+    OllamaService.reset()
+
+
+def test_http_errors_of_model_call_open_circuit(app, monkeypatch):
+    """
+    404 (model niepobrany) i 5xx z /api/generate liczą się jako awaria, 400 nie
+    """
+    app.config.update(OLLAMA_FAILURE_THRESHOLD=2, OLLAMA_COOLDOWN=60)
+    OllamaService.reset()
+    statuses = [400, 404, 500]
+
+    def post(url, **kwargs):
+        response = requests.Response()
+        response.status_code = statuses.pop(0)
+        return response
+
+    monkeypatch.setattr(ai, 'http', SimpleNamespace(post=post))
+
+    assert ai.call_ollama_api('prompt')['success'] is False
+    assert OllamaService.get_status()['failures'] == 0
+    ai.call_ollama_api('prompt')
+    ai.call_ollama_api('prompt')
+    assert OllamaService.get_status()['circuit_open'] is True
+    OllamaService.reset()
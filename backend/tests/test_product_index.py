@@ -0,0 +1,62 @@
+# Testy lokalnego indeksu wyszukiwania produktów
+
+from datetime import datetime
+
+from app.extensions import db
+from app.models import Product
+from app.services.product_index import ProductSearchIndex, normalize_text
+from app.services.product_service import ProductService
+
+
+def test_normalize_text():
+    assert normalize_text('Mleko ŁACIATE 3,2%') == 'mleko laciate 3.2%'
+    assert normalize_text('  Żółty   ser ') == 'zolty ser'
+    assert normalize_text(None) == ''
+
+
+def test_prefix_search_follows_commits(app):
+    """
+    Wyszukiwanie po początku słowa bez polskich znaków; indeks widzi commit, nie rollback
+    """
+    ProductSearchIndex.reset()
+    db.session.add_all([
+        Product(id=1, nazwa='Mleko 3,2%', marka='Łaciate', barcode_13cyf='111'),
+        Product(id=2, nazwa='Masło ekstra', barcode_13cyf='222'),
+    ])
+    db.session.commit()
+
+    assert ProductSearchIndex.search('lacia') == [1]
+    assert ProductSearchIndex.search('masl') == [2]
+
+    db.session.add(Product(id=3, nazwa='Mleko owsiane'))
+    db.session.commit()
+    db.session.add(Product(id=4, nazwa='Mleko kozie'))
+    db.session.rollback()
+    assert sorted(ProductSearchIndex.search('mlek')) == [1, 3]
+
+    db.session.get(Product, 3).usunieto = datetime.utcnow()
+    db.session.commit()
+    assert ProductSearchIndex.search('owsia') == []
+
+
+def test_search_products_falls_back_to_openfoodfacts(app, monkeypatch):
+    """
+    Lokalne trafienia z kodem kreskowym nie pytają OpenFoodFacts
+    """
+    ProductSearchIndex.reset()
+    db.session.add_all([
+        Product(id=1, nazwa='Jogurt naturalny', barcode_13cyf='111'),
+        Product(id=2, nazwa='Jogurt domowy'),
+    ])
+    db.session.commit()
+    remote = []
+    monkeypatch.setattr(ProductService, 'search_openfoodfacts', staticmethod(
+        lambda term, page_size=5: remote.append(term) or {'success': True, 'products': [], 'count': 0}
+    ))
+
+    local = ProductService.search_products('jogu')
+    assert (local['source'], [p['barcode'] for p in local['products']]) == ('local', ['111'])
+    assert remote == []
+
+    assert ProductService.search_products('kefir')['source'] == 'openfoodfacts'
+    assert remote == ['kefir']
@@ -0,0 +1,243 @@
+# Testy serwisu produktów
+# Operacje na słowniku produktów bez połączeń z OpenFoodFacts
+
+import threading
+from datetime import datetime, timedelta
+
+from flask_jwt_extended import create_access_token
+from sqlalchemy import event, inspect
+
+from app.extensions import db
+from app.models import CacheApi, Product, User, WartosciOdzywcze, ZrodloApi
+from app.models.product import normalize_name
+from app.services.openfoodfacts_payload import decompress
+from app.services.product_index import ProductSearchIndex
+from app.services.product_service import ProductService
+
+
+def test_resolve_products_batches_nutrition(app):
+    """
+    Produkty i wartości odżywcze są zwracane dla unikalnych ID, None jest pomijane
+    """
+    db.session.add_all([
+        Product(id=1, nazwa='Mleko 3,2%', marka='Łaciate'),
+        Product(id=2, nazwa='Masło'),
+        WartosciOdzywcze(id=1, produkt_id=1, na_100g_kcal=60),
+    ])
+    db.session.commit()
+
+    resolved = ProductService.resolve_products([1, 2, 1, None, 99], with_nutrition=True)
+
+    assert set(resolved) == {1, 2}
+    product, wartosci = resolved[1]
+    assert product.nazwa == 'Mleko 3,2%'
+    assert float(wartosci.na_100g_kcal) == 60
+    assert resolved[2][1] is None
+    assert ProductService.resolve_products([]) == {}
+
+
+def test_nutrition_payload_is_deferred(app):
+    """
+    JSON z API nie jest ładowany w listach, tylko na żądanie (with_payload)
+    """
+    db.session.add_all([
+        Product(id=1, nazwa='Mleko'),
+        WartosciOdzywcze(id=1, produkt_id=1, na_100g_kcal=60, odp_api={'status': 1}),
+    ])
+    db.session.commit()
+    db.session.expunge_all()
+
+    _, wartosci = ProductService.resolve_products([1], with_nutrition=True)[1]
+    assert {'odp_api', 'api'} <= inspect(wartosci).unloaded
+    db.session.expunge_all()
+
+    _, wartosci = ProductService.resolve_products([1], with_nutrition=True, with_payload=True)[1]
+    assert 'odp_api' not in inspect(wartosci).unloaded
+    assert wartosci.odp_api == {'status': 1}
+    db.session.expunge_all()
+
+    assert ProductService.get_all_products()[0]['wartosci_odzywcze']['kcal'] == 60
+
+
+def test_enrich_batch_upserts_missing_and_stale(app, monkeypatch):
+    """
+    Uzupełniane są produkty bez wartości i z nieaktualnymi, jednym upsertem
+    """
+    db.session.add_all([
+        Product(id=1, nazwa='Mleko', barcode_13cyf='111'),
+        Product(id=2, nazwa='Masło', barcode_13cyf='222'),
+        Product(id=3, nazwa='Ser', barcode_13cyf='333'),
+        Product(id=4, nazwa='Chleb'),
+        WartosciOdzywcze(id=1, produkt_id=2, na_100g_kcal=700, pobrano=datetime(2020, 1, 1)),
+    ])
+    db.session.commit()
+
+    responses = {
+        '111': {'status': 1, 'product': {'nutriments': {'energy-kcal_100g': 60}}},
+        '222': {'status': 1, 'product': {'nutriments': {'energy-kcal_100g': 740}}},
+        '333': {'status': 0},
+    }
+    monkeypatch.setattr(ProductService, 'fetch_openfoodfacts', staticmethod(
+        lambda barcode, rate_limiter=None: {'data': responses[barcode], 'cache_id': None}
+    ))
+
+    result = ProductService.enrich_batch(stale_before=datetime.utcnow() - timedelta(days=30), workers=1)
+
+    assert (result['checked'], result['enriched'], result['not_found']) == (3, 2, 1)
+    db.session.expire_all()
+    kcal = {w.produkt_id: float(w.na_100g_kcal) for w in WartosciOdzywcze.query}
+    assert kcal == {1: 60, 2: 740}
+    assert ProductService.find_products_to_enrich() == [(3, '333')]
+
+
+def test_enrich_batch_job_is_shared_by_admins(app, monkeypatch):
+    """
+    Drugi administrator dołączony do trwającego zadania widzi jego status
+    """
+    db.session.add_all([
+        User(id=2, email='admin1@test.pl', haslo_hash='x', rola='admin'),
+        User(id=3, email='admin2@test.pl', haslo_hash='x', rola='admin'),
+    ])
+    db.session.commit()
+    release = threading.Event()
+
+    def enrich_batch(stale_before=None, limit=None, workers=None):
+        release.wait(5)
+        return {'success': True}
+
+    monkeypatch.setattr(ProductService, 'enrich_batch', staticmethod(enrich_batch))
+
+    def client(user_id):
+        client = app.test_client()
+        client.set_cookie('access_token_cookie', create_access_token(identity=str(user_id)))
+        return client
+
+    first = client(2).post('/products/api/enrich-batch', json={}).get_json()
+    second = client(3).post('/products/api/enrich-batch', json={}).get_json()
+    try:
+        assert second['job_id'] == first['job_id']
+        assert client(3).get(second['status_url']).status_code == 200
+        assert client(1).get(second['status_url']).status_code == 403
+    finally:
+        release.set()
+
+
+def test_background_enrichment_sets_status(app, monkeypatch):
+    """
+    Wiersz oczekujący dostaje status ok z danymi albo failed, gdy produktu nie ma w API
+    """
+    db.session.add_all([
+        Product(id=1, nazwa='Mleko', barcode_13cyf='111'),
+        Product(id=2, nazwa='Ser', barcode_13cyf='333'),
+    ])
+    ProductService.mark_enrichment_pending(1)
+    ProductService.mark_enrichment_pending(2)
+    db.session.commit()
+    assert {w.status for w in WartosciOdzywcze.query} == {WartosciOdzywcze.STATUS_PENDING}
+
+    responses = {
+        '111': {'status': 1, 'product': {'product_name': 'Mleko 2%', 'nutriments': {'energy-kcal_100g': 50}}},
+        '333': {'status': 0},
+    }
+    monkeypatch.setattr(ProductService, 'fetch_openfoodfacts', staticmethod(
+        lambda barcode, rate_limiter=None: {'data': responses[barcode], 'cache_id': None}
+    ))
+
+    ProductService._run_enrichment(1, '111', True)
+    ProductService._run_enrichment(2, '333', False)
+
+    db.session.expire_all()
+    status = {w.produkt_id: w.status for w in WartosciOdzywcze.query}
+    assert status == {1: WartosciOdzywcze.STATUS_OK, 2: WartosciOdzywcze.STATUS_FAILED}
+    assert db.session.get(Product, 1).nazwa == 'Mleko 2%'
+
+
+def test_compact_api_payloads_moves_raw_to_cache(app):
+    """
+    Stare wiersze dostają projekcję, a pełna odpowiedź trafia do cache_api
+    """
+    raw = {'status': 1, 'product': {'product_name': 'Mleko', 'ingredients': [{'id': 'en:milk'}],
+                                    'nutriments': {'fat_100g': 3.2}}}
+    db.session.add_all([
+        ZrodloApi(id=ZrodloApi.OPENFOODFACTS_ID, nazwa='OpenFoodFacts'),
+        Product(id=1, nazwa='Mleko', barcode_13cyf='111'),
+        WartosciOdzywcze(id=1, produkt_id=1, odp_api=raw, api=raw['product'], pobrano=datetime(2024, 1, 1)),
+    ])
+    db.session.commit()
+
+    result = ProductService.compact_api_payloads(batch_size=1)
+    assert (result['cache_rows'], result['nutrition_rows']) == (0, 1)
+
+    wartosci = WartosciOdzywcze.query.one()
+    cache_row = db.session.get(CacheApi, wartosci.cache_id)
+    assert wartosci.api is None
+    assert wartosci.odp_api == {'status': 1, 'product': {'product_name': 'Mleko', 'nutriments': {'fat_100g': 3.2}}}
+    assert decompress(cache_row.odpowiedz_surowa) == raw
+    assert cache_row.barcode == '111'
+    assert ProductService.compact_api_payloads()['nutrition_rows'] == 0
+
+
+def test_normalize_name():
+    assert normalize_name('Mleko 3,2%') == normalize_name('mleko  3.20 %') == 'mleko 3.2%'
+    assert normalize_name('Masło ekstra 200 g') == 'maslo ekstra 200g'
+    assert normalize_name('Jogurt 1,0 kg') == 'jogurt 1kg'
+
+
+def test_match_product_by_normalised_and_similar_name(app):
+    """
+    Kod kreskowy, nazwa po normalizacji, potem podobieństwo trigramów
+    """
+    ProductSearchIndex.reset()
+    db.session.add_all([
+        Product(id=1, nazwa='Mleko 3,2%', barcode_13cyf='111'),
+        Product(id=2, nazwa='Jogurt naturalny'),
+        Product(id=3, nazwa='Sok jabłkowy 100%'),
+        Product(id=4, nazwa='Pomidory'),
+    ])
+    db.session.commit()
+
+    assert ProductService.match_product('cokolwiek', '111') == (db.session.get(Product, 1), 'barcode')
+    assert ProductService.match_product('mleko 3.2 %')[1] == 'name'
+    product, matched_by = ProductService.match_product('jogurt naturalne')
+    assert (product.id, matched_by) == (2, 'fuzzy')
+    assert ProductService.match_product('mleko 2%') == (None, None)
+
+    # Inne produkty o podobnych nazwach nie są dopasowaniem
+    for nazwa in ('Jogurt naturalny grecki', 'Sok jabłkowy', 'Pomidor'):
+        assert ProductService.match_product(nazwa) == (None, None), nazwa
+
+
+def test_backfill_name_keys(app):
+    db.session.add(Product(id=1, nazwa='Żółty ser'))
+    db.session.commit()
+    db.session.execute(db.update(Product).values(nazwa_norm=None))
+    db.session.commit()
+
+    assert ProductService.backfill_name_keys(batch_size=1)['updated'] == 1
+    db.session.expire_all()
+    assert db.session.get(Product, 1).nazwa_norm == 'zolty ser'
+    assert ProductService.backfill_name_keys()['updated'] == 0
+
+
+def test_create_product_marks_failed_when_queue_is_full(app, monkeypatch):
+    """
+    Pełna kolejka nie zostawia wartości odżywczych w stanie 'pending'
+    """
+    def full_queue(product_id, barcode, update_product=False):
+        raise ValueError('Zbyt wiele oczekujących zadań, spróbuj ponownie za chwilę')
+
+    def assign_id(mapper, connection, target):
+        # BIGINT bez AUTO_INCREMENT w SQLite - ID jak z MySQL
+        target.id = target.id or 1
+
+    monkeypatch.setattr(ProductService, 'schedule_enrichment', staticmethod(full_queue))
+    event.listen(Product, 'before_insert', assign_id)
+    try:
+        result = ProductService.create_product({'nazwa': 'Mleko', 'barcode_13cyf': '111'})
+    finally:
+        event.remove(Product, 'before_insert', assign_id)
+
+    assert result['success']
+    db.session.expire_all()
+    assert WartosciOdzywcze.query.one().status == WartosciOdzywcze.STATUS_FAILED
+    assert ProductService.find_products_to_enrich() == [(result['product_id'], '111')]
@@ -0,0 +1,42 @@
+# Testy całkowitych ilości bazowych
+# Sprawdzają dokładność przeliczeń bez bazy danych
+
+from decimal import Decimal
+
+from app.services.quantity import (
+    Quantity, format_amount_display, from_base_unit, normalize_to_base_unit,
+    round_up_to_step, to_base_amounts,
+)
+
+
+def test_normalize_is_exact_for_float_input():
+    """
+    0.1 + 0.2 kg nie daje błędu zaokrąglenia floata
+    """
+    total = Quantity.from_unit(0.1, 'kg') + Quantity.from_unit(0.2, 'kg')
+
+    assert total == Quantity.from_unit('0.3', 'kg')
+    assert total.base == 300000
+    assert normalize_to_base_unit(Decimal('1.5'), 'l') == (1500000, 'volume')
+
+
+def test_to_base_amounts_mixed_units():
+    """
+    Przeliczenie listy ilości z kolumn Numeric(10,3) na liczby całkowite
+    """
+    bases = to_base_amounts([Decimal('500.000'), Decimal('1.250'), Decimal('0.500')], ['g', 'kg', 'szt'])
+
+    assert bases == [500000, 1250000, 500]
+    assert all(isinstance(b, int) for b in bases)
+
+
+def test_reverse_conversion_and_display():
+    """
+    Powrót do jednostki pozycji ma 3 miejsca po przecinku, wyświetlanie wybiera jednostkę
+    """
+    assert from_base_unit(round_up_to_step(700001, 'kg'), 'kg') == Decimal('0.701')
+    assert from_base_unit(1500, 'szt') == Decimal('1.500')
+    assert format_amount_display(1500000, 'weight') == (1.5, 'kg')
+    assert format_amount_display(800000, 'volume') == (800.0, 'ml')
+    assert format_amount_display(6000, 'piece') == (6, 'szt')
+    assert format_amount_display(1500, 'piece') == (1.5, 'szt')
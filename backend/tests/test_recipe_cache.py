@@ -0,0 +1,38 @@
+# Testy cache przepisów AI
+# Plik SQLite w katalogu tymczasowym testu
+
+from app.services.recipe_cache import RecipeCache
+
+
+def _items(*names):
+    return [{'nazwa': name} for name in names]
+
+
+def test_key_ignores_order_and_message_formatting(app):
+    """
+    Kolejność produktów i wielkość liter/spacje w wiadomości nie zmieniają klucza
+    """
+    key = RecipeCache.make_key(_items('Mleko', 'Jajka'), '  Coś  NA obiad ', 'model', 1)
+
+    assert key == RecipeCache.make_key(_items('Jajka', 'Mleko'), 'coś na obiad', 'model', 1)
+    assert key != RecipeCache.make_key(_items('Jajka', 'Mleko'), 'coś na obiad', 'model', 2)
+    assert key != RecipeCache.make_key(_items('Jajka'), 'coś na obiad', 'model', 1)
+
+
+def test_put_get_and_eviction(app, tmp_path):
+    """
+    Zapisane przepisy wracają z cache, nadmiarowe wpisy są usuwane
+    """
+    app.config.update(RECIPE_CACHE_PATH=str(tmp_path / 'cache.sqlite3'), RECIPE_CACHE_MAX_ENTRIES=2)
+    recipes = [{'title': 'Omlet', 'steps': ['Krok 1']}]
+
+    assert RecipeCache.get('a') is None
+    RecipeCache.put('a', recipes)
+    assert RecipeCache.get('a') == recipes
+
+    RecipeCache.put('b', recipes)
+    RecipeCache.put('c', recipes)
+    assert [RecipeCache.get(k) is not None for k in 'abc'].count(True) == 2
+
+    app.config.update(RECIPE_CACHE_TTL=0)
+    assert RecipeCache.get('c') is None
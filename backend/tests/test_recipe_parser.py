@@ -0,0 +1,24 @@
+# Testy przyrostowego parsera przepisów
+
+from app.services.recipe_parser import RecipeStreamParser, parse_recipes
+
+
+def test_recipes_emitted_as_soon_as_complete():
+    """
+    Przepis jest zwracany w fragmencie, który domyka jego obiekt
+    """
+    parser = RecipeStreamParser()
+    fragments = ['{"recipes": [{"title": "Om', 'let {z} \\"serem\\"", "steps": ["a"]}', ', {"title": "Zupa"', '}]}']
+
+    emitted = [parser.feed(fragment) for fragment in fragments]
+
+    assert emitted == [[], [{'title': 'Omlet {z} "serem"', 'steps': ['a']}], [], [{'title': 'Zupa'}]]
+
+
+def test_parse_truncated_or_wrapped_response():
+    """
+    Tekst wokół JSON i ucięty ostatni przepis nie psują pozostałych
+    """
+    text = 'Oto przepisy:\n[{"title": "A", "ingredients": [{"name": "x"}]}, {"title": "B", "ste'
+
+    assert parse_recipes(text) == [{'title': 'A', 'ingredients': [{'name': 'x'}]}]
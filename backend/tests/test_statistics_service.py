@@ -0,0 +1,78 @@
+# Testy dziennych statystyk operacji
+# Sumy utrzymywane przy zapisie historii i odtwarzane komendą rebuild
+
+from datetime import date, datetime
+from decimal import Decimal
+
+from app.extensions import db
+from app.models import FridgeItem, OperationHistory, Product, StatystykiDzienne
+from app.services.fridge_service import FridgeService
+from app.services.statistics_service import StatisticsService
+
+
+def _history(pozycja_id, typ, ilosc, jednostka, utworzono):
+    return {
+        'pozycja_id': pozycja_id,
+        'typ': typ,
+        'ilosc': ilosc,
+        'jednostka_g_ml_szt': jednostka,
+        'uzytkownik_id': 1,
+        'utworzono': utworzono,
+    }
+
+
+def _seed():
+    db.session.add_all([
+        Product(id=1, nazwa='Mleko'),
+        FridgeItem(id=1, lodowka_id=1, produkt_id=1, ilosc=1, jednostka_g_ml_szt='l'),
+        FridgeItem(id=2, lodowka_id=1, produkt_id=1, ilosc=500, jednostka_g_ml_szt='ml'),
+        FridgeItem(id=3, lodowka_id=1, nazwa_wlasna='Pomidory', ilosc=3, jednostka_g_ml_szt='szt'),
+    ])
+    db.session.flush()
+    FridgeService.record_history([
+        _history(1, 'dodano', Decimal('1'), 'l', datetime(2025, 3, 1, 8)),
+        _history(2, 'dodano', Decimal('500'), 'ml', datetime(2025, 3, 1, 9)),
+        _history(3, 'dodano', Decimal('3'), 'szt', datetime(2025, 3, 2, 9)),
+    ])
+    FridgeService.record_history([
+        _history(3, 'usunieto', Decimal('2'), 'szt', datetime(2025, 3, 3, 9)),
+        _history(1, 'usunieto', Decimal('0.25'), 'l', datetime(2025, 3, 3, 10)),
+        _history(2, 'usunieto', Decimal('100'), 'ml', datetime(2025, 3, 3, 11)),
+    ])
+    db.session.commit()
+
+
+def test_rollups_follow_history_writes(app):
+    """
+    Zapis historii dolicza sumy; statystyki i licznik konta czytają rollupy
+    """
+    _seed()
+
+    milk = StatystykiDzienne.query.filter_by(grupa='p:1', typ='dodano').one()
+    assert (milk.dzien, milk.liczba_operacji, milk.ilosc_bazowa) == (date(2025, 3, 1), 2, 1500000)
+    assert StatisticsService.count_operations(1) == 6
+
+    stats = StatisticsService.get_statistics(1, days=7, today=date(2025, 3, 5))
+    assert stats['totals'] == {'dodano': 3, 'usunieto': 3}
+    assert [p['nazwa'] for p in stats['most_added']] == ['Mleko', 'Pomidory']
+    assert stats['most_wasted'][0] == {
+        'produkt_id': 1, 'nazwa': 'Mleko', 'liczba_operacji': 2, 'ilosc': 350.0, 'jednostka': 'ml'
+    }
+    assert stats['daily'][-1] == {'dzien': '2025-03-03', 'usunieto': 3}
+
+
+def test_rebuild_matches_incremental(app):
+    _seed()
+    incremental = sorted(
+        (r.dzien, r.grupa, r.typ, r.liczba_operacji, r.ilosc_bazowa) for r in StatystykiDzienne.query
+    )
+
+    db.session.query(StatystykiDzienne).delete()
+    db.session.commit()
+    result = StatisticsService.rebuild(batch_size=2)
+
+    assert (result['operations'], result['rows']) == (6, len(incremental))
+    assert sorted(
+        (r.dzien, r.grupa, r.typ, r.liczba_operacji, r.ilosc_bazowa) for r in StatystykiDzienne.query
+    ) == incremental
+    assert OperationHistory.query.count() == 6
@@ -0,0 +1,75 @@
+# Testy raportu marnowania żywności
+# Wskaźnik marnowania, czas przechowywania i masa/kcal wyrzucone w miesiącach
+
+from datetime import date, datetime
+from decimal import Decimal
+
+from app.extensions import db
+from app.models import FridgeItem, OperationHistory, Product, WartosciOdzywcze
+from app.services.waste_analytics import WasteAnalytics
+
+
+def _operation(pozycja_id, typ, ilosc, jednostka, utworzono):
+    return OperationHistory(
+        pozycja_id=pozycja_id, typ=typ, ilosc=Decimal(ilosc), jednostka_g_ml_szt=jednostka,
+        uzytkownik_id=1, utworzono=utworzono,
+    )
+
+
+def _seed():
+    db.session.add_all([
+        Product(id=1, nazwa='Jogurt', gramow_na_szt=Decimal('150')),
+        WartosciOdzywcze(produkt_id=1, na_100g_kcal=Decimal('60')),
+        Product(id=2, nazwa='Chleb'),
+        FridgeItem(id=1, lodowka_id=1, produkt_id=1, ilosc=4, jednostka_g_ml_szt='szt',
+                   utworzono=datetime(2025, 3, 1)),
+        FridgeItem(id=2, lodowka_id=1, produkt_id=2, ilosc=500, jednostka_g_ml_szt='g',
+                   utworzono=datetime(2025, 3, 1)),
+        FridgeItem(id=3, lodowka_id=2, nazwa_wlasna='Zupa', ilosc=1, jednostka_g_ml_szt='l',
+                   utworzono=datetime(2025, 4, 1)),
+    ])
+    db.session.flush()
+    db.session.add_all([
+        _operation(1, 'dodano', '4', 'szt', datetime(2025, 3, 1)),
+        _operation(1, 'zuzyto', '1', 'szt', datetime(2025, 3, 3)),
+        _operation(1, 'zuzyto', '1', 'szt', datetime(2025, 3, 5)),
+        _operation(1, 'usunieto', '2', 'szt', datetime(2025, 3, 11)),
+        _operation(2, 'dodano', '500', 'g', datetime(2025, 3, 1)),
+        _operation(2, 'zuzyto', '500', 'g', datetime(2025, 3, 2)),
+        _operation(3, 'dodano', '1', 'l', datetime(2025, 4, 1)),
+        _operation(3, 'usunieto', '0.5', 'l', datetime(2025, 4, 8)),
+    ])
+    db.session.commit()
+
+
+def test_household_report(app):
+    _seed()
+
+    report = WasteAnalytics.household_report(1, batch_size=3)
+
+    assert report['produkty'][0] == {
+        'produkt_id': 1, 'nazwa': 'Jogurt', 'jednostka': 'szt', 'dodano': 4.0, 'wyrzucono': 2.0,
+        'wskaznik_marnowania': 0.5,
+        'sredni_czas_do_zuzycia_dni': 3.0,
+        'sredni_czas_do_wyrzucenia_dni': 10.0,
+    }
+    assert report['produkty'][1]['wskaznik_marnowania'] == 0
+    # 2 szt x 150 g, 60 kcal/100 g
+    assert report['miesiace'] == [{
+        'miesiac': '2025-03', 'wyrzucono_operacji': 1, 'masa_g': 300.0, 'kcal': 180.0,
+        'bez_masy_operacji': 0,
+    }]
+
+    since = WasteAnalytics.household_report(1, since=date(2025, 3, 4))
+    assert since['produkty'][0]['dodano'] == 0.0
+
+
+def test_all_households_splits_stream(app):
+    _seed()
+
+    reports = dict(WasteAnalytics.all_households(batch_size=5))
+
+    assert sorted(reports) == [1, 2]
+    assert reports[1] == WasteAnalytics.household_report(1)
+    assert reports[2]['produkty'][0]['nazwa'] == 'Zupa'
+    assert reports[2]['miesiace'][0]['masa_g'] == 500.0
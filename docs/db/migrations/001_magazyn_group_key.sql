@@ -0,0 +1,25 @@
+-- Migracja 001: klucz grupy pozycji w lodówce
+--
+-- Dodaje kolumnę `group_key` = SHA1(produkt_id, nazwa_wlasna, wazne_do)
+-- oraz indeks złożony (lodowka_id, usunieto, group_key), dzięki któremu
+-- wyszukiwanie pozycji z grupy i liczenie grup to skan zakresu indeksu.
+-- Aplikacja utrzymuje kolumnę sama (FridgeItem, zdarzenia before_insert/before_update).
+-- Wyrażenie musi być zgodne z app.models.fridge_item.compute_group_key.
+
+START TRANSACTION;
+
+ALTER TABLE `magazyn_pozycje_lodowki`
+  ADD COLUMN `group_key` char(40) DEFAULT NULL AFTER `wazne_do`;
+
+UPDATE `magazyn_pozycje_lodowki`
+  SET `group_key` = SHA1(CONCAT(
+    COALESCE(`produkt_id`, ''), '|',
+    COALESCE(CONCAT('n:', `nazwa_wlasna`), ''), '|',
+    COALESCE(`wazne_do`, '')
+  ));
+
+ALTER TABLE `magazyn_pozycje_lodowki`
+  MODIFY `group_key` char(40) NOT NULL,
+  ADD KEY `magazyn_pozycje_lodowki_index_14` (`lodowka_id`, `usunieto`, `group_key`);
+
+COMMIT;
@@ -0,0 +1,13 @@
+-- Migracja 002: status pobierania wartości odżywczych
+--
+-- Uzupełnianie z OpenFoodFacts po utworzeniu produktu lub przypisaniu kodu
+-- kreskowego działa w tle. Wiersz `wartosci_odzywcze` powstaje od razu ze
+-- statusem 'pending', a zadanie ustawia 'ok' albo 'failed'.
+-- Istniejące wiersze mają już pobrane dane, więc dostają 'ok'.
+
+START TRANSACTION;
+
+ALTER TABLE `wartosci_odzywcze`
+  ADD COLUMN `status` varchar(16) NOT NULL DEFAULT 'ok' AFTER `zrodlo_id`;
+
+COMMIT;
@@ -0,0 +1,14 @@
+-- Migracja 003: skompresowana surowa odpowiedź API
+--
+-- `cache_api.odpowiedz` i `wartosci_odzywcze.odp_api` przechowują odtąd tylko
+-- pola czytane przez aplikację (app.services.openfoodfacts_payload), a pełna
+-- odpowiedź OpenFoodFacts trafia skompresowana (zlib) do `odpowiedz_surowa`.
+-- `wartosci_odzywcze.api` (zdublowany obiekt product) nie jest już wypełniana.
+-- Istniejące wiersze przepisuje komenda: flask --app run compact-api-payloads
+
+START TRANSACTION;
+
+ALTER TABLE `cache_api`
+  ADD COLUMN `odpowiedz_surowa` mediumblob DEFAULT NULL AFTER `odpowiedz`;
+
+COMMIT;
@@ -0,0 +1,16 @@
+-- Migracja 004: znormalizowana nazwa produktu
+--
+-- Dodaje kolumnę `nazwa_norm` z indeksem - klucz porównawczy nazwy (małe
+-- litery, bez polskich znaków i interpunkcji, liczby i jednostki w jednej
+-- postaci), po którym dodawanie do lodówki dopasowuje wpisaną nazwę do słownika.
+-- Aplikacja utrzymuje kolumnę sama (Product, zdarzenia before_insert/before_update),
+-- a istniejące wiersze uzupełnia komenda: flask --app run normalize-product-names
+-- Wyrażenie jest w app.models.product.normalize_name (nie ma odpowiednika w SQL).
+
+START TRANSACTION;
+
+ALTER TABLE `produkty`
+  ADD COLUMN `nazwa_norm` varchar(190) DEFAULT NULL AFTER `nazwa`,
+  ADD KEY `produkty_index_nazwa_norm` (`nazwa_norm`);
+
+COMMIT;
@@ -0,0 +1,27 @@
+-- Migracja 005: dzienne statystyki operacji
+--
+-- Sumy historii operacji na dzień, lodówkę, produkt (`grupa` = 'p:<produkt_id>'
+-- albo 'n:<znormalizowana nazwa_wlasna>'), typ operacji i rodzaj jednostki.
+-- Ilości w jednostkach bazowych: mg / µl / tysięczne sztuki.
+-- Aplikacja dolicza każdy zapis historii (FridgeService.record_history),
+-- a stan początkowy liczy komenda: flask --app run rebuild-statistics
+
+START TRANSACTION;
+
+CREATE TABLE `statystyki_operacji_dzienne` (
+  `id` bigint(20) NOT NULL AUTO_INCREMENT,
+  `lodowka_id` bigint(20) NOT NULL,
+  `dzien` date NOT NULL,
+  `grupa` varchar(200) NOT NULL,
+  `produkt_id` bigint(20) DEFAULT NULL,
+  `nazwa` varchar(190) DEFAULT NULL,
+  `typ` varchar(16) NOT NULL,
+  `rodzaj` varchar(8) NOT NULL,
+  `liczba_operacji` int(11) NOT NULL DEFAULT 0,
+  `ilosc_bazowa` bigint(20) NOT NULL DEFAULT 0,
+  PRIMARY KEY (`id`),
+  UNIQUE KEY `statystyki_operacji_dzienne_klucz` (`lodowka_id`, `dzien`, `grupa`, `typ`, `rodzaj`),
+  CONSTRAINT `statystyki_operacji_dzienne_ibfk_1` FOREIGN KEY (`lodowka_id`) REFERENCES `lodowka` (`id`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_general_ci COMMENT='Dzienne sumy historii operacji';
+
+COMMIT;
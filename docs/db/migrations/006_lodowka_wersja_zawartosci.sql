@@ -0,0 +1,14 @@
+-- Migracja 006: wersja zawartości lodówki
+--
+-- Licznik zwiększany po każdym dodaniu, zużyciu lub wyrzuceniu produktu
+-- (FridgeService.invalidate_summary). Liczniki dashboardu są trzymane
+-- w cache każdego workera osobno - przy odczycie porównywana jest zapisana
+-- wersja z tą kolumną, więc zmiana obsłużona przez inny worker od razu
+-- unieważnia cache (odczyt po kluczu głównym zamiast zapytania z GROUP BY).
+
+START TRANSACTION;
+
+ALTER TABLE `lodowka`
+  ADD COLUMN `wersja_zawartosci` int(11) NOT NULL DEFAULT 0 AFTER `nazwa`;
+
+COMMIT;